@@ -0,0 +1,93 @@
+"""Monte Carlo move advisor for Arcade mode.
+
+Each candidate move (offered building and legal cell) is played out to the
+end of the game many times with random moves, and the move with the best
+average final score is recommended. Rollouts stop when the time budget runs
+out and are spread over worker processes when more than one core is used.
+"""
+
+import os
+import random
+import time
+from collections import namedtuple
+
+import engine
+from pools import get_pool
+
+Hint = namedtuple('Hint', 'building row col expected_score rollouts rollouts_per_second')
+
+MAX_CANDIDATES = 12
+
+
+def candidate_moves(game, offered, limit=MAX_CANDIDATES):
+    """Return up to limit (building, row, col) moves, best immediate (score, coins) first."""
+    scorer = game.scorer
+    ranked = []
+    for row, col in game.legal_positions():
+        previous = game.grid[row][col]
+        for building in offered:
+            ranked.append((scorer.place(building, row, col), building, row, col))
+        scorer.place(previous, row, col)
+    ranked.sort(key=lambda move: move[0], reverse=True)
+    return [(building, row, col) for _, building, row, col in ranked[:limit]]
+
+
+def _rollouts(grid, coins, first_building, rules, candidates, deadline, seed):
+    """Play rollouts round-robin over the candidates until time.monotonic() reaches deadline.
+
+    The deadline is set by the caller, so the time a worker process takes to
+    start counts against it. Returns a list of (total final score, rollout
+    count) per candidate.
+    """
+    root = engine.HeadlessGame.from_state(grid, coins, first_building, 'arcade', rules=rules)
+    rng = random.Random(seed)
+    totals = [[0, 0] for _ in candidates]
+    while True:
+        for index, (building, row, col) in enumerate(candidates):
+            if time.monotonic() >= deadline:
+                return totals
+            game = root.fork(rng.getrandbits(64))
+            game.play(building, row, col)
+            result = game.run(engine.random_policy)
+            totals[index][0] += result['score']
+            totals[index][1] += 1
+
+
+def recommend(grid, coins, offered, first_building=False, budget=0.2, workers=None,
+              rules='arcade', seed=None):
+    """Recommend the offered building and cell with the best expected final score.
+
+    budget is the time allowed in seconds. workers is the number of processes
+    to run rollouts in (default: one per CPU; 1 runs them in this process).
+    Returns a Hint, or None when there is no legal move.
+    """
+    start = time.perf_counter()
+    # The monotonic clock is system-wide, so worker processes can compare against the deadline
+    deadline = time.monotonic() + budget
+    root = engine.HeadlessGame.from_state(grid, coins, first_building, 'arcade', rules=rules)
+    candidates = candidate_moves(root, offered)
+    if not candidates:
+        return None
+
+    workers = workers or os.cpu_count() or 1
+    rng = random.Random(seed)
+    if workers == 1:
+        results = [_rollouts(grid, coins, first_building, rules, candidates, deadline,
+                             rng.getrandbits(64))]
+    else:
+        pool = get_pool(workers)
+        futures = [pool.submit(_rollouts, grid, coins, first_building, rules, candidates,
+                               deadline, rng.getrandbits(64)) for _ in range(workers)]
+        results = [future.result() for future in futures]
+
+    totals = [[sum(result[i][0] for result in results), sum(result[i][1] for result in results)]
+              for i in range(len(candidates))]
+    rollouts = sum(count for _, count in totals)
+    elapsed = time.perf_counter() - start
+
+    # Candidates are ordered by immediate gain, which breaks ties and covers unplayed moves
+    best = max(range(len(candidates)),
+               key=lambda i: (totals[i][0] / totals[i][1] if totals[i][1] else float('-inf'), -i))
+    building, row, col = candidates[best]
+    expected = totals[best][0] / totals[best][1] if totals[best][1] else float('nan')
+    return Hint(building, row, col, expected, rollouts, rollouts / elapsed if elapsed else 0.0)
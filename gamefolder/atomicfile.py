@@ -0,0 +1,28 @@
+"""Atomic file writes: a temporary file next to the target, renamed over it when complete."""
+
+import os
+import tempfile
+from contextlib import contextmanager
+
+
+@contextmanager
+def atomic_write(filename, mode='w', fsync=False):
+    """Open a temporary file for writing filename and rename it into place when the block ends.
+
+    Each write gets a temporary file of its own, as several sessions may
+    save the same file at once. If the block raises, the temporary file is
+    removed and filename keeps its old contents. With fsync, the data is on
+    disk before the rename.
+    """
+    fd, temp_filename = tempfile.mkstemp(prefix=os.path.basename(filename) + '.', suffix='.tmp',
+                                         dir=os.path.dirname(filename) or '.')
+    try:
+        with os.fdopen(fd, mode) as f:
+            yield f
+            if fsync:
+                f.flush()
+                os.fsync(f.fileno())
+        os.replace(temp_filename, filename)
+    except BaseException:
+        os.remove(temp_filename)
+        raise
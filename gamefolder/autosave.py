@@ -0,0 +1,224 @@
+"""Background saving: save files are written by one thread, off the turn loop.
+
+With autosave on, saving a game, journalling a move or adding a high score
+only copies the state and queues a job; the writer thread does the I/O.
+Jobs run one at a time in the order they were queued, whatever their file,
+so clearing the recovery file never overtakes the save queued before it. A
+job that replaces a file (a snapshot, a full save) supersedes the jobs of
+that file still waiting and takes the place of the oldest of them, so rapid
+saves coalesce into one write of the latest state without moving behind
+the jobs queued after the first one. However slow the disk, a turn never
+waits for it, and the queue never holds more than the jobs of one snapshot
+interval per file.
+
+How much a crash may lose is set by the fsync policy:
+
+``never``      leave flushing to the operating system (fastest)
+``interval``   fsync at most once every FSYNC_INTERVAL seconds; writes made
+               since the last one are synced at close
+``always``     fsync every write before it counts as done
+
+Reads of the save files and the leaderboard call flush() first, so they
+always see the latest save, and close() (also run at exit) writes every
+queued job, so nothing saved is lost when the session ends normally. A
+save that fails is logged when it happens and raised again by the next
+flush(), close() or shutdown(), so it is never reported as written::
+
+    python samplegame.py --autosave interval
+"""
+
+import atexit
+import logging
+import os
+import threading
+import time
+from collections import deque
+
+from instrument import Histogram
+
+POLICIES = ('never', 'interval', 'always')
+
+# Seconds between fsyncs under the 'interval' policy
+FSYNC_INTERVAL = 1.0
+
+logger = logging.getLogger(__name__)
+
+
+class AutosaveWriter:
+    """A thread that runs queued save jobs, coalescing the jobs of each file.
+
+    A job is called as ``job(*args, fsync=flag)`` on the writer thread,
+    where flag says whether the policy wants this write synced to disk.
+    An exception in a job is logged, and the first one is kept and raised
+    by the next flush() or close().
+    """
+
+    def __init__(self, fsync='never', interval=FSYNC_INTERVAL):
+        if fsync not in POLICIES:
+            raise ValueError(f"Unknown fsync policy: {fsync}")
+        self.fsync = fsync
+        self.interval = interval
+        self._queue = deque()  # (key, job, args, time queued), oldest first
+        self._waiting = {}  # key -> number of its jobs in the queue
+        self._depth = 0
+        self._busy = False
+        self._closing = False
+        self._error = None
+        self._last_fsync = time.monotonic()
+        self._unsynced = False
+        self._condition = threading.Condition()
+
+        # Statistics
+        self.queued = 0
+        self.written = 0
+        self.coalesced = 0
+        self.max_depth = 0
+        self.latency = Histogram()  # From queueing a job to the end of its write
+        self.write_time = Histogram()
+
+        self._thread = threading.Thread(target=self._run, name='autosave', daemon=True)
+        self._thread.start()
+
+    def submit(self, key, job, *args, replace=False):
+        """Queue job(*args) to run after the jobs already queued for key (a file name).
+
+        With replace, the job writes everything the waiting jobs of key
+        would: they are dropped and the job runs where the oldest of them
+        would have run.
+        """
+        with self._condition:
+            if self._closing:
+                raise RuntimeError("The autosave writer is closed")
+            entry = (key, job, args, time.perf_counter())
+            waiting = self._waiting.get(key, 0)
+            if replace and waiting:
+                queue = deque()
+                for queued in self._queue:
+                    if queued[0] != key:
+                        queue.append(queued)
+                    elif entry is not None:
+                        queue.append(entry)
+                        entry = None
+                self._queue = queue
+                self.coalesced += waiting
+                self._depth -= waiting
+                waiting = 0
+            else:
+                self._queue.append(entry)
+            self._waiting[key] = waiting + 1
+            self.queued += 1
+            self._depth += 1
+            self.max_depth = max(self.max_depth, self._depth)
+            self._condition.notify()
+
+    def _fsync_due(self):
+        if self.fsync != 'interval':
+            return self.fsync == 'always'
+        now = time.monotonic()
+        if self._closing or now - self._last_fsync >= self.interval:
+            self._last_fsync = now
+            self._unsynced = False
+            return True
+        self._unsynced = True
+        return False
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while not self._queue and not self._closing:
+                    self._condition.wait()
+                if not self._queue:
+                    break
+                jobs, self._queue = self._queue, deque()
+                self._waiting.clear()
+                self._depth -= len(jobs)
+                self._busy = True
+            for key, job, args, queued in jobs:
+                start = time.perf_counter()
+                try:
+                    job(*args, fsync=self._fsync_due())
+                except Exception as e:
+                    logger.exception("Autosave of %s failed", key)
+                    self._error = self._error or e
+                end = time.perf_counter()
+                self.write_time.add(end - start)
+                self.latency.add(end - queued)
+                self.written += 1
+            with self._condition:
+                self._busy = False
+                self._condition.notify_all()
+        # Closing: sync the writes the interval skipped, whose files may be closed by now
+        if self._unsynced and hasattr(os, 'sync'):  # Not on Windows
+            os.sync()
+
+    def _raise_error(self):
+        error, self._error = self._error, None
+        if error is not None:
+            raise error
+
+    def flush(self):
+        """Wait until every queued job has been written."""
+        with self._condition:
+            while self._queue or self._busy:
+                self._condition.wait()
+        self._raise_error()
+
+    def close(self):
+        """Write every queued job and stop the thread."""
+        with self._condition:
+            self._closing = True
+            self._condition.notify_all()
+        self._thread.join()
+        self._raise_error()
+
+    def stats(self):
+        """Return the writer's statistics as a JSON-serialisable dict."""
+        return {
+            'fsync': self.fsync,
+            'queued': self.queued,
+            'written': self.written,
+            'coalesced': self.coalesced,
+            'queue_depth': self._depth,
+            'max_queue_depth': self.max_depth,
+            'latency': self.latency.to_dict(),
+            'write_time': self.write_time.to_dict(),
+        }
+
+
+_writer = None
+
+
+def get_writer(fsync='never'):
+    """Return the shared writer with the given fsync policy, starting it on first use."""
+    global _writer
+    if _writer is not None and _writer.fsync != fsync:
+        shutdown()
+    if _writer is None:
+        _writer = AutosaveWriter(fsync)
+    return _writer
+
+
+def shutdown():
+    """Write everything queued, stop the shared writer and return its stats (None if none).
+
+    Raises the first exception of a failed save, after the writer has stopped.
+    """
+    global _writer
+    writer, _writer = _writer, None
+    if writer is None:
+        return None
+    writer.close()
+    return writer.stats()
+
+
+def report(stats):
+    """Return a one-line summary of writer stats."""
+    latency = stats['latency']
+    return (f"Autosave ({stats['fsync']} fsync): {stats['queued']} saves queued, "
+            f"{stats['written']} written, {stats['coalesced']} coalesced; "
+            f"latency mean {latency['mean_seconds'] * 1e3:.2f} ms, "
+            f"max {latency['max_seconds'] * 1e3:.2f} ms; "
+            f"queue depth max {stats['max_queue_depth']}")
+
+
+atexit.register(shutdown)
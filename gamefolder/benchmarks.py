@@ -0,0 +1,319 @@
+"""Microbenchmarks for scoring, adjacency, grid expansion, rendering and save/high score I/O.
+
+Run all benchmarks and store the numbers as a baseline::
+
+    python benchmarks.py --save baseline.json
+
+Run them again after a change and flag anything that got slower::
+
+    python benchmarks.py --compare baseline.json --threshold 0.10
+
+Check that the game modules still import within their time budgets::
+
+    python benchmarks.py --check-imports
+
+Compare the memory per cell of the board types::
+
+    python benchmarks.py --memory
+"""
+
+import argparse
+import contextlib
+import importlib.util
+import io
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+import bitboard
+import heatmap
+import samplegame
+from bytegrid import Grid
+from engine import HeadlessGame
+from incremental import IncrementalScorer
+from render import Renderer
+from sparseboard import ChunkedBoard
+
+SIZES = [20, 200, 2000]
+QUICK_SIZES = [20, 100]
+DENSITIES = [0.1, 0.5, 0.9]
+BUILDINGS = ["R", "I", "C", "*", "O"]
+
+# Seconds a fresh interpreter may spend importing each module (with warm bytecode caches).
+# Pool workers and batch jobs import these, so they must stay cheap.
+IMPORT_BUDGETS = {
+    'incremental': 0.005,
+    'sparseboard': 0.005,
+    'engine': 0.015,
+    'samplegame': 0.015,
+}
+
+
+def load_npcity():
+    """Import npcity.py from the repository root for its calculate_score_and_coins."""
+    path = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'npcity.py')
+    spec = importlib.util.spec_from_file_location('npcity', path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def make_grid(size, density, seed=0):
+    """Return a size x size grid where roughly density of the cells hold a random building."""
+    rng = random.Random(f"{size}:{density}:{seed}")
+    return [[rng.choice(BUILDINGS) if rng.random() < density else 'P' for _ in range(size)]
+            for _ in range(size)]
+
+
+def measure(func, min_time=0.2, repeat=3):
+    """Return the best time in seconds for one call of func."""
+    number = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(number):
+            func()
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time:
+            break
+        number *= 2
+    if elapsed > 1.0:
+        repeat = 1  # Slow cases are stable enough and would take too long
+    best = elapsed / number
+    for _ in range(repeat - 1):
+        start = time.perf_counter()
+        for _ in range(number):
+            func()
+        best = min(best, (time.perf_counter() - start) / number)
+    return best
+
+
+def import_time(module, repeat=5):
+    """Return the best cumulative import time of module in a fresh interpreter, in seconds."""
+    folder = os.path.dirname(os.path.abspath(__file__))
+    # The budgets are for warm bytecode caches, so let the first run write them
+    env = dict(os.environ)
+    env.pop('PYTHONDONTWRITEBYTECODE', None)
+    best = None
+    for _ in range(repeat):
+        output = subprocess.run([sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+                                cwd=folder, env=env, capture_output=True, text=True,
+                                check=True).stderr
+        for line in output.splitlines():
+            # import time: <self us> | <cumulative us> | <module>
+            fields = [field.strip() for field in line.split('|')]
+            if len(fields) == 3 and fields[2] == module:
+                seconds = int(fields[1]) / 1e6
+                best = seconds if best is None else min(best, seconds)
+    return best
+
+
+def check_imports(budgets=IMPORT_BUDGETS):
+    """Print each module's import time against its budget and return the modules over budget."""
+    over = []
+    for module, budget in budgets.items():
+        seconds = import_time(module)
+        flag = ''
+        if seconds > budget:
+            flag = 'OVER BUDGET'
+            over.append(module)
+        print(f"import {module:<20} {seconds * 1e3:8.2f} ms (budget {budget * 1e3:.0f} ms) {flag}")
+    return over
+
+
+def memory_per_cell(build, cells):
+    """Return the bytes per cell allocated by build(), as traced by tracemalloc."""
+    import tracemalloc
+    tracemalloc.start()
+    try:
+        board = build()
+        size = tracemalloc.get_traced_memory()[0]
+    finally:
+        tracemalloc.stop()
+    del board
+    return size / cells
+
+
+BOARD_TYPES = {
+    'list': lambda grid: [row[:] for row in grid],
+    'Grid': Grid.from_grid,
+    'ChunkedBoard': ChunkedBoard.from_grid,
+}
+
+
+def memory_report(sizes, densities):
+    """Print the bytes per cell of every board type, built from the same grids."""
+    print(f"{'board':<20} " + ' '.join(f"{name:>14}" for name in BOARD_TYPES))
+    for size in sizes:
+        for density in densities:
+            grid = make_grid(size, density)
+            per_cell = [memory_per_cell(lambda: build(grid), size * size)
+                        for build in BOARD_TYPES.values()]
+            print(f"{f'{size}x{size}@{density}':<20} "
+                  + ' '.join(f"{value:>14.2f}" for value in per_cell))
+
+
+def expand_and_shrink(board):
+    samplegame.expand_grid(board)
+    board.shrink(5)
+
+
+def render_turn(renderer, grid, row, col):
+    """Change one cell and draw the frame, as after a placement."""
+    grid[row][col] = 'C' if grid[row][col] == 'R' else 'R'
+    renderer.draw(grid, "Updated grid:", (row, col))
+
+
+def benchmarks(sizes, densities):
+    """Yield (name, func, args) for every benchmark case."""
+    npcity = load_npcity()
+    workdir = tempfile.mkdtemp(prefix='ngeeann-bench-')
+    devnull = open(os.devnull, 'w')
+
+    yield 'get_adjacent_positions', samplegame.get_adjacent_positions, (10, 10)
+
+    scores_file = os.path.join(workdir, 'high_scores.db')
+    yield 'save_high_score', samplegame.save_high_score, (1, scores_file)
+
+    for size in sizes:
+        for density in densities:
+            grid = make_grid(size, density)
+            case = f"[{size}x{size}@{density}]"
+            yield 'calculate_score_and_coins' + case, samplegame.calculate_score_and_coins, (grid,)
+            yield 'npcity.calculate_score_and_coins' + case, npcity.calculate_score_and_coins, (grid,)
+            yield 'calculate_score_free_play' + case, samplegame.calculate_score_free_play, (grid,)
+            yield 'bitboard.score_and_coins' + case, bitboard.score_and_coins, (grid,)
+            board = bitboard.BitBoard.from_grid(grid)
+            yield 'BitBoard.score_and_coins' + case, board.score_and_coins, ()
+
+            scorer = IncrementalScorer([row[:] for row in grid], 'free_play')
+            middle = size // 2
+            yield 'IncrementalScorer.place' + case, scorer.place, ('R', middle, middle)
+            scorer = IncrementalScorer(Grid.from_grid(grid), 'free_play')
+            yield 'IncrementalScorer.place[bytegrid]' + case, scorer.place, ('R', middle, middle)
+
+            yield 'heatmap' + case, heatmap.heatmap, (grid, 'R', 'free_play')
+            # The part of the board a 40x80 terminal shows, as the building prompt maps it
+            window = (middle - 20, middle - 40, 40, 80)
+            yield 'heatmap[viewport]' + case, heatmap.heatmap, (grid, 'R', 'free_play', window)
+
+            game = HeadlessGame.from_state(grid, 16)
+            yield 'HeadlessGame.legal_positions' + case, game.legal_positions, ()
+
+            yield 'render[plain]' + case, Renderer('plain', devnull).draw, (grid, "Updated grid:")
+            renderer = Renderer('ansi', devnull, view_rows=40, view_cols=80)
+            yield 'render[ansi]' + case, render_turn, (renderer, [row[:] for row in grid],
+                                                       middle, middle)
+
+            yield 'expand_grid' + case, samplegame.expand_grid, (grid,)
+            board = ChunkedBoard.from_grid(grid)
+            yield 'expand_grid[chunked]' + case, samplegame.expand_grid, (board,)
+            # Expanding then shrinking keeps the board the same size from call to call
+            board = Grid.from_grid(grid)
+            yield 'expand_grid[bytegrid]' + case, expand_and_shrink, (board,)
+
+            save_file = os.path.join(workdir, 'game_save.json')
+            yield 'save_game' + case, samplegame.save_game, (grid, 16, 0, save_file)
+            yield 'load_game' + case, samplegame.load_game, (save_file,)
+            binary_file = os.path.join(workdir, 'game_save.sav')
+            yield 'save_game[binary]' + case, samplegame.save_game, (grid, 16, 0, binary_file, True)
+            yield 'load_game[binary]' + case, samplegame.load_game, (binary_file,)
+
+
+def run(sizes, densities, min_time=0.2, verbose=True):
+    """Run every benchmark and return a baseline dict."""
+    results = {}
+    for module in IMPORT_BUDGETS:
+        results['import ' + module] = import_time(module)
+        if verbose:
+            print(f"{'import ' + module:<60} {results['import ' + module] * 1e6:14.2f} us")
+    for name, func, args in benchmarks(sizes, densities):
+        # The functions print status messages; keep them out of the report
+        with contextlib.redirect_stdout(io.StringIO()):
+            seconds = measure(lambda: func(*args), min_time)
+        results[name] = seconds
+        if verbose:
+            print(f"{name:<60} {seconds * 1e6:14.2f} us", flush=True)
+    return {
+        'meta': {
+            'date': datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'scoring_backend': samplegame.SCORING_BACKEND,
+        },
+        'results': results,
+    }
+
+
+def compare(baseline, current, threshold=0.10):
+    """Print each benchmark against the baseline and return the names that regressed."""
+    regressions = []
+    for name, seconds in current['results'].items():
+        before = baseline['results'].get(name)
+        if before is None:
+            print(f"{name:<60} {'new':>10}")
+            continue
+        change = (seconds - before) / before if before else 0.0
+        flag = ''
+        if change > threshold:
+            flag = 'REGRESSION'
+            regressions.append(name)
+        print(f"{name:<60} {before * 1e6:12.2f} us -> {seconds * 1e6:12.2f} us {change:+8.1%} {flag}")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Ngee Ann City microbenchmarks.")
+    parser.add_argument('--sizes', type=int, nargs='+', default=None,
+                        help=f"grid sizes (default: {SIZES})")
+    parser.add_argument('--densities', type=float, nargs='+', default=DENSITIES)
+    parser.add_argument('--quick', action='store_true', help=f"only use sizes {QUICK_SIZES}")
+    parser.add_argument('--min-time', type=float, default=0.2,
+                        help="minimum seconds per timing round")
+    parser.add_argument('--save', metavar='FILE', help="write the results as a JSON baseline")
+    parser.add_argument('--compare', metavar='FILE', help="compare against a JSON baseline")
+    parser.add_argument('--threshold', type=float, default=0.10,
+                        help="slowdown that counts as a regression (default: 0.10 = 10%%)")
+    parser.add_argument('--check-imports', action='store_true',
+                        help="only check import times against IMPORT_BUDGETS")
+    parser.add_argument('--memory', action='store_true',
+                        help="only report the memory per cell of each board type")
+    args = parser.parse_args(argv)
+
+    if args.check_imports:
+        over = check_imports()
+        if over:
+            print(f"{len(over)} module(s) over their import budget")
+            sys.exit(1)
+        print("All imports within budget.")
+        return
+
+    sizes = args.sizes or (QUICK_SIZES if args.quick else SIZES)
+    if args.memory:
+        memory_report(sizes, args.densities)
+        return
+
+    current = run(sizes, args.densities, args.min_time, verbose=not args.compare)
+
+    if args.save:
+        with open(args.save, 'w') as f:
+            json.dump(current, f, indent=2)
+        print(f"Baseline saved to {args.save}")
+
+    if args.compare:
+        with open(args.compare, 'r') as f:
+            baseline = json.load(f)
+        regressions = compare(baseline, current, args.threshold)
+        if regressions:
+            print(f"{len(regressions)} regression(s) above {args.threshold:.0%}")
+            sys.exit(1)
+        print("No regressions.")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,295 @@
+"""Compact, versioned binary save format with lazy, memory-mapped loading.
+
+Layout (little-endian)::
+
+    header   magic b'NACS', version u8, encoding u8, reserved u16,
+             rows u32, cols u32, coins i64, score i64, turn i64
+    offsets  (rows + 1) x u64, start of every row relative to the row data
+    rows     every row encoded with the header's encoding
+
+Encodings: ``'bytes'`` stores one code per cell, ``'packed'`` stores 3-bit
+codes (8 cells in 3 bytes) and ``'rle'`` stores runs of empty 'P' cells as
+varints followed by the literal codes of the buildings after them. The row
+offset table lets a single row be decoded without reading the others.
+
+The turn field records how many moves of the session's journal the save
+already contains. Files of any other version are refused.
+
+Truncated or damaged files raise ValueError: the header and row offset
+table are checked when a save is opened, and each row when it is decoded.
+"""
+
+import mmap
+import struct
+
+from atomicfile import atomic_write
+
+MAGIC = b'NACS'
+VERSION = 1
+ENCODINGS = {'bytes': 0, 'packed': 1, 'rle': 2}
+
+# Codes are part of the file format and must never be renumbered
+CELL_CODES = {'P': 0, 'R': 1, 'I': 2, 'C': 3, 'O': 4, '*': 5}
+CODE_CELLS = 'PRICO*'
+
+_HEADER = struct.Struct('<4sBBHIIqqq')
+_OFFSET = struct.Struct('<Q')
+
+
+def is_binary_save(filename):
+    """Return True if filename starts with the binary save magic."""
+    with open(filename, 'rb') as f:
+        return f.read(len(MAGIC)) == MAGIC
+
+
+def _write_varint(out, value):
+    while value >= 0x80:
+        out.append((value & 0x7f) | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def _read_varint(data, pos):
+    value = shift = 0
+    while True:
+        byte = data[pos]
+        pos += 1
+        value |= (byte & 0x7f) << shift
+        if byte < 0x80:
+            return value, pos
+        shift += 7
+
+
+def _encode_row(codes, encoding):
+    if encoding == ENCODINGS['bytes']:
+        return bytes(codes)
+    out = bytearray()
+    if encoding == ENCODINGS['packed']:
+        for start in range(0, len(codes), 8):
+            value = 0
+            for i, code in enumerate(codes[start:start + 8]):
+                value |= code << (3 * i)
+            out += value.to_bytes(3, 'little')
+        return bytes(out)
+    col, cols = 0, len(codes)
+    while col < cols:
+        run_start = col
+        while col < cols and codes[col] == 0:
+            col += 1
+        literal_start = col
+        while col < cols and codes[col] != 0:
+            col += 1
+        _write_varint(out, literal_start - run_start)
+        _write_varint(out, col - literal_start)
+        out += bytes(codes[literal_start:col])
+    return bytes(out)
+
+
+def _row_codes(grid, rows, cols):
+    """Yield the list of cell codes of every row, skipping empty cells of sparse boards."""
+    if hasattr(grid, 'buildings'):  # sparseboard.ChunkedBoard
+        by_row = {}
+        for row, col, building in grid.buildings():
+            by_row.setdefault(row, []).append((col, building))
+        empty = [0] * cols
+        for row in range(rows):
+            cells = by_row.get(row)
+            if cells is None:
+                yield empty
+                continue
+            codes = empty[:]
+            for col, building in cells:
+                codes[col] = CELL_CODES[building]
+            yield codes
+        return
+    for row in grid:
+        yield [CELL_CODES[building] for building in row]
+
+
+def save_binary(filename, grid, coins, score, encoding='rle', turn=0, fsync=False):
+    """Write a game state in the binary format.
+
+    The file is written next to filename and renamed into place, so a crash
+    never leaves a half-written save behind. With fsync, the data is on disk
+    before the rename.
+    """
+    if encoding not in ENCODINGS:
+        raise ValueError(f"Unknown encoding: {encoding}")
+    encoding = ENCODINGS[encoding]
+    rows, cols = len(grid), len(grid[0])
+
+    offsets = bytearray()
+    data = bytearray()
+    for codes in _row_codes(grid, rows, cols):
+        offsets += _OFFSET.pack(len(data))
+        data += _encode_row(codes, encoding)
+    offsets += _OFFSET.pack(len(data))
+
+    with atomic_write(filename, 'wb', fsync) as f:
+        f.write(_HEADER.pack(MAGIC, VERSION, encoding, 0, rows, cols, int(coins), int(score), turn))
+        f.write(offsets)
+        f.write(data)
+
+
+def _packed_size(cols):
+    return 3 * ((cols + 7) // 8)
+
+
+def _check_layout(data, header_size, rows, cols, encoding):
+    """Raise ValueError unless the row offset table fits data and every row fits the table."""
+    if encoding not in ENCODINGS.values():
+        raise ValueError(f"Unknown encoding: {encoding}")
+    start = header_size + (rows + 1) * _OFFSET.size
+    if rows < 1 or cols < 1 or len(data) < start:
+        raise ValueError("The save is truncated")
+    offsets = [offset for offset, in _OFFSET.iter_unpack(data[header_size:start])]
+    row_size = {ENCODINGS['bytes']: cols, ENCODINGS['packed']: _packed_size(cols)}.get(encoding)
+    previous = 0
+    for offset in offsets[1:]:
+        if offset < previous or (row_size is not None and offset - previous != row_size):
+            raise ValueError("The save's row offsets are damaged")
+        previous = offset
+    if offsets[0] != 0 or start + offsets[-1] > len(data):
+        raise ValueError("The save is truncated")
+
+
+def load_binary(filename):
+    """Open a binary save and return (grid, coins, score).
+
+    The grid is a MappedGrid: rows are decoded from the memory-mapped file
+    the first time they are used. Its turn attribute holds the saved turn.
+    """
+    with open(filename, 'rb') as f:
+        data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    try:
+        if data[:4] != MAGIC:
+            raise ValueError(f"{filename} is not a binary save file")
+        if len(data) < _HEADER.size:
+            raise ValueError(f"{filename} is truncated")
+        _, version, encoding, _, rows, cols, coins, score, turn = _HEADER.unpack_from(data, 0)
+        if version != VERSION:
+            raise ValueError(f"{filename} uses save format version {version}, not {VERSION}")
+        _check_layout(data, _HEADER.size, rows, cols, encoding)
+    except ValueError:
+        data.close()
+        raise
+    grid = MappedGrid(data, rows, cols, encoding)
+    grid.turn = turn
+    return grid, coins, score
+
+
+class MappedGrid:
+    """Grid backed by a memory-mapped binary save, decoding each row on first access.
+
+    Decoded rows are ordinary lists, so cells can be changed in place like
+    the list-of-lists grid.
+    """
+
+    def __init__(self, data, rows, cols, encoding):
+        self.data = data
+        self.rows = rows
+        self.cols = cols
+        self.encoding = encoding
+        self.turn = 0
+        self._offsets = _HEADER.size
+        self._start = _HEADER.size + (rows + 1) * _OFFSET.size
+        self._rows = [None] * rows
+
+    def __len__(self):
+        return self.rows
+
+    def __getitem__(self, row):
+        cells = self._rows[row]
+        if cells is None:
+            cells = self._rows[row] = [self._cell(row, code) for code in self._decode(row)]
+        return cells
+
+    @staticmethod
+    def _cell(row, code):
+        if code >= len(CODE_CELLS):
+            raise ValueError(f"Row {row} of the save holds an unknown cell code: {code}")
+        return CODE_CELLS[code]
+
+    def __iter__(self):
+        for row in range(self.rows):
+            yield self[row]
+
+    def _raw_row(self, row):
+        start, = _OFFSET.unpack_from(self.data, self._offsets + row * _OFFSET.size)
+        end, = _OFFSET.unpack_from(self.data, self._offsets + (row + 1) * _OFFSET.size)
+        return self.data[self._start + start:self._start + end]
+
+    def _decode(self, row):
+        raw = self._raw_row(row)
+        cols = self.cols
+        if self.encoding == ENCODINGS['bytes']:
+            return raw
+        if self.encoding == ENCODINGS['packed']:
+            codes = []
+            for i in range(0, len(raw), 3):
+                value = raw[i] | (raw[i + 1] << 8) | (raw[i + 2] << 16)
+                for _ in range(8):
+                    codes.append(value & 7)
+                    value >>= 3
+            return codes[:cols]
+        codes = bytearray(cols)
+        pos = col = 0
+        try:
+            while col < cols:
+                empty, pos = _read_varint(raw, pos)
+                count, pos = _read_varint(raw, pos)
+                col += empty
+                if col + count > cols or pos + count > len(raw):
+                    break
+                codes[col:col + count] = raw[pos:pos + count]
+                pos += count
+                col += count
+        except IndexError:  # A varint runs past the end of the row
+            pass
+        if col != cols or pos != len(raw):
+            raise ValueError(f"Row {row} of the save is damaged")
+        return codes
+
+    def buildings(self):
+        """Yield (row, col, building) for every non-empty cell."""
+        for row in range(self.rows):
+            cells = self._rows[row]
+            if cells is not None:
+                for col, cell in enumerate(cells):
+                    if cell != 'P':
+                        yield row, col, cell
+            elif self.encoding == ENCODINGS['rle']:
+                yield from self._rle_buildings(row)
+            else:
+                for col, code in enumerate(self._decode(row)):
+                    if code:
+                        yield row, col, self._cell(row, code)
+
+    def _rle_buildings(self, row):
+        """Walk the runs of an RLE row without expanding its empty cells."""
+        raw = self._raw_row(row)
+        pos = col = 0
+        while pos < len(raw):
+            try:
+                empty, pos = _read_varint(raw, pos)
+                count, pos = _read_varint(raw, pos)
+            except IndexError:
+                raise ValueError(f"Row {row} of the save is damaged") from None
+            col += empty
+            if col + count > self.cols or pos + count > len(raw):
+                raise ValueError(f"Row {row} of the save is damaged")
+            for code in raw[pos:pos + count]:
+                yield row, col, self._cell(row, code)
+                col += 1
+            pos += count
+
+    def to_grid(self):
+        """Decode every remaining row, release the file and return the list-of-lists grid."""
+        for row in range(self.rows):
+            self[row]
+        self.close()
+        return self._rows
+
+    def close(self):
+        if self.data is not None and not self.data.closed:
+            self.data.close()
@@ -0,0 +1,170 @@
+"""Bitboard scoring backend: one integer bitset per kind of building.
+
+Cell (row, col) is bit ``row * cols + col``. Moving a bitset by one row is
+a shift by cols and moving it by one column a shift by 1, with the edge
+masks clearing the bits that would wrap onto the next row. For a building
+X and a kind K, the cells of X next to a K in one direction are
+``X & shifted(K)``, so every term of a rule set is a few ANDs and
+``int.bit_count()`` calls over the whole board at once:
+
+``base``           base * |X|
+``per_adjacent``   points * the sum over the four directions of |X & shifted(K)|
+``any_adjacent``   points * |X & (shifted(K) in any direction)|
+``coins``          like per_adjacent, over every X
+``override``       the X next to a K score the override points instead
+
+On the 20x20 Arcade board a bitset is a 400-bit int, and scoring costs a
+few dozen big-int operations instead of a table lookup per cell, with no
+array setup as with NumPy. It is meant for hot loops that score whole
+boards, such as rollouts and batch self-play; the result always equals
+``rules.evaluate``.
+"""
+
+from rules import CODE_BUILDINGS, KINDS, RULE_SETS, board_score, get_rules
+
+# bytes.translate tables that turn an encoded board into the '0'/'1' digits of each kind
+_DIGITS = {kind: bytes.maketrans(CODE_BUILDINGS.encode(),
+                                 ''.join('1' if building == kind else '0'
+                                         for building in CODE_BUILDINGS).encode())
+           for kind in KINDS}
+
+_plans = {}
+
+
+def _plan(rules):
+    """Return the terms of a rule set as (building, base, per_adjacent, any_adjacent, coins, override).
+
+    Also returns the kinds whose shifted bitsets the terms read, so that
+    scoring only shifts those.
+    """
+    plan = _plans.get(rules)
+    if plan is None:
+        get_rules(rules)  # Unknown names raise ValueError here
+        terms, shifted = [], set()
+        for building, rule in RULE_SETS[rules].items():
+            per_adjacent = tuple((kind, points) for kind, points in rule.per_adjacent.items() if points)
+            any_adjacent = tuple((kind, points) for kind, points in rule.any_adjacent.items() if points)
+            coins = tuple((kind, amount) for kind, amount in rule.coins.items() if amount)
+            terms.append((building, rule.base, per_adjacent, any_adjacent, coins, rule.override))
+            shifted.update(kind for kind, _ in per_adjacent + any_adjacent + coins)
+            if rule.override is not None:
+                shifted.add(rule.override[0])
+        plan = _plans[rules] = terms, sorted(shifted)
+    return plan
+
+
+class BitBoard:
+    """A rows x cols board stored as one bitset per kind of building; empty cells have no bit."""
+
+    __slots__ = ('rows', 'cols', 'bits', 'full', 'not_first_col', 'not_last_col')
+
+    def __init__(self, rows=20, cols=20):
+        self.rows, self.cols = rows, cols
+        self.bits = dict.fromkeys(KINDS, 0)
+        self.full = (1 << rows * cols) - 1
+        first_col = sum(1 << row * cols for row in range(rows))
+        self.not_first_col = self.full & ~first_col
+        self.not_last_col = self.full & ~(first_col << cols - 1)
+
+    @classmethod
+    def from_grid(cls, grid):
+        """Encode a list-of-lists grid (or a ChunkedBoard) with one pass per kind in C."""
+        if hasattr(grid, 'to_grid'):  # sparseboard.ChunkedBoard
+            grid = grid.to_grid()
+        board = cls(len(grid), len(grid[0]))
+        # Bit 0 is the first cell, so the digits are read last cell first
+        cells = ''.join([''.join(row) for row in grid])[::-1].encode()
+        for kind in KINDS:
+            board.bits[kind] = int(cells.translate(_DIGITS[kind]), 2)
+        return board
+
+    def to_grid(self):
+        grid = [['P'] * self.cols for _ in range(self.rows)]
+        for kind, bits in self.bits.items():
+            for row, col in self.positions(bits):
+                grid[row][col] = kind
+        return grid
+
+    def copy(self):
+        board = BitBoard.__new__(BitBoard)
+        board.rows, board.cols = self.rows, self.cols
+        board.bits = self.bits.copy()
+        board.full = self.full
+        board.not_first_col = self.not_first_col
+        board.not_last_col = self.not_last_col
+        return board
+
+    def __getitem__(self, position):
+        row, col = position
+        bit = 1 << row * self.cols + col
+        for kind, bits in self.bits.items():
+            if bits & bit:
+                return kind
+        return 'P'
+
+    def place(self, building, row, col):
+        """Put building (or 'P' to clear the cell) at (row, col), replacing what was there."""
+        bit = 1 << row * self.cols + col
+        bits = self.bits
+        for kind in KINDS:
+            if bits[kind] & bit:
+                bits[kind] ^= bit
+        if building != 'P':
+            bits[building] |= bit
+
+    def occupied(self):
+        bits = self.bits
+        return bits['R'] | bits['I'] | bits['C'] | bits['O'] | bits['*']
+
+    def _shifted(self, bits):
+        """Return bits moved onto the cell below, above, right and left of every bit."""
+        cols = self.cols
+        return ((bits << cols) & self.full, bits >> cols,
+                (bits << 1) & self.not_first_col, (bits >> 1) & self.not_last_col)
+
+    def frontier(self):
+        """Bitset of the empty cells next to a building: the legal Arcade moves after the first."""
+        occupied = self.occupied()
+        down, up, right, left = self._shifted(occupied)
+        return (down | up | right | left) & ~occupied
+
+    def positions(self, bits):
+        """Return the (row, col) of every set bit, in board order."""
+        cols = self.cols
+        positions = []
+        while bits:
+            low = bits & -bits
+            positions.append(divmod(low.bit_length() - 1, cols))
+            bits ^= low
+        return positions
+
+    def score_and_coins(self, rules='arcade'):
+        """Return (score, coins) of the board under the given rule set."""
+        terms, kinds = _plan(rules)
+        bits = self.bits
+        shifted = {kind: self._shifted(bits[kind]) for kind in kinds}
+        touching = {kind: down | up | right | left
+                    for kind, (down, up, right, left) in shifted.items()}
+        score = coins = 0
+        for building, base, per_adjacent, any_adjacent, coin_terms, override in terms:
+            cells = bits[building]
+            if not cells:
+                continue
+            for kind, amount in coin_terms:
+                coins += amount * sum((cells & side).bit_count() for side in shifted[kind])
+            if override is not None:
+                overridden = cells & touching[override[0]]
+                score += override[1] * overridden.bit_count()
+                cells ^= overridden
+            score += base * cells.bit_count()
+            for kind, points in per_adjacent:
+                score += points * sum((cells & side).bit_count() for side in shifted[kind])
+            for kind, points in any_adjacent:
+                score += points * (cells & touching[kind]).bit_count()
+        counts = {kind: bits[kind].bit_count() for kind in KINDS}
+        return score + board_score(get_rules(rules), counts), coins
+
+
+def score_and_coins(grid, rules='arcade'):
+    """Return (score, coins) for grid under the given rule set, scored as bitboards."""
+    return BitBoard.from_grid(grid).score_and_coins(rules)
@@ -0,0 +1,155 @@
+"""Dense board stored in one contiguous bytearray, one byte per cell.
+
+A list-of-lists grid holds a list object per row and an 8-byte pointer per
+cell. Grid keeps the cells row by row in a single bytearray of building
+letters ('P' when empty), so a cell costs one byte plus a small view
+object per row. ``grid[row][col]`` reads and writes cells through the row
+view, and ``len(grid)`` and ``len(grid[0])`` give the size, like the
+list-of-lists grid. Grid also has the ``buildings()``, ``copy()`` and
+``to_grid()`` of sparseboard.ChunkedBoard, whose chunks are small Grids,
+so the scorers, the frontier, the renderer and the save formats all accept
+it. Resizing copies whole rows with slice assignments, which run in C.
+"""
+
+_EMPTY = ord('P')
+
+
+class _Row:
+    """One row of a Grid that behaves like a list row of the old grid."""
+
+    __slots__ = ('cells', 'start', 'cols')
+
+    def __init__(self, cells, start, cols):
+        self.cells = cells
+        self.start = start
+        self.cols = cols
+
+    def __len__(self):
+        return self.cols
+
+    def _index(self, col):
+        if col < 0:
+            col += self.cols
+        if not 0 <= col < self.cols:
+            raise IndexError('grid column out of range')
+        return self.start + col
+
+    def __getitem__(self, col):
+        if col.__class__ is slice:
+            return list(self.cells[self.start:self.start + self.cols].decode()[col])
+        if 0 <= col < self.cols:  # Every scoring path reads cells, so check this case inline
+            return chr(self.cells[self.start + col])
+        return chr(self.cells[self._index(col)])
+
+    def __setitem__(self, col, building):
+        self.cells[self._index(col)] = ord(building)
+
+    def __iter__(self):
+        return iter(self.cells[self.start:self.start + self.cols].decode())
+
+
+class Grid:
+    """A rows x cols board of one-letter cells in a bytearray, row after row."""
+
+    __slots__ = ('rows', 'cols', 'cells', '_views')
+
+    def __init__(self, rows, cols, cells=None):
+        self.rows = rows
+        self.cols = cols
+        self.cells = bytearray(b'P' * (rows * cols)) if cells is None else cells
+        self._make_views()
+
+    def _make_views(self):
+        # One view object per row, made once, so grid[row][col] costs two calls
+        self._views = [_Row(self.cells, row * self.cols, self.cols) for row in range(self.rows)]
+
+    @classmethod
+    def from_grid(cls, grid):
+        """Build a Grid from a list-of-lists grid, a sparse board or another Grid."""
+        rows, cols = len(grid), len(grid[0])
+        if isinstance(grid, Grid):
+            return grid.copy()
+        if hasattr(grid, 'buildings'):  # Sparse boards only list their buildings
+            board = cls(rows, cols)
+            for row, col, building in grid.buildings():
+                board.cells[row * cols + col] = ord(building)
+            return board
+        return cls(rows, cols, bytearray(''.join([''.join(row) for row in grid]).encode()))
+
+    def copy(self):
+        return Grid(self.rows, self.cols, self.cells[:])
+
+    def __reduce__(self):
+        # Pickled as its cells, e.g. for a worker process; the row views are made again
+        return Grid, (self.rows, self.cols, self.cells)
+
+    def to_grid(self):
+        """Return the board as a list-of-lists grid in the save file format."""
+        cells, cols = self.cells, self.cols
+        return [list(cells[start:start + cols].decode()) for start in range(0, len(cells), cols)]
+
+    def __len__(self):
+        return self.rows
+
+    def __getitem__(self, row):
+        return self._views[row]
+
+    def __iter__(self):
+        return iter(self._views)
+
+    def get(self, row, col):
+        return chr(self.cells[row * self.cols + col])
+
+    def set(self, row, col, building):
+        self.cells[row * self.cols + col] = ord(building)
+
+    def neighbours(self, row, col):
+        """Yield (row, col, building) for each cell orthogonally next to (row, col)."""
+        cells, cols = self.cells, self.cols
+        index = row * cols + col
+        if row > 0:
+            yield row - 1, col, chr(cells[index - cols])
+        if row < self.rows - 1:
+            yield row + 1, col, chr(cells[index + cols])
+        if col > 0:
+            yield row, col - 1, chr(cells[index - 1])
+        if col < cols - 1:
+            yield row, col + 1, chr(cells[index + 1])
+
+    def buildings(self):
+        """Yield (row, col, building) for every non-empty cell, skipping empty rows in C."""
+        cells, cols = self.cells, self.cols
+        for row in range(self.rows):
+            start = row * cols
+            if cells.count(_EMPTY, start, start + cols) == cols:
+                continue
+            for col, code in enumerate(cells[start:start + cols]):
+                if code != _EMPTY:
+                    yield row, col, chr(code)
+
+    def resize(self, rows, cols, row_offset=0, col_offset=0):
+        """Change the size, moving every cell by (row_offset, col_offset).
+
+        New cells are empty; cells moved off the board are dropped.
+        """
+        cells = bytearray(b'P' * (rows * cols))
+        # The source columns that land on the new board
+        first = max(0, -col_offset)
+        last = min(self.cols, cols - col_offset)
+        if first < last:
+            for row in range(max(0, -row_offset), min(self.rows, rows - row_offset)):
+                start = (row + row_offset) * cols + first + col_offset
+                source = row * self.cols
+                cells[start:start + last - first] = self.cells[source + first:source + last]
+        self.rows, self.cols, self.cells = rows, cols, cells
+        self._make_views()
+
+    def expand(self, expansion_size=5):
+        """Add expansion_size empty rows and columns to every side, as expand_grid does."""
+        self.resize(self.rows + 2 * expansion_size, self.cols + 2 * expansion_size,
+                    expansion_size, expansion_size)
+
+    def shrink(self, expansion_size=5):
+        """Undo expand(); the rows and columns removed must be empty."""
+        self.resize(self.rows - 2 * expansion_size, self.cols - 2 * expansion_size,
+                    -expansion_size, -expansion_size)
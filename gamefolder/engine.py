@@ -0,0 +1,228 @@
+"""Headless game engine: Arcade and Free Play games driven by a policy instead of input()."""
+
+import random
+
+from frontier import Frontier
+from history import History, Move
+from incremental import IncrementalScorer
+from sparseboard import ChunkedBoard
+
+BUILDINGS = ["R", "I", "C", "*", "O"]
+ARCADE_SIZE = 20
+ARCADE_COINS = 16
+FREE_PLAY_SIZE = 5
+FREE_PLAY_COINS = 999999999999999999  # Unlimited coins
+FREE_PLAY_MAX_TURNS = 100  # Default turn limit of play_game, as Free Play never runs out of coins
+
+
+class HeadlessGame:
+    """One game with the same rules as arcade_mode / free_play_mode, but no prompts or output.
+
+    ``mode`` is ``'arcade'`` or ``'free_play'``. ``rules`` picks the scoring
+    rules and defaults to the mode's own; ``'npcity'`` plays Arcade with the
+    npcity.py rules. All randomness comes from ``self.rng``, so a game is
+    fully determined by its seed and the policy.
+    """
+
+    def __init__(self, mode='arcade', seed=None, rules=None, max_turns=None):
+        if mode not in ('arcade', 'free_play'):
+            raise ValueError(f"Unknown mode: {mode}")
+        self.mode = mode
+        self.rules = rules or mode
+        self.seed = seed
+        self.rng = random.Random(seed)
+        self.max_turns = max_turns
+        if mode == 'arcade':
+            self.grid = [['P' for _ in range(ARCADE_SIZE)] for _ in range(ARCADE_SIZE)]
+            self.coins = ARCADE_COINS
+        else:
+            self.grid = ChunkedBoard(FREE_PLAY_SIZE, FREE_PLAY_SIZE)
+            self.coins = FREE_PLAY_COINS
+        self.empty_cells = len(self.grid) * len(self.grid[0])
+        self.score = 0
+        self.turn = 0
+        self.first_building = True
+        self.scorer = IncrementalScorer(self.grid, self.rules)
+        self.frontier = Frontier()
+        self.history = None  # See enable_undo()
+
+    @classmethod
+    def from_state(cls, grid, coins, first_building=False, mode='arcade', seed=None, rules=None,
+                   max_turns=None):
+        """Continue a game from an existing grid and coin count. The grid is copied."""
+        game = cls(mode, seed, rules, max_turns)
+        if mode == 'arcade':
+            game.grid = [list(row) for row in grid]
+        else:
+            game.grid = ChunkedBoard.from_grid(grid)
+        game.coins = coins
+        game.first_building = first_building
+        if mode == 'arcade':
+            game.empty_cells = sum(row.count('P') for row in game.grid)
+        game.scorer = IncrementalScorer(game.grid, game.rules)
+        game.score = game.scorer.score
+        game.frontier = Frontier.from_grid(game.grid)
+        return game
+
+    def fork(self, seed=None):
+        """Return an independent copy of this game with its own RNG, e.g. for a rollout."""
+        game = HeadlessGame.__new__(HeadlessGame)
+        game.__dict__.update(self.__dict__)
+        game.rng = random.Random(seed)
+        game.scorer = self.scorer.copy()
+        game.grid = game.scorer.grid
+        game.frontier = self.frontier.copy()
+        game.history = None
+        return game
+
+    def enable_undo(self, limit=None):
+        """Start keeping the moves played from now on, at most limit of them, for undo()."""
+        self.history = History(limit)
+
+    def offer(self):
+        """Draw the two buildings offered this turn, as choose_building does."""
+        return self.rng.sample(BUILDINGS, 2)
+
+    def is_legal(self, row, col):
+        """Check a position against the same rules as choose_building."""
+        grid = self.grid
+        rows, cols = len(grid), len(grid[0])
+        if not (0 <= row < rows and 0 <= col < cols):
+            return False
+        if self.mode == 'free_play' or self.first_building:
+            return True
+        return (row, col) in self.frontier
+
+    def legal_positions(self):
+        """Return every (row, col) where a building may be placed this turn."""
+        grid = self.grid
+        rows, cols = len(grid), len(grid[0])
+        if self.mode == 'free_play' or self.first_building:
+            return [(row, col) for row in range(rows) for col in range(cols)]
+        return self.frontier.positions()
+
+    def is_over(self):
+        if self.max_turns is not None and self.turn >= self.max_turns:
+            return True
+        if self.mode == 'arcade':
+            # Arcade buildings form one connected group, so a move exists while any cell is empty
+            return self.coins <= 0 or self.empty_cells == 0
+        return False
+
+    def play(self, building, row, col):
+        """Place a building and apply one turn of coin and score updates."""
+        if building not in BUILDINGS:
+            raise ValueError(f"Unknown building: {building}")
+        if not self.is_legal(row, col):
+            raise ValueError(f"Illegal position: ({row}, {col})")
+        previous = self.grid[row][col]
+        before, first_building = (self.score, self.coins), self.first_building
+        self.turn += 1
+        self.first_building = False
+        if previous == 'P':
+            self.empty_cells -= 1
+        expansion = 0
+        if self.mode == 'arcade':
+            self.coins -= 1
+            self.score, generated_coins = self.scorer.place(building, row, col)
+            self.coins += generated_coins
+            self.frontier.update(self.grid, row, col)
+        else:
+            self.score, _ = self.scorer.place(building, row, col)
+            self.frontier.update(self.grid, row, col)
+            if row in [0, len(self.grid) - 1] or col in [0, len(self.grid[0]) - 1]:
+                expansion = 5
+                self.grid.expand(expansion)
+                self.frontier.expand(expansion)
+        if self.history is not None:
+            self.history.record(Move(building, row, col, previous, expansion, before,
+                                     (self.score, self.coins), first_building))
+        return self.score, self.coins
+
+    def undo(self):
+        """Take back the last move and return it, or None if there is nothing to undo."""
+        if self.history is None:
+            return None
+        move = self.history.undo(self.grid, self.scorer, self.frontier)
+        if move is not None:
+            self.score, self.coins = move.before
+            self.first_building = move.first_building
+            self.turn -= 1
+            if move.previous == 'P':
+                self.empty_cells += 1
+        return move
+
+    def redo(self):
+        """Play the last undone move again and return it, or None if there is none."""
+        if self.history is None:
+            return None
+        move = self.history.redo(self.grid, self.scorer, self.frontier)
+        if move is not None:
+            self.score, self.coins = move.after
+            self.first_building = False
+            self.turn += 1
+            if move.previous == 'P':
+                self.empty_cells -= 1
+        return move
+
+    def run(self, policy):
+        """Play until the game is over, asking policy for every move, and return the result."""
+        while not self.is_over():
+            offered = self.offer()
+            building, row, col = policy(self, offered)
+            if building not in offered:
+                raise ValueError(f"Policy chose {building}, which was not offered: {offered}")
+            self.play(building, row, col)
+        return self.result()
+
+    def result(self):
+        """Summarise the game as a JSON-serialisable dict."""
+        return {
+            'mode': self.mode,
+            'rules': self.rules,
+            'seed': self.seed,
+            'turns': self.turn,
+            'score': self.score,
+            'coins': self.coins,
+        }
+
+
+def random_policy(game, offered):
+    """Pick a random offered building and a random legal position."""
+    building = game.rng.choice(offered)
+    if game.mode == 'free_play' or game.first_building:
+        # Every cell is legal, so draw its index instead of listing the board;
+        # this takes the same random number as choosing from legal_positions()
+        cols = len(game.grid[0])
+        return (building, *divmod(game.rng.randrange(len(game.grid) * cols), cols))
+    return building, *game.rng.choice(game.frontier.positions())
+
+
+def greedy_policy(game, offered):
+    """Pick the building and position with the best immediate (score, coins) gain."""
+    scorer = game.scorer
+    best, best_move = None, None
+    for row, col in game.legal_positions():
+        previous = game.grid[row][col]
+        for building in offered:
+            value = scorer.place(building, row, col)
+            if best is None or value > best:
+                best, best_move = value, (building, row, col)
+        scorer.place(previous, row, col)
+    return best_move
+
+
+POLICIES = {
+    'random': random_policy,
+    'greedy': greedy_policy,
+}
+
+
+def play_game(policy, mode='arcade', seed=None, rules=None, max_turns=None):
+    """Play one headless game and return its result dict.
+
+    Free Play games stop after FREE_PLAY_MAX_TURNS unless max_turns says otherwise.
+    """
+    if max_turns is None and mode == 'free_play':
+        max_turns = FREE_PLAY_MAX_TURNS
+    return HeadlessGame(mode, seed, rules, max_turns).run(policy)
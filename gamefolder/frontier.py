@@ -0,0 +1,100 @@
+"""Frontier index: the empty cells next to a building, kept up to date move by move."""
+
+
+class Frontier:
+    """Set of empty cells orthogonally adjacent to at least one building.
+
+    Arcade buildings must touch an existing building, so once the first one
+    is placed a position is legal exactly when it is in the frontier.
+    ``update()`` re-checks only the changed cell and its four neighbours, and
+    ``expand()`` follows expand_grid by moving an offset instead of every
+    cell, so both are O(1). Listing the legal moves costs O(len(frontier))
+    rather than a scan of the whole grid.
+
+    Empty cells just outside the grid are tracked as well, so the cells an
+    expansion adds next to buildings on the old edge are already known.
+    """
+
+    __slots__ = ('cells', 'offset', 'rows', 'cols')
+
+    def __init__(self, rows=0, cols=0):
+        self.cells = set()  # (row, col) pairs relative to offset, possibly outside the grid
+        self.offset = 0
+        self.rows = rows
+        self.cols = cols
+
+    @classmethod
+    def from_grid(cls, grid):
+        """Build the frontier of an existing grid with one pass over its buildings."""
+        frontier = cls(len(grid), len(grid[0]))
+        if hasattr(grid, 'buildings'):  # Sparse boards list their buildings directly
+            positions = [(row, col) for row, col, _ in grid.buildings()]
+        else:
+            positions = [(row, col) for row, cells in enumerate(grid)
+                         for col, building in enumerate(cells) if building != 'P']
+        for row, col in positions:
+            frontier.update(grid, row, col)
+        return frontier
+
+    def copy(self):
+        frontier = Frontier(self.rows, self.cols)
+        frontier.cells = self.cells.copy()
+        frontier.offset = self.offset
+        return frontier
+
+    def _is_building(self, grid, row, col):
+        return 0 <= row < self.rows and 0 <= col < self.cols and grid[row][col] != 'P'
+
+    def _check(self, grid, row, col):
+        key = (row - self.offset, col - self.offset)
+        if (not self._is_building(grid, row, col)
+                and (self._is_building(grid, row - 1, col) or self._is_building(grid, row + 1, col)
+                     or self._is_building(grid, row, col - 1)
+                     or self._is_building(grid, row, col + 1))):
+            self.cells.add(key)
+        else:
+            self.cells.discard(key)
+
+    def update(self, grid, row, col):
+        """Refresh the frontier after the cell at (row, col) of grid changed."""
+        self.rows, self.cols = len(grid), len(grid[0])
+        self._check(grid, row, col)
+        self._check(grid, row - 1, col)
+        self._check(grid, row + 1, col)
+        self._check(grid, row, col - 1)
+        self._check(grid, row, col + 1)
+
+    def expand(self, expansion_size=5):
+        """Follow expand_grid, which moves every cell expansion_size down and right."""
+        self.offset += expansion_size
+        self.rows += 2 * expansion_size
+        self.cols += 2 * expansion_size
+
+    def shrink(self, expansion_size=5):
+        """Undo expand()."""
+        self.offset -= expansion_size
+        self.rows -= 2 * expansion_size
+        self.cols -= 2 * expansion_size
+
+    def __contains__(self, position):
+        row, col = position
+        return (0 <= row < self.rows and 0 <= col < self.cols
+                and (row - self.offset, col - self.offset) in self.cells)
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+    def __iter__(self):
+        offset, rows, cols = self.offset, self.rows, self.cols
+        for row, col in self.cells:
+            row += offset
+            col += offset
+            if 0 <= row < rows and 0 <= col < cols:
+                yield row, col
+
+    def positions(self):
+        """Return the frontier as a list of (row, col) in row-major order."""
+        # A list first: sorted(self) would walk the cells once more through __len__
+        positions = list(iter(self))
+        positions.sort()
+        return positions
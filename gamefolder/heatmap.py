@@ -0,0 +1,192 @@
+"""Placement heatmaps: the score and coin change of placing a building on every cell at once.
+
+Placing building B on a cell changes the board's totals in three ways:
+
+``own``          the cell's table value, for B instead of what was there
+``neighbours``   each neighbouring building's neighbour key gains B's key and
+                 loses the old one, moving it to another slot of its table
+``board``        the board-wide terms, through one more B and one fewer of
+                 the old building
+
+All three are lookups on the neighbour keys of the cell and of its
+neighbours, so a whole heatmap costs a handful of lookups per cell instead
+of rescoring the board per candidate. Small windows are computed in one
+Python loop; windows of at least NUMPY_CELLS cells are computed as array
+operations when NumPy is installed. Both equal the change in
+``rules.evaluate`` of the board before and after the move.
+"""
+
+from collections import namedtuple
+
+from rules import CODE_BUILDINGS, NEIGHBOUR_KEYS, TABLE_STRIDE, board_score, get_rules
+
+# Windows with at least this many cells use NumPy, when it is installed
+NUMPY_CELLS = 4096
+
+Heatmap = namedtuple('Heatmap', 'building top left scores coins')
+Heatmap.__doc__ = """Score and coin changes of placing building on each cell of a window.
+
+scores[i][j] and coins[i][j] belong to cell (top + i, left + j).
+"""
+
+_SIDES = ((-1, 0), (1, 0), (0, -1), (0, 1))
+
+
+def _board_changes(compiled, building, counts):
+    """Return {old building: change in the board terms when building replaces it}."""
+    if not compiled.board_terms:
+        return dict.fromkeys(CODE_BUILDINGS, 0)
+    before = board_score(compiled, counts)
+    changes = {}
+    for old in CODE_BUILDINGS:
+        after = dict(counts)
+        after[old] = after.get(old, 0) - 1
+        after[building] = after.get(building, 0) + 1
+        changes[old] = board_score(compiled, after) - before
+    return changes
+
+
+def _count_buildings(grid):
+    counts = dict.fromkeys(CODE_BUILDINGS, 0)
+    if hasattr(grid, 'buildings'):  # Sparse boards only list their buildings
+        for _, _, building in grid.buildings():
+            counts[building] += 1
+    else:
+        for row in grid:
+            for building in row:
+                counts[building] += 1
+    return counts
+
+
+def _python_changes(block, top, left, rows, cols, building, compiled, board):
+    """Compute the changes of the rows x cols window at (top, left) of block in one loop."""
+    table, offsets, keys = compiled.table, compiled.offsets, NEIGHBOUR_KEYS
+    height, width = len(block), len(block[0])
+    # Neighbour keys of every cell of the block, with an empty cell all around
+    padded = [[0] * (width + 2)]
+    padded += [[0] + [keys[cell] for cell in row] + [0] for row in block]
+    padded.append([0] * (width + 2))
+    sums = [[0] * (width + 2) for _ in range(height + 2)]
+    for i in range(1, height + 1):
+        above, current, below, out = padded[i - 1], padded[i], padded[i + 1], sums[i]
+        for j in range(1, width + 1):
+            out[j] = above[j] + below[j] + current[j - 1] + current[j + 1]
+    cells = [['P'] * (width + 2)] + [['P'] + list(row) + ['P'] for row in block] + [['P'] * (width + 2)]
+
+    placed, placed_key = offsets[building], keys[building]
+    scores, coins = [], []
+    for i in range(top + 1, top + rows + 1):
+        score_row, coin_row = [], []
+        for j in range(left + 1, left + cols + 1):
+            old = cells[i][j]
+            key = sums[i][j]
+            new_score, new_coins = table[placed + key]
+            old_score, old_coins = table[offsets[old] + key]
+            score = new_score - old_score + board[old]
+            coin = new_coins - old_coins
+            change = placed_key - keys[old]
+            if change:
+                for di, dj in _SIDES:
+                    neighbour = cells[i + di][j + dj]
+                    if neighbour != 'P':
+                        index = offsets[neighbour] + sums[i + di][j + dj]
+                        new_score, new_coins = table[index + change]
+                        old_score, old_coins = table[index]
+                        score += new_score - old_score
+                        coin += new_coins - old_coins
+            score_row.append(score)
+            coin_row.append(coin)
+        scores.append(score_row)
+        coins.append(coin_row)
+    return scores, coins
+
+
+def _numpy_changes(block, top, left, rows, cols, building, rules, board):
+    """Compute the changes of the rows x cols window at (top, left) of block with array operations."""
+    import numpy as np
+    import npscoring
+
+    score_table, coin_table = npscoring.lookup_tables(rules)
+    codes = np.pad(npscoring.encode_grid(block).astype(np.int64), 1)
+    sums = np.pad(npscoring.neighbour_key_sums(codes[1:-1, 1:-1]).astype(np.int64), 1)
+    keys = np.array([NEIGHBOUR_KEYS[kind] for kind in CODE_BUILDINGS], dtype=np.int64)
+    window = (slice(top + 1, top + rows + 1), slice(left + 1, left + cols + 1))
+    old, key = codes[window], sums[window]
+    placed = CODE_BUILDINGS.index(building) * TABLE_STRIDE + key
+    index = old * TABLE_STRIDE + key
+    scores = score_table[placed] - score_table[index]
+    scores += np.array([board[kind] for kind in CODE_BUILDINGS], dtype=np.int64)[old]
+    coins = coin_table[placed] - coin_table[index]
+    change = NEIGHBOUR_KEYS[building] - keys[old]
+    for di, dj in _SIDES:
+        side = (slice(top + 1 + di, top + rows + 1 + di), slice(left + 1 + dj, left + cols + 1 + dj))
+        neighbour = codes[side]
+        index = neighbour * TABLE_STRIDE + sums[side]
+        # Empty neighbours (and the padding) score nothing whatever their key
+        moved = np.where(neighbour > 0, index + change, index)
+        scores += score_table[moved] - score_table[index]
+        coins += coin_table[moved] - coin_table[index]
+    return scores.tolist(), coins.tolist()
+
+
+def heatmap(grid, building, rules='arcade', window=None, counts=None):
+    """Return the Heatmap of placing building on every cell of grid, or of a window of it.
+
+    ``window`` is (top, left, rows, cols), e.g. a renderer's viewport; the
+    cells around it are only read as neighbours. ``counts`` are the number
+    of each building on the board (IncrementalScorer.counts), needed only
+    by rule sets with board-wide terms; without them the board is counted.
+    Every cell gets a value, an occupied one for replacing its building as
+    in Free Play; which cells are legal moves is up to the caller.
+    """
+    compiled = get_rules(rules)
+    height, width = len(grid), len(grid[0])
+    top, left, rows, cols = (0, 0, height, width) if window is None else window
+    top, left = max(0, top), max(0, left)
+    rows, cols = min(rows, height - top), min(cols, width - left)
+
+    if counts is None and compiled.board_terms:
+        counts = _count_buildings(grid)
+    board = _board_changes(compiled, building, counts)
+
+    # Two cells of margin: the cells next to the window need their own neighbours
+    first_row, first_col = max(0, top - 2), max(0, left - 2)
+    last_row, last_col = min(height, top + rows + 2), min(width, left + cols + 2)
+    block = [list(grid[row][first_col:last_col]) for row in range(first_row, last_row)]
+    args = (block, top - first_row, left - first_col, rows, cols, building)
+
+    use_numpy = False
+    if rows * cols >= NUMPY_CELLS:
+        import npscoring  # Imports NumPy, which small windows do without
+        use_numpy = npscoring.available()
+    if use_numpy:
+        scores, coins = _numpy_changes(*args, rules, board)
+    else:
+        scores, coins = _python_changes(*args, compiled, board)
+    return Heatmap(building, top, left, scores, coins)
+
+
+def format_heatmap(grid, result, values, legal):
+    """Return the lines of a map of values (result.scores or result.coins) over its window.
+
+    Cells where legal(row, col) is false show their building, or '.' when empty.
+    """
+    last_row = result.top + len(values) - 1
+    last_col = result.left + len(values[0]) - 1
+    cells = []
+    for i, row in enumerate(values):
+        line = []
+        for j, value in enumerate(row):
+            building = grid[result.top + i][result.left + j]
+            if legal(result.top + i, result.left + j):
+                line.append(f"{value:+d}" if value else '0')
+            else:
+                line.append('.' if building == 'P' else building)
+        cells.append(line)
+    width = max(len(str(last_col)), max(len(cell) for line in cells for cell in line))
+    label = len(str(last_row))
+    lines = [' ' * label + ' ' + ' '.join(f"{col:>{width}}"
+                                          for col in range(result.left, last_col + 1))]
+    for i, line in enumerate(cells):
+        lines.append(f"{result.top + i:>{label}} " + ' '.join(f"{cell:>{width}}" for cell in line))
+    return lines
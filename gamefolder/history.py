@@ -0,0 +1,71 @@
+"""Undo and redo of moves, stored as inverse deltas.
+
+A move changes one cell, the running totals and, in Free Play, possibly the
+size of the board. Its Move record keeps exactly what is needed to take it
+back or play it again: the building and the one it replaced, the expansion
+it caused, and the (score, coins) before and after. Each record is a small
+tuple, so a step of history costs O(1) memory however big the board, and
+undoing or redoing touches only the cell and its neighbours (through
+IncrementalScorer.place) and moves the board's origin back (through
+ChunkedBoard.shrink). Totals are restored from the record, never rescored.
+"""
+
+from collections import deque, namedtuple
+
+# before and after are (score, coins); first_building is the flag before the move
+Move = namedtuple('Move', 'building row col previous expansion before after first_building')
+
+
+class History:
+    """Undo and redo stacks of Moves, keeping at most limit moves to undo (default: all)."""
+
+    def __init__(self, limit=None):
+        self._done = deque(maxlen=limit)
+        self._undone = []
+
+    def record(self, move):
+        """Add a move just played; it can no longer be followed by the moves undone before it."""
+        self._done.append(move)
+        self._undone.clear()
+
+    def can_undo(self):
+        return bool(self._done)
+
+    def can_redo(self):
+        return bool(self._undone)
+
+    def undo(self, grid, scorer, frontier=None):
+        """Take back the last move on grid, scorer and frontier and return it, or None.
+
+        The caller restores the score and coins from ``move.before``.
+        """
+        if not self._done:
+            return None
+        move = self._done.pop()
+        if move.expansion:
+            grid.shrink(move.expansion)
+            if frontier is not None:
+                frontier.shrink(move.expansion)
+        scorer.place(move.previous, move.row, move.col)
+        if frontier is not None:
+            frontier.update(grid, move.row, move.col)
+        self._undone.append(move)
+        return move
+
+    def redo(self, grid, scorer, frontier=None):
+        """Play the last undone move again and return it, or None.
+
+        The caller restores the score and coins from ``move.after``.
+        """
+        if not self._undone:
+            return None
+        move = self._undone.pop()
+        scorer.place(move.building, move.row, move.col)
+        if frontier is not None:
+            frontier.update(grid, move.row, move.col)
+        if move.expansion:
+            grid.expand(move.expansion)
+            if frontier is not None:
+                frontier.expand(move.expansion)
+        self._done.append(move)
+        return move
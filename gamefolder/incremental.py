@@ -0,0 +1,118 @@
+"""Running score and coin totals that update in O(1) per placement."""
+
+from rules import CODE_BUILDINGS, NEIGHBOUR_KEYS, get_rules
+
+
+class IncrementalScorer:
+    """Keep score and coin totals for a grid, re-scoring only what a placement touches.
+
+    ``rules`` names a rule set of ``rules.RULE_SETS``: ``'arcade'``,
+    ``'free_play'`` or ``'npcity'``. Cells are scored from the rule set's
+    compiled lookup table; terms that depend on the whole board (npcity's
+    industry count) come from running counts of every kind of building.
+    """
+
+    def __init__(self, grid, rules='arcade'):
+        self.rules = rules
+        self._set_tables(get_rules(rules))
+        self.grid = grid
+        self.rescan()
+
+    def _set_tables(self, compiled):
+        self._table = compiled.table
+        self._offsets = compiled.offsets
+        self._board_terms = compiled.board_terms
+
+    @property
+    def score(self):
+        score = self.local_score
+        counts = self.counts
+        for building, kind, points in self._board_terms:
+            score += points * counts[building] * counts[kind]
+        return score
+
+    def totals(self):
+        """Return the current (score, coins) pair."""
+        return self.score, self.coins
+
+    def rescan(self):
+        """Recompute the totals from scratch with a full pass over the grid."""
+        self.local_score = 0
+        self.coins = 0
+        self.counts = dict.fromkeys(CODE_BUILDINGS, 0)
+        if hasattr(self.grid, 'buildings'):  # Sparse boards list their buildings directly
+            cells = ((row, col) for row, col, _ in self.grid.buildings())
+        else:
+            cells = ((row, col) for row in range(len(self.grid)) for col in range(len(self.grid[0])))
+        for row, col in cells:
+            self.counts[self.grid[row][col]] += 1
+            cell_score, cell_coins = self._contribution(row, col)
+            self.local_score += cell_score
+            self.coins += cell_coins
+        return self.totals()
+
+    def copy(self):
+        """Return a scorer over a copy of the grid with the same totals, without rescanning."""
+        scorer = IncrementalScorer.__new__(IncrementalScorer)
+        scorer.rules = self.rules
+        scorer._set_tables(get_rules(self.rules))
+        if isinstance(self.grid, list):
+            scorer.grid = [row[:] for row in self.grid]
+        else:
+            scorer.grid = self.grid.copy()
+        scorer.local_score = self.local_score
+        scorer.coins = self.coins
+        scorer.counts = self.counts.copy()
+        return scorer
+
+    def rebind(self, grid):
+        """Follow the grid after expand_grid; padding with 'P' leaves the totals unchanged."""
+        self.grid = grid
+
+    def _contribution(self, row, col):
+        building = self.grid[row][col]
+        if building == 'P':
+            return 0, 0
+        grid = self.grid
+        rows, cols = len(grid), len(grid[0])
+        key = self._offsets[building]
+        if row > 0:
+            key += NEIGHBOUR_KEYS[grid[row - 1][col]]
+        if row < rows - 1:
+            key += NEIGHBOUR_KEYS[grid[row + 1][col]]
+        if col > 0:
+            key += NEIGHBOUR_KEYS[grid[row][col - 1]]
+        if col < cols - 1:
+            key += NEIGHBOUR_KEYS[grid[row][col + 1]]
+        return self._table[key]
+
+    def _touched(self, row, col):
+        rows, cols = len(self.grid), len(self.grid[0])
+        cells = [(row, col)]
+        for r, c in [(row-1, col), (row+1, col), (row, col-1), (row, col+1)]:
+            if 0 <= r < rows and 0 <= c < cols:
+                cells.append((r, c))
+        return cells
+
+    def place(self, building, row, col):
+        """Put building at (row, col), update the totals and return (score, coins).
+
+        Only the placed cell and its four neighbours are re-scored, so the cost
+        does not depend on the size of the grid. Placing over an existing
+        building is handled as a replacement.
+        """
+        cells = self._touched(row, col)
+        for r, c in cells:
+            cell_score, cell_coins = self._contribution(r, c)
+            self.local_score -= cell_score
+            self.coins -= cell_coins
+
+        self.counts[self.grid[row][col]] -= 1
+        self.grid[row][col] = building
+        self.counts[building] += 1
+
+        for r, c in cells:
+            cell_score, cell_coins = self._contribution(r, c)
+            self.local_score += cell_score
+            self.coins += cell_coins
+        return self.totals()
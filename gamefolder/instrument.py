@@ -0,0 +1,223 @@
+"""Opt-in timing of the phases of every turn, exported as JSON or Prometheus text.
+
+Phases: ``input`` (waiting for the player), ``validation`` (choose_building
+without its input waits), ``scoring``, ``expand``, ``render`` and ``io``
+(saves, loads and high scores). Phases nest; each one is charged only the
+time not spent in the phases inside it, so no time is counted twice.
+
+Instrumentation is off unless NGEEANN_PROFILE is set or enable() is called.
+When it is off, phase() returns a shared no-op context manager and timed()
+functions make one extra call, so leaving the hooks in costs next to
+nothing::
+
+    NGEEANN_PROFILE=session python samplegame.py   # writes session.json and session.prom
+"""
+
+import functools
+import os
+import time
+from bisect import bisect_left
+
+PHASES = ('input', 'validation', 'scoring', 'expand', 'render', 'io')
+
+# Upper bounds in seconds of the histogram buckets, as in a Prometheus histogram
+BUCKETS = (0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 30.0)
+
+ENABLED = bool(os.environ.get('NGEEANN_PROFILE'))
+
+
+def log_buckets(smallest, largest, growth):
+    """Return bucket bounds from smallest up to at least largest, each growth times the one before."""
+    bounds = [smallest]
+    while bounds[-1] < largest:
+        bounds.append(bounds[-1] * growth)
+    return tuple(bounds)
+
+
+class Histogram:
+    """Count, sum, max and bucket counts of a stream of durations, in constant memory.
+
+    bounds are the buckets' upper bounds in seconds, ascending; durations
+    above the last one are only counted in count, total and max.
+    """
+
+    __slots__ = ('count', 'total', 'max', 'bounds', 'buckets')
+
+    def __init__(self, bounds=BUCKETS):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.bounds = bounds
+        self.buckets = [0] * len(bounds)
+
+    def add(self, seconds):
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+        i = bisect_left(self.bounds, seconds)
+        if i < len(self.buckets):
+            self.buckets[i] += 1
+
+    def percentile(self, fraction):
+        """Return the upper bound of the bucket holding the given fraction of the durations, at most max."""
+        seen, target = 0, fraction * self.count
+        for bound, count in zip(self.bounds, self.buckets):
+            seen += count
+            if seen >= target:
+                return min(self.max, bound)
+        return self.max
+
+    def to_dict(self):
+        cumulative, counts = 0, {}
+        for bound, count in zip(self.bounds, self.buckets):
+            cumulative += count
+            counts[str(bound)] = cumulative
+        return {
+            'count': self.count,
+            'total_seconds': self.total,
+            'mean_seconds': self.total / self.count if self.count else 0.0,
+            'max_seconds': self.max,
+            'buckets': counts,
+        }
+
+
+class Session:
+    """Phase and turn statistics of one game session."""
+
+    def __init__(self):
+        self.started = time.time()
+        self.phases = {name: Histogram() for name in PHASES}
+        self.turns = Histogram()  # Time of each turn outside input waits
+        self._stack = []  # [phase, start, time spent in nested phases]
+        self._turn_busy = 0.0
+
+    def begin(self, name):
+        self._stack.append([name, time.perf_counter(), 0.0])
+
+    def end(self):
+        name, start, nested = self._stack.pop()
+        elapsed = time.perf_counter() - start
+        own = elapsed - nested
+        self.phases[name].add(own)
+        if name != 'input':
+            self._turn_busy += own
+        if self._stack:
+            self._stack[-1][2] += elapsed
+
+    def end_turn(self):
+        self.turns.add(self._turn_busy)
+        self._turn_busy = 0.0
+
+    def summary(self):
+        return {
+            'started': self.started,
+            'duration_seconds': time.time() - self.started,
+            'turns': self.turns.to_dict(),
+            'phases': {name: histogram.to_dict() for name, histogram in self.phases.items()},
+        }
+
+
+_session = Session()
+
+
+class _Phase:
+    __slots__ = ('name',)
+
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        _session.begin(self.name)
+
+    def __exit__(self, *exc_info):
+        _session.end()
+
+
+class _NoPhase:
+    __slots__ = ()
+
+    def __enter__(self):
+        pass
+
+    def __exit__(self, *exc_info):
+        pass
+
+
+_NO_PHASE = _NoPhase()
+_PHASES = {name: _Phase(name) for name in PHASES}
+
+
+def enable(enabled=True):
+    """Turn instrumentation on (starting a new session) or off."""
+    global ENABLED, _session
+    ENABLED = enabled
+    if enabled:
+        _session = Session()
+
+
+def phase(name):
+    """Context manager timing a block as phase name."""
+    return _PHASES[name] if ENABLED else _NO_PHASE
+
+
+def timed(name):
+    """Decorator timing every call of a function as phase name."""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not ENABLED:
+                return func(*args, **kwargs)
+            _session.begin(name)
+            try:
+                return func(*args, **kwargs)
+            finally:
+                _session.end()
+        return wrapper
+    return decorator
+
+
+def end_turn():
+    """Mark the end of a turn."""
+    if ENABLED:
+        _session.end_turn()
+
+
+def summary():
+    """Return the statistics of the current session as a JSON-serialisable dict."""
+    return _session.summary()
+
+
+def _prometheus_histogram(lines, metric, labels, histogram):
+    prefix = labels + ',' if labels else ''
+    for bound, count in histogram.to_dict()['buckets'].items():
+        lines.append(f'{metric}_bucket{{{prefix}le="{bound}"}} {count}')
+    lines.append(f'{metric}_bucket{{{prefix}le="+Inf"}} {histogram.count}')
+    labels = f'{{{labels}}}' if labels else ''
+    lines.append(f'{metric}_sum{labels} {histogram.total}')
+    lines.append(f'{metric}_count{labels} {histogram.count}')
+
+
+def to_prometheus():
+    """Return the current session in the Prometheus text exposition format."""
+    lines = [
+        '# HELP ngeeann_phase_seconds Time spent in each phase of a turn.',
+        '# TYPE ngeeann_phase_seconds histogram',
+    ]
+    for name, histogram in _session.phases.items():
+        _prometheus_histogram(lines, 'ngeeann_phase_seconds', f'phase="{name}"', histogram)
+    lines += [
+        '# HELP ngeeann_turn_seconds Time of each turn, not counting input waits.',
+        '# TYPE ngeeann_turn_seconds histogram',
+    ]
+    _prometheus_histogram(lines, 'ngeeann_turn_seconds', '', _session.turns)
+    return '\n'.join(lines) + '\n'
+
+
+def write(path):
+    """Write the session to path + '.json' and path + '.prom'."""
+    import json
+    with open(path + '.json', 'w') as f:
+        json.dump(summary(), f, indent=2)
+    with open(path + '.prom', 'w') as f:
+        f.write(to_prometheus())
@@ -0,0 +1,169 @@
+"""Crash-safe saves: periodic snapshots plus an append-only journal of the moves since.
+
+Every placement appends one line (turn, building, row, col) to
+``<save file>.journal``, so saving a turn costs O(1) I/O. Every
+``snapshot_every`` moves the full state is written to a temporary file and
+renamed over the save file, which is never left half-written. A snapshot
+records the turn it was taken at, so loading replays only the journal
+entries after it, and a torn last line from a crash is ignored.
+
+The game modes journal into ``<save file>.recovery`` rather than the save
+itself, so a crash can be recovered from while only an explicit save
+replaces the save file.
+
+Given an autosave.AutosaveWriter, a SaveJournal queues its writes instead:
+a snapshot copies the state and supersedes the moves and snapshot still
+waiting, so the turn loop never waits for the disk.
+"""
+
+import json
+import os
+
+import binsave
+import engine
+import instrument
+from atomicfile import atomic_write
+
+SNAPSHOT_EVERY = 50
+
+
+def journal_filename(filename):
+    return filename + '.journal'
+
+
+def recovery_filename(filename):
+    """Return the file where a game in progress is journalled, next to its save file."""
+    return filename + '.recovery'
+
+
+def write_snapshot(filename, grid, coins, score, turn=0, binary=False, fsync=False):
+    """Write a full game state to filename atomically (temporary file, then rename)."""
+    if binary:
+        binsave.save_binary(filename, grid, coins, score, turn=turn, fsync=fsync)
+        return
+    if hasattr(grid, 'to_grid'):  # ChunkedBoard or a lazily loaded binsave.MappedGrid
+        grid = grid.to_grid()
+    with atomic_write(filename, fsync=fsync) as f:
+        json.dump({'grid': grid, 'coins': coins, 'score': score, 'turn': turn}, f)
+
+
+def copy_grid(grid):
+    """Return a copy of grid that later moves do not change, for a write queued for later."""
+    if hasattr(grid, 'buildings'):  # Sparse boards copy only their chunks
+        return grid.copy()
+    return [list(row) for row in grid]
+
+
+def discard_journal(filename):
+    """Remove the journal of a save file, if there is one."""
+    try:
+        os.remove(journal_filename(filename))
+    except FileNotFoundError:
+        pass
+
+
+def _journal_entries(filename):
+    """Yield (turn, building, row, col) for every complete line of the journal."""
+    try:
+        with open(journal_filename(filename), 'r') as f:
+            for line in f:
+                try:
+                    yield tuple(json.loads(line))
+                except ValueError:
+                    return  # The last line was cut off by a crash
+    except FileNotFoundError:
+        return
+
+
+def read_journal(filename, after_turn=0):
+    """Return the journalled (building, row, col) moves made after the given turn."""
+    return [(building, row, col) for turn, building, row, col in _journal_entries(filename)
+            if turn > after_turn]
+
+
+def replay(grid, coins, moves, mode='arcade', rules=None):
+    """Apply journalled moves to a snapshot and return the resulting (grid, coins, score)."""
+    first_building = mode == 'arcade' and all(cell == 'P' for row in grid for cell in row)
+    game = engine.HeadlessGame.from_state(grid, coins, first_building, mode, rules=rules)
+    for building, row, col in moves:
+        game.play(building, row, col)
+    return game.grid, game.coins, game.score
+
+
+class SaveJournal:
+    """Journal the moves of one game session next to its save file.
+
+    Call snapshot() once with the starting state before recording moves.
+    With a writer (an autosave.AutosaveWriter), the file I/O runs on its
+    thread and fsync follows its policy instead of the fsync argument.
+    """
+
+    def __init__(self, filename, binary=False, snapshot_every=SNAPSHOT_EVERY, fsync=False,
+                 writer=None):
+        self.filename = filename
+        self.binary = binary
+        self.snapshot_every = snapshot_every
+        self.fsync = fsync
+        self.writer = writer
+        if writer is not None:
+            writer.flush()  # The journal on disk must be complete to number the moves
+        # Carry on numbering after any moves already journalled, so that if we
+        # crash before the old journal is emptied they are not replayed twice
+        self.turn = max((entry[0] for entry in _journal_entries(filename)), default=0)
+        self._file = None
+
+    def _run(self, job, *args, replace=False):
+        """Do a write now, or queue it on the writer (replace: it supersedes the queued ones)."""
+        if self.writer is None:
+            job(*args, fsync=self.fsync)
+        else:
+            self.writer.submit(self.filename, job, *args, replace=replace)
+
+    @instrument.timed('io')
+    def snapshot(self, grid, coins, score):
+        """Write the full state and start a new, empty journal."""
+        if self.writer is not None:
+            grid = copy_grid(grid)
+        self._run(self._write_snapshot, grid, coins, score, self.turn, replace=True)
+
+    def _write_snapshot(self, grid, coins, score, turn, fsync=False):
+        write_snapshot(self.filename, grid, coins, score, turn, self.binary, fsync)
+        # The snapshot now holds every journalled move, so the journal can start over
+        if self._file is not None:
+            self._file.close()
+        self._file = open(journal_filename(self.filename), 'w')
+
+    @instrument.timed('io')
+    def record(self, building, row, col, grid, coins, score):
+        """Append one move; grid, coins and score are the state after it, used for snapshots."""
+        self.turn += 1
+        self._run(self._append, json.dumps([self.turn, building, row, col]) + '\n')
+        if self.turn % self.snapshot_every == 0:
+            self.snapshot(grid, coins, score)
+
+    def _append(self, line, fsync=False):
+        self._file.write(line)
+        self._file.flush()
+        if fsync:
+            os.fsync(self._file.fileno())
+
+    def close(self):
+        self._run(self._close)
+
+    def _close(self, fsync=False):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    @instrument.timed('io')
+    def clear(self):
+        """Remove the save and its journal, e.g. once the game is over."""
+        self._run(self._clear, replace=True)
+
+    def _clear(self, fsync=False):
+        self._close()
+        discard_journal(self.filename)
+        try:
+            os.remove(self.filename)
+        except FileNotFoundError:
+            pass
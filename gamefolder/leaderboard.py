@@ -0,0 +1,139 @@
+"""SQLite leaderboard with one board per game mode.
+
+Scores are indexed by (mode, score), so adding a score is O(log n) and the
+top k of a board are read in O(k) without loading the rest. Pages are
+fetched with keyset pagination, so paging deep into a long history stays
+cheap. SQLite's file locking (with a busy timeout) lets several processes
+add scores to the same file without losing any. The file is opened in WAL
+mode, so readers do not block the writer; where WAL is not available (e.g.
+on some network file systems) it falls back to SQLite's default rollback
+journal.
+"""
+
+import json
+import os
+import sqlite3
+from datetime import datetime
+
+LEADERBOARD_FILE = 'high_scores.db'
+
+# The entries of the old high_scores.json each game wrote: samplegame.py kept
+# dicts with 'score' and 'date', npcity.py plain integers
+JSON_FORMATS = {'arcade': dict, 'npcity': int}
+
+
+class Leaderboard:
+    """Per-mode high score boards stored in a SQLite file."""
+
+    def __init__(self, filename=LEADERBOARD_FILE, timeout=30.0, wal=True):
+        self.filename = filename
+        # Autocommit: every insert is its own transaction, serialised by SQLite's lock
+        self.connection = sqlite3.connect(filename, timeout=timeout, isolation_level=None)
+        self.journal_mode = None
+        if wal:
+            # SQLite answers with the mode it is really in, which is not 'wal' if it could not switch
+            self.journal_mode = self.connection.execute('PRAGMA journal_mode=WAL').fetchone()[0]
+        if self.journal_mode != 'wal':
+            self.journal_mode = self.connection.execute('PRAGMA journal_mode=DELETE').fetchone()[0]
+        self.connection.execute(
+            'CREATE TABLE IF NOT EXISTS scores ('
+            ' id INTEGER PRIMARY KEY,'
+            ' mode TEXT NOT NULL,'
+            ' score INTEGER NOT NULL,'
+            ' date TEXT NOT NULL)')
+        self.connection.execute(
+            'CREATE INDEX IF NOT EXISTS scores_by_mode ON scores (mode, score DESC, id)')
+        self.connection.execute(
+            'CREATE TABLE IF NOT EXISTS imported ('
+            ' filename TEXT NOT NULL,'
+            ' mode TEXT NOT NULL,'
+            ' PRIMARY KEY (filename, mode))')
+
+    def close(self):
+        self.connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def add(self, score, mode='arcade', date=None):
+        """Add a score to a mode's board; date defaults to now."""
+        date = date or datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        self.connection.execute('INSERT INTO scores (mode, score, date) VALUES (?, ?, ?)',
+                                (mode, score, date))
+
+    def add_many(self, entries):
+        """Add (score, mode, date) entries in a single transaction."""
+        with self.connection:
+            self.connection.execute('BEGIN IMMEDIATE')
+            self.connection.executemany(
+                'INSERT INTO scores (score, mode, date) VALUES (?, ?, ?)', entries)
+
+    def top(self, k=10, mode='arcade'):
+        """Return the k best scores of a board as dicts with 'score' and 'date'."""
+        return self.page(mode, k)[0]
+
+    def page(self, mode='arcade', page_size=10, after=None):
+        """Return (entries, cursor) for one page of a board, best scores first.
+
+        Pass the returned cursor as after to get the next page; it is None
+        after the last page.
+        """
+        if after is None:
+            rows = self.connection.execute(
+                'SELECT score, date, id FROM scores WHERE mode = ?'
+                ' ORDER BY score DESC, id LIMIT ?', (mode, page_size)).fetchall()
+        else:
+            score, row_id = after
+            rows = self.connection.execute(
+                'SELECT score, date, id FROM scores WHERE mode = ?'
+                ' AND (score < ? OR (score = ? AND id > ?))'
+                ' ORDER BY score DESC, id LIMIT ?',
+                (mode, score, score, row_id, page_size)).fetchall()
+        entries = [{'score': score, 'date': date} for score, date, _ in rows]
+        cursor = (rows[-1][0], rows[-1][2]) if len(rows) == page_size else None
+        return entries, cursor
+
+    def count(self, mode='arcade'):
+        return self.connection.execute(
+            'SELECT COUNT(*) FROM scores WHERE mode = ?', (mode,)).fetchone()[0]
+
+    def _was_imported(self, key, mode):
+        return self.connection.execute(
+            'SELECT 1 FROM imported WHERE filename = ? AND mode = ?', (key, mode)).fetchone()
+
+    def import_json(self, filename, mode='arcade'):
+        """Import an old high_scores.json into a mode's board once. Returns the number of scores imported.
+
+        Only the entries in the format of the mode's game (see JSON_FORMATS)
+        are imported, so a file both games wrote to gives each board its own
+        scores. The same file may be imported once into each board.
+        """
+        entry_type = JSON_FORMATS.get(mode, ())  # Other modes had no high_scores.json
+        key = os.path.abspath(filename)
+        if self._was_imported(key, mode):
+            return 0
+        try:
+            with open(filename, 'r') as f:
+                high_scores = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            high_scores = []
+        entries = []
+        for entry in high_scores:
+            if not isinstance(entry, entry_type):
+                continue  # Written by the other game
+            if isinstance(entry, dict):
+                entries.append((entry['score'], mode, entry.get('date', '')))
+            else:
+                entries.append((entry, mode, ''))
+        with self.connection:
+            self.connection.execute('BEGIN IMMEDIATE')
+            if self._was_imported(key, mode):
+                return 0  # Another process imported it first
+            self.connection.executemany(
+                'INSERT INTO scores (score, mode, date) VALUES (?, ?, ?)', entries)
+            self.connection.execute('INSERT INTO imported (filename, mode) VALUES (?, ?)',
+                                    (key, mode))
+        return len(entries)
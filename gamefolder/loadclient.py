@@ -0,0 +1,194 @@
+"""Load client for server.py: many idle sessions plus players making moves as fast as they can.
+
+Idle sessions log in and wait at the menu for the whole run. Players play
+Arcade games back to back, filling the grid row by row and never building
+Industry, so no coins are earned and every game lasts 16 moves. The latency
+of a move is the time from sending its column to receiving the next
+prompt, which covers validation, scoring, drawing the board and the
+network round trip::
+
+    python loadclient.py --spawn --sessions 5000 --players 100 --moves 50
+"""
+
+import argparse
+import asyncio
+import os
+import re
+import signal
+import subprocess
+import sys
+import time
+
+from server import PROMPT, raise_open_file_limit
+
+ARCADE_SIZE = 20
+
+
+class Connection:
+    """A protocol connection that reads output up to the next prompt."""
+
+    def __init__(self, reader, writer):
+        self.reader = reader
+        self.writer = writer
+
+    @classmethod
+    async def open(cls, host, port):
+        return cls(*await asyncio.open_connection(host, port))
+
+    async def prompt(self):
+        """Return (output lines, prompt) up to and including the next prompt."""
+        lines = []
+        while True:
+            line = await self.reader.readline()
+            if not line:
+                raise ConnectionResetError("Server closed the connection")
+            line = line.decode().rstrip('\n')
+            if line.startswith(PROMPT):
+                return lines, line[len(PROMPT):]
+            lines.append(line)
+
+    def send(self, answer):
+        self.writer.write(f'{answer}\n'.encode())
+
+    async def login(self, name):
+        await self.prompt()
+        self.send(name)
+        return await self.prompt()
+
+    def close(self):
+        self.writer.close()
+
+
+async def idle_session(host, port, index, connected, stop):
+    connection = await Connection.open(host, port)
+    try:
+        await connection.login(f'idle{index}')
+        connected.append(index)
+        await stop.wait()
+    finally:
+        connection.close()
+
+
+async def player(host, port, index, moves, latencies):
+    """Play Arcade games until moves moves have been made."""
+    connection = await Connection.open(host, port)
+    try:
+        _, prompt = await connection.login(f'player{index}')
+        position, offered = 0, []
+        while moves > 0:
+            if prompt.startswith("Choose option"):
+                connection.send('1')
+            elif prompt.startswith("Do you want to load"):
+                connection.send('n')
+                position = 0
+            elif prompt.startswith("Choose which building"):
+                # Anything but Industry, so no coins are earned
+                connection.send(next(b for b in offered if b != 'I'))
+            elif prompt.startswith("Enter the row"):
+                connection.send(position // ARCADE_SIZE)
+            elif prompt.startswith("Enter the column"):
+                connection.send(position % ARCADE_SIZE)
+                position += 1
+                moves -= 1
+                start = time.perf_counter()
+                lines, prompt = await connection.prompt()
+                latencies.append(time.perf_counter() - start)
+                continue
+            elif prompt.startswith("Do you want to save"):
+                connection.send('n')
+            else:
+                raise ValueError(f"Unexpected prompt: {prompt}")
+            lines, prompt = await connection.prompt()
+            for line in lines:
+                if line.startswith("Randomly selected buildings:"):
+                    offered = re.findall(r"'(.)'", line)
+        connection.send('4' if prompt.startswith("Choose option") else '')
+    finally:
+        connection.close()
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(fraction * len(values)))]
+
+
+async def run_load(host, port, sessions, players, moves):
+    """Open the idle sessions, run the players and return the stats of their moves."""
+    connected, stop = [], asyncio.Event()
+    idle = []
+    for index in range(sessions):
+        idle.append(asyncio.create_task(idle_session(host, port, index, connected, stop)))
+        if index % 500 == 499:
+            await asyncio.sleep(0)  # Let the server keep up with the accepts
+    while len(connected) < sessions:
+        await asyncio.sleep(0.05)
+        failed = [task for task in idle if task.done() and task.exception()]
+        if failed:
+            raise failed[0].exception()
+
+    latencies = []
+    start = time.perf_counter()
+    await asyncio.gather(*(player(host, port, index, moves, latencies)
+                           for index in range(players)))
+    elapsed = time.perf_counter() - start
+    stop.set()
+    await asyncio.gather(*idle)
+    return {
+        'idle_sessions': sessions,
+        'players': players,
+        'moves': len(latencies),
+        'moves_per_second': len(latencies) / elapsed,
+        'p50_ms': percentile(latencies, 0.50) * 1000,
+        'p90_ms': percentile(latencies, 0.90) * 1000,
+        'p99_ms': percentile(latencies, 0.99) * 1000,
+        'max_ms': max(latencies) * 1000,
+    }
+
+
+def spawn_server(port, workdir):
+    """Start server.py in its own process and wait until it accepts connections."""
+    server = subprocess.Popen(
+        [sys.executable, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'server.py'),
+         '--port', str(port), '--save-dir', os.path.join(workdir, 'saves'),
+         '--leaderboard', os.path.join(workdir, 'high_scores.db')],
+        stdout=subprocess.PIPE, text=True)
+    line = server.stdout.readline()
+    if not line.startswith("Listening"):
+        server.kill()
+        raise RuntimeError("The server did not start")
+    return server
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Load test for the game server.")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--sessions', type=int, default=1000, help="idle sessions held open")
+    parser.add_argument('--players', type=int, default=50, help="sessions making moves")
+    parser.add_argument('--moves', type=int, default=50, help="moves per player")
+    parser.add_argument('--spawn', action='store_true',
+                        help="start a server with its files in a temporary directory")
+    args = parser.parse_args(argv)
+
+    raise_open_file_limit()
+    server = None
+    if args.spawn:
+        import tempfile
+        workdir = tempfile.TemporaryDirectory()
+        server = spawn_server(args.port, workdir.name)
+    try:
+        stats = asyncio.run(run_load(args.host, args.port, args.sessions, args.players,
+                                     args.moves))
+    finally:
+        if server is not None:
+            server.send_signal(signal.SIGINT)  # Lets it write the queued scores
+            print(server.communicate()[0], end='')
+            workdir.cleanup()
+    print(f"{stats['idle_sessions']} idle sessions, {stats['players']} players: "
+          f"{stats['moves']} moves at {stats['moves_per_second']:.0f} moves/s")
+    print(f"move latency p50 {stats['p50_ms']:.2f} ms, p90 {stats['p90_ms']:.2f} ms, "
+          f"p99 {stats['p99_ms']:.2f} ms, max {stats['max_ms']:.2f} ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,98 @@
+"""NumPy scoring backend: grids as int8 code arrays, neighbours summed with shifted arrays."""
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from rules import CODE_BUILDINGS, NEIGHBOUR_KEYS, TABLE_STRIDE, board_score, get_rules
+
+BUILDING_CODES = {building: code for code, building in enumerate(CODE_BUILDINGS)}
+
+_lookup = None
+_tables_cache = {}
+_KEYS_BY_CODE = None if np is None else np.array(
+    [NEIGHBOUR_KEYS[building] for building in CODE_BUILDINGS], dtype=np.int32)
+
+
+def available():
+    """Return True if NumPy is installed and this backend can be used."""
+    return np is not None
+
+
+def encode_grid(grid):
+    """Convert a list-of-lists grid into an int8 code array (arrays are returned as is)."""
+    global _lookup
+    if isinstance(grid, np.ndarray):
+        return grid
+    if hasattr(grid, 'to_grid'):  # sparseboard.ChunkedBoard
+        grid = grid.to_grid()
+    if _lookup is None:
+        _lookup = np.zeros(128, dtype=np.int8)
+        for building, code in BUILDING_CODES.items():
+            _lookup[ord(building)] = code
+    chars = np.array(grid, dtype='<U1').view(np.uint32)
+    return _lookup[np.minimum(chars, 127)]
+
+
+def decode_grid(codes):
+    """Convert an int8 code array back into a list-of-lists grid."""
+    return [[CODE_BUILDINGS[code] for code in row] for row in codes.tolist()]
+
+
+def _neighbour_sums(values):
+    """Sum, for every cell, the values of its four neighbours."""
+    sums = np.zeros(values.shape, dtype=values.dtype)
+    sums[1:, :] += values[:-1, :]
+    sums[:-1, :] += values[1:, :]
+    sums[:, 1:] += values[:, :-1]
+    sums[:, :-1] += values[:, 1:]
+    return sums
+
+
+def neighbour_key_sums(codes):
+    """Return every cell's neighbour key: the sum of the NEIGHBOUR_KEYS of its four neighbours."""
+    return _neighbour_sums(_KEYS_BY_CODE[codes])
+
+
+def _tables(rules):
+    """Return the rule set's compiled rules with its score and coin tables as arrays."""
+    tables = _tables_cache.get(rules)
+    if tables is None:
+        compiled = get_rules(rules)
+        scores = np.array([score for score, _ in compiled.table], dtype=np.int64)
+        coins = np.array([coins for _, coins in compiled.table], dtype=np.int64)
+        tables = _tables_cache[rules] = compiled, scores, coins
+    return tables
+
+
+def tile_totals(codes, rules='arcade', rows=slice(None), cols=slice(None)):
+    """Return (score, coins, building counts) of the cells codes[rows, cols].
+
+    The cells around the tile are only read as neighbours, so a tile cut
+    out of a bigger board with a one-cell halo scores exactly like the same
+    cells of the whole board. Board-wide terms are left to the caller, who
+    gets the count of every building code to compute them.
+    """
+    _, scores, coins = _tables(rules)
+    neighbour_keys = neighbour_key_sums(codes)[rows, cols]
+    inner = codes[rows, cols]
+    index = inner.astype(np.int32) * TABLE_STRIDE + neighbour_keys
+    counts = np.bincount(inner.ravel(), minlength=len(CODE_BUILDINGS))
+    return int(scores[index].sum()), int(coins[index].sum()), counts.tolist()
+
+
+def lookup_tables(rules):
+    """Return the (score, coins) lookup tables of a rule set as two int64 arrays."""
+    return _tables(rules)[1:]
+
+
+def score_and_coins(grid, rules='arcade'):
+    """Return (score, coins) for grid under the given rule set.
+
+    ``rules`` names a rule set of ``rules.RULE_SETS``. Every cell's table
+    index is computed at once from the sums of its neighbours' keys, the
+    same lookup ``incremental.IncrementalScorer`` does one cell at a time.
+    """
+    score, coins, counts = tile_totals(encode_grid(grid), rules)
+    return score + board_score(get_rules(rules), dict(zip(CODE_BUILDINGS, counts))), coins
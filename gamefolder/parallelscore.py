@@ -0,0 +1,172 @@
+"""Tile-parallel scoring of huge boards across a process pool.
+
+The board is encoded once into a block of shared memory, one byte per cell
+(the codes of ``rules.CODE_BUILDINGS``), and cut into square tiles. Each
+worker attaches to the block and scores the cells of one tile, reading the
+one-cell halo around it only as neighbours, so no cell is scored twice and
+every neighbour is seen. Tiles are scored with NumPy when it is installed
+and otherwise with a pure Python scan that skips runs of empty cells.
+Workers return the local score, coins and building counts of their tile;
+the sums plus the board-wide terms equal the serial result exactly.
+
+Measure the scaling on this machine::
+
+    python parallelscore.py --size 6000 --workers 1 2 4 8
+"""
+
+import argparse
+import os
+import re
+import time
+from multiprocessing import shared_memory
+
+import npscoring
+from pools import get_pool
+from rules import CODE_BUILDINGS, NEIGHBOUR_KEYS, TABLE_STRIDE, board_score, get_rules
+
+TILE_SIZE = 1024
+
+_ENCODE = bytes.maketrans(CODE_BUILDINGS.encode(), bytes(range(len(CODE_BUILDINGS))))
+_KEYS_BY_CODE = [NEIGHBOUR_KEYS[building] for building in CODE_BUILDINGS]
+_BUILDING = re.compile(rb'[^\x00]')
+
+
+def encode_into(buffer, grid):
+    """Write the cell codes of grid into buffer, which must start out zeroed (all 'P')."""
+    rows, cols = len(grid), len(grid[0])
+    if hasattr(grid, 'buildings'):  # Sparse boards only write their buildings
+        for row, col, building in grid.buildings():
+            buffer[row * cols + col] = CODE_BUILDINGS.index(building)
+        return
+    for row in range(rows):
+        buffer[row * cols:(row + 1) * cols] = ''.join(grid[row]).encode().translate(_ENCODE)
+
+
+def tiles(rows, cols, tile_size=TILE_SIZE):
+    """Return the (first row, end row, first col, end col) of every tile."""
+    return [(r0, min(r0 + tile_size, rows), c0, min(c0 + tile_size, cols))
+            for r0 in range(0, rows, tile_size) for c0 in range(0, cols, tile_size)]
+
+
+def _python_tile(buffer, rows, cols, tile, compiled):
+    """Score one tile in Python, looking up neighbour keys only around buildings."""
+    r0, r1, c0, c1 = tile
+    table, keys = compiled.table, _KEYS_BY_CODE
+    lo, hi = max(c0 - 1, 0), min(c1 + 1, cols)  # Columns of the tile and its halo
+    start, end = c0 - lo, c1 - lo
+    empty = bytes(hi - lo + 2)
+
+    def row_codes(row):
+        # Padded with an empty cell at each end, so every cell has four neighbours
+        if 0 <= row < rows:
+            return b'\0' + bytes(buffer[row * cols + lo:row * cols + hi]) + b'\0'
+        return empty
+
+    score = coins = 0
+    counts = [0] * len(CODE_BUILDINGS)
+    above, current = row_codes(r0 - 1), row_codes(r0)
+    for row in range(r0, r1):
+        below = row_codes(row + 1)
+        if current.count(0, start + 1, end + 1) * 2 > end - start:
+            # Mostly empty: let the regex engine skip the empty runs
+            for match in _BUILDING.finditer(current, start + 1, end + 1):
+                x = match.start()
+                cell_score, cell_coins = table[current[x] * TABLE_STRIDE + keys[above[x]]
+                                               + keys[below[x]] + keys[current[x - 1]]
+                                               + keys[current[x + 1]]]
+                score += cell_score
+                coins += cell_coins
+        else:
+            up, down, middle = ([keys[code] for code in codes] for codes in (above, below, current))
+            for x in range(start + 1, end + 1):
+                code = current[x]
+                if code:
+                    cell_score, cell_coins = table[code * TABLE_STRIDE + up[x] + down[x]
+                                                   + middle[x - 1] + middle[x + 1]]
+                    score += cell_score
+                    coins += cell_coins
+        for code in range(1, len(CODE_BUILDINGS)):
+            counts[code] += current.count(code, start + 1, end + 1)
+        above, current = current, below
+    return score, coins, counts
+
+
+def _tile_totals(buffer, rows, cols, tile, rules):
+    """Return (score, coins, building counts) of one tile of an encoded board."""
+    if not npscoring.available():
+        return _python_tile(buffer, rows, cols, tile, get_rules(rules))
+    import numpy as np
+    r0, r1, c0, c1 = tile
+    board = np.frombuffer(buffer, dtype=np.uint8, count=rows * cols).reshape(rows, cols)
+    row_lo, col_lo = max(r0 - 1, 0), max(c0 - 1, 0)
+    halo = board[row_lo:min(r1 + 1, rows), col_lo:min(c1 + 1, cols)]
+    return npscoring.tile_totals(halo, rules, slice(r0 - row_lo, r1 - row_lo),
+                                 slice(c0 - col_lo, c1 - col_lo))
+
+
+def score_tile(name, rows, cols, tile, rules):
+    """Worker: attach to the shared board called name and score one of its tiles."""
+    block = shared_memory.SharedMemory(name=name)
+    try:
+        return _tile_totals(block.buf, rows, cols, tile, rules)
+    finally:
+        block.close()
+
+
+def score_and_coins(grid, rules='arcade', workers=None, tile_size=TILE_SIZE):
+    """Return (score, coins) for grid, scoring its tiles in parallel.
+
+    workers is the number of processes (default: one per CPU; 1 scores the
+    tiles in this process). The result always equals ``rules.evaluate``.
+    """
+    compiled = get_rules(rules)
+    rows, cols = len(grid), len(grid[0])
+    workers = workers or os.cpu_count() or 1
+    block = shared_memory.SharedMemory(create=True, size=max(1, rows * cols))
+    try:
+        encode_into(block.buf, grid)
+        jobs = tiles(rows, cols, tile_size)
+        if workers == 1:
+            results = [_tile_totals(block.buf, rows, cols, tile, rules) for tile in jobs]
+        else:
+            pool = get_pool(workers)
+            results = list(pool.map(score_tile, [block.name] * len(jobs), [rows] * len(jobs),
+                                    [cols] * len(jobs), jobs, [rules] * len(jobs)))
+    finally:
+        block.close()
+        block.unlink()
+    score = sum(result[0] for result in results)
+    coins = sum(result[1] for result in results)
+    counts = {building: sum(result[2][code] for result in results)
+              for code, building in enumerate(CODE_BUILDINGS)}
+    return score + board_score(compiled, counts), coins
+
+
+def main(argv=None):
+    import benchmarks
+    import rules
+
+    parser = argparse.ArgumentParser(description="Benchmark tile-parallel scoring.")
+    parser.add_argument('--size', type=int, default=6000, help="board side in cells")
+    parser.add_argument('--density', type=float, default=0.5)
+    parser.add_argument('--rules', choices=sorted(rules.RULE_SETS), default='free_play')
+    parser.add_argument('--workers', type=int, nargs='+', default=sorted({1, 2, 4, os.cpu_count() or 1}))
+    parser.add_argument('--tile-size', type=int, default=TILE_SIZE)
+    args = parser.parse_args(argv)
+
+    grid = benchmarks.make_grid(args.size, args.density)
+    start = time.perf_counter()
+    expected = rules.evaluate(grid, args.rules)
+    serial = time.perf_counter() - start
+    print(f"{args.size}x{args.size}@{args.density} serial: {serial:.2f} s")
+    for workers in args.workers:
+        score_and_coins(grid, args.rules, workers, args.tile_size)  # Start the pool
+        start = time.perf_counter()
+        result = score_and_coins(grid, args.rules, workers, args.tile_size)
+        elapsed = time.perf_counter() - start
+        status = 'ok' if result == expected else f'MISMATCH {result} != {expected}'
+        print(f"{workers:>3} workers: {elapsed:.2f} s ({serial / elapsed:.1f}x serial) {status}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,20 @@
+"""The worker process pool shared by the move advisor and tile-parallel scoring.
+
+Starting a pool is slow, so one is kept alive for the whole process and
+handed to every caller asking for the same number of workers.
+"""
+
+_pool = None
+_pool_workers = 0
+
+
+def get_pool(workers):
+    """Return the shared process pool of workers processes, replacing one of another size."""
+    global _pool, _pool_workers
+    if _pool is None or _pool_workers != workers:
+        from concurrent.futures import ProcessPoolExecutor  # Slow to import, and only needed with workers
+        if _pool is not None:
+            _pool.shutdown()
+        _pool = ProcessPoolExecutor(workers)
+        _pool_workers = workers
+    return _pool
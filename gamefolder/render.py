@@ -0,0 +1,217 @@
+"""Terminal renderer for the game board.
+
+Every frame is built in memory and written with a single write call. Modes:
+
+``'plain'``  the board as text, one line per row, like the old print loops
+``'ansi'``   the first frame clears the screen and is drawn at the top; later
+             frames only rewrite the characters that changed, using ANSI
+             cursor moves, and the prompts below the board are cleared
+``'off'``    nothing is drawn, for benchmarks and scripted sessions
+``'auto'``   ``'ansi'`` when the output is a terminal, otherwise ``'plain'``
+
+A board bigger than the viewport is shown through a window with row and
+column rulers, which follows the last placed building and can be scrolled.
+In ANSI mode the viewport defaults to what fits in the terminal; in plain
+mode the whole board is shown unless a size is given.
+
+ANSI frames are rewritten at fixed screen rows, which only works while the
+last frame has not scrolled. The renderer writes through its own
+LineCounter, and while it is open with ``with renderer:`` an ANSI renderer
+drawing to sys.stdout puts that counter in place of sys.stdout, so the
+prompts printed between frames are counted too; the game also counts every
+answered prompt with count_answer(). Once more than PROMPT_LINES lines were
+printed below a frame, the next one is drawn in full. Closing the renderer
+puts the old sys.stdout back.
+"""
+
+import sys
+
+import instrument
+
+RENDER_MODES = ('auto', 'plain', 'ansi', 'off')
+
+# Screen lines kept free below an ANSI frame for the prompts of one turn
+PROMPT_LINES = 8
+
+# Columns between the numbers of the column ruler
+RULER_STEP = 5
+
+
+class LineCounter:
+    """A text stream passing writes on to stream and counting the lines written."""
+
+    def __init__(self, stream):
+        self.stream = stream
+        self.lines = 0
+
+    def write(self, text):
+        self.lines += text.count('\n')
+        return self.stream.write(text)
+
+    def __getattr__(self, name):
+        # flush, fileno, isatty and encoding, so input() still uses the terminal directly
+        return getattr(self.stream, name)
+
+
+def count_answer():
+    """Count the line the terminal moves down when the player answers a prompt.
+
+    Only an open ANSI renderer counts lines on sys.stdout; otherwise this does nothing.
+    """
+    if isinstance(sys.stdout, LineCounter):
+        sys.stdout.lines += 1
+
+
+class Renderer:
+    """Draws frames of a grid, remembering the last one to redraw only what changed."""
+
+    def __init__(self, mode='auto', out=None, view_rows=None, view_cols=None):
+        if mode not in RENDER_MODES:
+            raise ValueError(f"Unknown render mode: {mode}")
+        self._out = out
+        if mode == 'auto':
+            isatty = getattr(self.out, 'isatty', None)
+            mode = 'ansi' if isatty is not None and isatty() else 'plain'
+        self.mode = mode
+        if mode == 'ansi' and (view_rows is None or view_cols is None):
+            import shutil  # Slow to import, and only needed on a terminal
+            size = shutil.get_terminal_size()
+            # Lines for the title, the column ruler, the status line and the cursor;
+            # columns are two characters wide
+            view_rows = view_rows or max(5, size.lines - 4 - PROMPT_LINES)
+            view_cols = view_cols or max(5, (size.columns - 6) // 2)
+        self.view_rows = view_rows
+        self.view_cols = view_cols
+        self.top = 0
+        self.left = 0
+        self.clipped = False
+        self._lines = None  # The last frame drawn in ANSI mode
+        self._counter = None  # Counts the lines written to the output
+        self._mark = 0  # Lines the counter had counted when the last frame was drawn
+        self._stdout = None  # sys.stdout before open() replaced it
+
+    @property
+    def out(self):
+        # Looked up on every write, so redirecting sys.stdout also redirects the renderer
+        return self._out if self._out is not None else sys.stdout
+
+    def open(self):
+        """Count what is printed to sys.stdout between ANSI frames until close()."""
+        if self.mode == 'ansi' and self._out is None and self._stdout is None:
+            self._stdout = sys.stdout
+            self._counter = sys.stdout = LineCounter(sys.stdout)
+        return self
+
+    def close(self):
+        """Put back the sys.stdout that open() replaced."""
+        if self._stdout is not None:
+            if sys.stdout is self._counter:
+                sys.stdout = self._stdout
+            self._stdout = None
+            self._counter = None
+
+    def __enter__(self):
+        return self.open()
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _counted(self):
+        """Return the counter wrapping the output, making a new one if the output changed."""
+        out = self.out
+        if out is not self._counter and (self._counter is None or self._counter.stream is not out):
+            self._counter = LineCounter(out)
+            self._lines = None  # Nothing is known about the new stream's screen
+        return self._counter
+
+    def invalidate(self):
+        """Draw the next ANSI frame in full, e.g. after printing more than a turn's prompts."""
+        self._lines = None
+
+    def scroll(self, rows, cols):
+        """Move the viewport by rows and cols; it is kept on the board by the next draw()."""
+        self.top += rows
+        self.left += cols
+
+    def _place_viewport(self, rows, cols, focus):
+        view_rows = min(rows, self.view_rows or rows)
+        view_cols = min(cols, self.view_cols or cols)
+        if focus is not None:
+            row, col = focus
+            if not self.top <= row < self.top + view_rows:
+                self.top = row - view_rows // 2
+            if not self.left <= col < self.left + view_cols:
+                self.left = col - view_cols // 2
+        self.top = max(0, min(self.top, rows - view_rows))
+        self.left = max(0, min(self.left, cols - view_cols))
+        self.clipped = view_rows < rows or view_cols < cols
+        return view_rows, view_cols
+
+    def frame(self, grid, title=None, focus=None):
+        """Return the lines of one frame; focus is a (row, col) that must be visible."""
+        rows, cols = len(grid), len(grid[0])
+        view_rows, view_cols = self._place_viewport(rows, cols, focus)
+        top, left = self.top, self.left
+        lines = [] if title is None else [title]
+        if not self.clipped and self.mode == 'plain':
+            for row in range(rows):
+                lines.append(' '.join(grid[row]))
+            return lines
+
+        width = len(str(rows - 1))
+        ruler = [' '] * (2 * view_cols)
+        for col in range(left + (-left % RULER_STEP), left + view_cols, RULER_STEP):
+            label = str(col)
+            start = 2 * (col - left)
+            ruler[start:start + len(label)] = label
+        lines.append(' ' * (width + 1) + ''.join(ruler[:2 * view_cols - 1]).rstrip())
+        for row in range(top, top + view_rows):
+            lines.append(f"{row:>{width}} " + ' '.join(grid[row][left:left + view_cols]))
+        if self.clipped:
+            lines.append(f"Rows {top}-{top + view_rows - 1} of {rows}, "
+                         f"columns {left}-{left + view_cols - 1} of {cols}")
+        return lines
+
+    @instrument.timed('render')
+    def draw(self, grid, title=None, focus=None):
+        """Draw grid with an optional title line above it."""
+        if self.mode == 'off':
+            return
+        lines = self.frame(grid, title, focus)
+        if self.mode == 'plain':
+            self.out.write('\n'.join(lines) + '\n')
+        else:
+            counter = self._counted()
+            if counter.lines - self._mark > PROMPT_LINES:
+                self._lines = None  # The screen scrolled, moving the last frame's rows
+            counter.write(self._ansi_update(lines))
+            self._mark = counter.lines
+        self.out.flush()
+
+    def _ansi_update(self, lines):
+        """Return the escape sequences turning the last frame into lines."""
+        previous = self._lines
+        self._lines = lines
+        if previous is None or len(previous) != len(lines):
+            # Clear the screen and draw the whole frame from the top
+            return '\x1b[H\x1b[2J' + '\n'.join(lines) + '\n'
+        out = []
+        for y, (old, new) in enumerate(zip(previous, lines), 1):
+            if old == new:
+                continue
+            if len(old) != len(new):
+                out.append(f'\x1b[{y};1H\x1b[2K{new}')
+                continue
+            # Rewrite each run of changed characters in place
+            x, end = 0, len(new)
+            while x < end:
+                if old[x] == new[x]:
+                    x += 1
+                    continue
+                start = x
+                while x < end and old[x] != new[x]:
+                    x += 1
+                out.append(f'\x1b[{y};{start + 1}H{new[start:x]}')
+        # Leave the cursor below the board and clear the prompts of the last turn
+        out.append(f'\x1b[{len(lines) + 1};1H\x1b[J')
+        return ''.join(out)
@@ -0,0 +1,203 @@
+"""Replay files: the seed and choices of one game, and a fast-forward engine to check them.
+
+Every game draws its building offers from its own ``random.Random(seed)``,
+so the seed plus the player's choices determine the whole game. A replay
+file is text: a JSON header line, then one line per offer::
+
+    {"replay": 1, "mode": "arcade", "rules": "arcade", "seed": 42, "start": null,
+     "turns": 16, "score": 27, "coins": 0}
+    R 0 0
+    -
+    C 0 1
+    undo
+
+``R 0 0`` places R at row 0, column 0; ``-`` is a building choice that was
+not offered, which still used up an offer, and ``undo`` and ``redo`` take
+back or replay a move instead of placing a building. ``start`` is null for
+a new game and holds the grid (one string per row) and coins of a loaded one.
+
+fast_forward() replays the choices on engine.HeadlessGame with no prompts
+or drawing, checking every building against the offers drawn from the seed.
+Run the replays of archived games to find the ones a rule change affects::
+
+    python replay.py replays/
+"""
+
+import os
+import time
+from collections import namedtuple
+
+import engine
+from atomicfile import atomic_write
+
+VERSION = 1
+
+# choices are (building, row, col) tuples, 'undo', 'redo', or None for a choice that was not offered
+Replay = namedtuple('Replay', 'mode rules seed start choices turns score coins')
+
+
+def _grid_rows(grid):
+    if hasattr(grid, 'to_grid'):  # ChunkedBoard or a lazily loaded binsave.MappedGrid
+        grid = grid.to_grid()
+    return [''.join(row) for row in grid]
+
+
+class Recorder:
+    """Collects the choices of a game as it is played, to be written as a replay file."""
+
+    def __init__(self, mode, seed, rules=None, grid=None, coins=None):
+        self.mode = mode
+        self.rules = rules or mode
+        self.seed = seed
+        self.start = None
+        if grid is not None:
+            rows = _grid_rows(grid)
+            if any(row.count('P') != len(row) for row in rows):  # A loaded game
+                self.start = {'grid': rows, 'coins': coins}
+        self.choices = []
+        self.turns = 0
+
+    def reject(self):
+        """Record a building choice that was not offered."""
+        self.choices.append(None)
+
+    def place(self, building, row, col):
+        self.choices.append((building, row, col))
+        self.turns += 1
+
+    def undo(self):
+        self.choices.append('undo')
+        self.turns -= 1
+
+    def redo(self):
+        self.choices.append('redo')
+        self.turns += 1
+
+    def replay(self, score, coins):
+        return Replay(self.mode, self.rules, self.seed, self.start, self.choices, self.turns,
+                      score, coins)
+
+    def write(self, directory, score, coins):
+        """Write the replay with the final score and coins into directory and return its path."""
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, f'{self.mode}-{int(time.time())}-{self.seed}.replay')
+        write_replay(path, self.replay(score, coins))
+        return path
+
+
+def write_replay(path, replay):
+    """Write a replay atomically (temporary file, then rename)."""
+    import json  # Imported here to keep importing the game modules cheap
+    header = {'replay': VERSION, 'mode': replay.mode, 'rules': replay.rules, 'seed': replay.seed,
+              'start': replay.start, 'turns': replay.turns, 'score': replay.score,
+              'coins': replay.coins}
+    lines = [json.dumps(header)]
+    lines += ['-' if choice is None else choice if isinstance(choice, str) else '%s %d %d' % choice
+              for choice in replay.choices]
+    with atomic_write(path) as f:
+        f.write('\n'.join(lines) + '\n')
+
+
+def read_replay(path):
+    """Read a replay file. Damaged files raise ValueError."""
+    import json
+    with open(path, 'r') as f:
+        header = json.loads(f.readline())
+        if not isinstance(header, dict) or header.get('replay') != VERSION:
+            raise ValueError(f"{path}: not a version {VERSION} replay")
+        choices = []
+        for line in f:
+            line = line.strip()
+            if line == '-':
+                choices.append(None)
+            elif line in ('undo', 'redo'):
+                choices.append(line)
+            else:
+                building, row, col = line.split()
+                choices.append((building, int(row), int(col)))
+    try:
+        return Replay(header['mode'], header['rules'], header['seed'], header['start'], choices,
+                      header['turns'], header['score'], header['coins'])
+    except KeyError as e:
+        raise ValueError(f"{path}: the header has no {e}") from None
+
+
+def fast_forward(replay, rules=None):
+    """Play the choices of a replay and return the final HeadlessGame.
+
+    rules overrides the replay's rules. A building that was not offered or
+    an illegal position raises ValueError.
+    """
+    rules = rules or replay.rules
+    if replay.start is None:
+        game = engine.HeadlessGame(replay.mode, replay.seed, rules)
+    else:
+        grid = [list(row) for row in replay.start['grid']]
+        first_building = replay.mode == 'arcade' and all(row.count('P') == len(row) for row in grid)
+        game = engine.HeadlessGame.from_state(grid, replay.start['coins'], first_building,
+                                              replay.mode, replay.seed, rules)
+    game.enable_undo()
+    for choice in replay.choices:
+        offered = game.offer()
+        if choice is None:
+            continue
+        if choice == 'undo' or choice == 'redo':
+            if getattr(game, choice)() is None:
+                raise ValueError(f"Turn {game.turn}: nothing to {choice}")
+            continue
+        building, row, col = choice
+        if building not in offered:
+            raise ValueError(f"Turn {game.turn + 1}: {building} was not offered {offered}")
+        game.play(building, row, col)
+    return game
+
+
+def verify(replay, rules=None):
+    """Return (matches, (score, coins)) for a replay fast-forwarded with the given rules."""
+    game = fast_forward(replay, rules)
+    return (game.score, game.coins) == (replay.score, replay.coins), (game.score, game.coins)
+
+
+def _replay_paths(paths):
+    for path in paths:
+        if os.path.isdir(path):
+            yield from sorted(os.path.join(path, name) for name in os.listdir(path)
+                              if name.endswith('.replay'))
+        else:
+            yield path
+
+
+def main(argv=None):
+    import argparse
+    parser = argparse.ArgumentParser(description="Check recorded games against the current rules.")
+    parser.add_argument('paths', nargs='+', help="replay files or directories of them")
+    parser.add_argument('--rules', choices=['arcade', 'free_play', 'npcity'], default=None,
+                        help="replay with these rules instead of each game's own")
+    parser.add_argument('-q', '--quiet', action='store_true', help="only report mismatches")
+    args = parser.parse_args(argv)
+
+    games = turns = failures = 0
+    start = time.perf_counter()
+    for path in _replay_paths(args.paths):
+        games += 1
+        try:
+            replay = read_replay(path)
+            turns += replay.turns
+            matches, (score, coins) = verify(replay, args.rules)
+        except ValueError as e:
+            failures += 1
+            print(f"{path}: FAILED {e}")
+            continue
+        if not matches:
+            failures += 1
+            print(f"{path}: MISMATCH score {score} coins {coins}, "
+                  f"recorded score {replay.score} coins {replay.coins}")
+        elif not args.quiet:
+            print(f"{path}: ok (score {score}, coins {coins}, {replay.turns} turns)")
+    elapsed = time.perf_counter() - start
+    print(f"{games} games, {failures} mismatches, {turns / elapsed if elapsed else 0:.0f} turns/s")
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,135 @@
+"""Scoring rule sets as data, compiled into lookup tables.
+
+A rule set maps every building to a BuildingRule:
+
+``base``           points the building always scores
+``per_adjacent``   points per adjacent building of each kind
+``any_adjacent``   points if at least one adjacent building is of that kind
+``coins``          coins per adjacent building of each kind
+``override``       (kind, points): when any adjacent building is of that kind
+                   the building scores exactly points instead
+``board``          points per building of each kind anywhere on the board
+
+Everything but the board terms depends only on the building and how many of
+each kind of building surround it. A cell has at most four neighbours, so
+those counts fit in one base-5 digit per kind and every (building, counts)
+pair gets a slot in a flat table of (score, coins) built once per rule set.
+Scoring a cell is then a sum of four neighbour keys and one list index, and
+a new variant is just another dict of BuildingRules.
+"""
+
+from collections import namedtuple
+from itertools import product
+
+BuildingRule = namedtuple('BuildingRule', 'base per_adjacent any_adjacent coins override board',
+                          defaults=(0, {}, {}, {}, None, {}))
+
+# Code order shared with binsave and npscoring; 'P' (empty) scores nothing
+CODE_BUILDINGS = 'PRICO*'
+KINDS = CODE_BUILDINGS[1:]
+
+# Key of a neighbour: one base-5 digit per kind of building, so keys of the
+# four neighbours add up to their per-kind counts
+NEIGHBOUR_KEYS = {building: 5 ** index for index, building in enumerate(KINDS)}
+NEIGHBOUR_KEYS['P'] = 0
+TABLE_STRIDE = 5 ** len(KINDS)
+
+ARCADE = {
+    'R': BuildingRule(base=1),
+    'I': BuildingRule(per_adjacent={'I': 1}, coins={'R': 1}),
+    'C': BuildingRule(per_adjacent={'C': 1}),
+    'O': BuildingRule(any_adjacent={'O': 1}),
+    '*': BuildingRule(any_adjacent={'*': 1}),
+}
+
+# Free Play scores like Arcade but buildings generate no coins
+FREE_PLAY = {building: rule._replace(coins={}) for building, rule in ARCADE.items()}
+
+NPCITY = {
+    'R': BuildingRule(per_adjacent={'R': 1, 'C': 1, 'O': 2}, override=('I', 1)),
+    'I': BuildingRule(coins={'R': 1}, board={'I': 1}),
+    'C': BuildingRule(per_adjacent={'C': 1}, coins={'R': 1}),
+    'O': BuildingRule(per_adjacent={'O': 1}),
+    '*': BuildingRule(any_adjacent={'*': 1}),
+}
+
+RULE_SETS = {
+    'arcade': ARCADE,
+    'free_play': FREE_PLAY,
+    'npcity': NPCITY,
+}
+
+CompiledRules = namedtuple('CompiledRules', 'name table offsets board_terms')
+
+_compiled = {}
+
+
+def _cell_value(rule, counts):
+    """Return (score, coins) of a building with the given per-kind neighbour counts."""
+    coins = sum(amount * counts[kind] for kind, amount in rule.coins.items())
+    if rule.override is not None and counts[rule.override[0]]:
+        return rule.override[1], coins
+    score = rule.base
+    score += sum(points * counts[kind] for kind, points in rule.per_adjacent.items())
+    score += sum(points for kind, points in rule.any_adjacent.items() if counts[kind])
+    return score, coins
+
+
+def compile_rules(rule_set, name=None):
+    """Build the lookup tables of a rule set (a dict of building -> BuildingRule)."""
+    table = [(0, 0)] * (len(CODE_BUILDINGS) * TABLE_STRIDE)
+    offsets = {building: code * TABLE_STRIDE for code, building in enumerate(CODE_BUILDINGS)}
+    neighbourhoods = [digits for digits in product(range(5), repeat=len(KINDS))
+                      if sum(digits) <= 4]
+    for building, rule in rule_set.items():
+        for digits in neighbourhoods:
+            counts = dict(zip(KINDS, digits))
+            key = sum(digit * NEIGHBOUR_KEYS[kind] for kind, digit in counts.items())
+            table[offsets[building] + key] = _cell_value(rule, counts)
+    board_terms = [(building, kind, points) for building, rule in rule_set.items()
+                   for kind, points in rule.board.items()]
+    return CompiledRules(name, table, offsets, board_terms)
+
+
+def get_rules(rules):
+    """Return the compiled tables of a named rule set, compiling it on first use."""
+    compiled = _compiled.get(rules)
+    if compiled is None:
+        if rules not in RULE_SETS:
+            raise ValueError(f"Unknown rule set: {rules}")
+        compiled = _compiled[rules] = compile_rules(RULE_SETS[rules], rules)
+    return compiled
+
+
+def board_score(compiled, counts):
+    """Score of the board terms, given the number of buildings of each kind."""
+    return sum(points * counts.get(building, 0) * counts.get(kind, 0)
+               for building, kind, points in compiled.board_terms)
+
+
+def evaluate(grid, rules='arcade'):
+    """Return (score, coins) for grid with one pass over its cells."""
+    compiled = get_rules(rules)
+    table, offsets, keys = compiled.table, compiled.offsets, NEIGHBOUR_KEYS
+    rows, cols = len(grid), len(grid[0])
+    score = coins = 0
+    counts = dict.fromkeys(CODE_BUILDINGS, 0)
+
+    # Neighbour keys of three rows at a time, padded with an empty cell at each end
+    empty = [0] * (cols + 2)
+    above, current = empty, [0] + [keys[building] for building in grid[0]] + [0]
+    for row in range(rows):
+        if row + 1 < rows:
+            below = [0] + [keys[building] for building in grid[row + 1]] + [0]
+        else:
+            below = empty
+        for col, building in enumerate(grid[row]):
+            if building == 'P':
+                continue
+            counts[building] += 1
+            cell_score, cell_coins = table[offsets[building] + above[col + 1] + below[col + 1]
+                                           + current[col] + current[col + 2]]
+            score += cell_score
+            coins += cell_coins
+        above, current = current, below
+    return score + board_score(compiled, counts), coins
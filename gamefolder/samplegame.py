@@ -1,6 +1,127 @@
+import os
 import random
-import json
-from datetime import datetime
+
+# Persistence modules (json, sqlite3, mmap) are imported where they are used,
+# so that importing the rules and scoring stays cheap for tools and workers
+from bytegrid import Grid
+from frontier import Frontier
+from history import History, Move
+from incremental import IncrementalScorer
+import instrument
+from render import Renderer, count_answer
+import rules
+from sparseboard import ChunkedBoard
+
+# Seconds the Arcade hint may spend on Monte Carlo rollouts
+HINT_BUDGET = 0.2
+
+# 'python', 'numpy' or 'bitboard'; NumPy scoring falls back to Python when it is not installed
+SCORING_BACKEND = os.environ.get('NGEEANN_SCORING_BACKEND', 'python')
+
+# How boards are drawn: 'auto', 'plain', 'ansi' or 'off' (see render.py)
+RENDER_MODE = os.environ.get('NGEEANN_RENDER', 'auto')
+
+# Seed of the first game's building offers; later games count up from it.
+# None gives every game a fresh random seed.
+SEED = None
+
+# Directory where every game writes a replay file (see replay.py), or None
+REPLAY_DIR = os.environ.get('NGEEANN_REPLAY_DIR')
+
+# 'off' saves in the turn loop; 'never', 'interval' or 'always' saves on a
+# background thread with that fsync policy (see autosave.py)
+AUTOSAVE = os.environ.get('NGEEANN_AUTOSAVE', 'off')
+
+# Building prompt keys that scroll a board too big for the screen, in half viewports
+SCROLL_KEYS = {'W': (-1, 0), 'S': (1, 0), 'A': (0, -1), 'D': (0, 1)}
+
+# Building prompt keys that take back the last move or play an undone one again
+UNDO_KEYS = {'Z': 'undo', 'Y': 'redo'}
+
+# Building prompt key that maps the score change of each offered building on every legal cell
+HEATMAP_KEY = 'M'
+
+# Free Play saves are binary (see binsave.py); saves from before that used the
+# JSON name and are still loaded when there is no binary one
+FREE_PLAY_SAVE = 'game_save_free_play.sav'
+OLD_FREE_PLAY_SAVE = 'game_save_free_play.json'
+
+
+def set_scoring_backend(name):
+    """Select the scoring backend and return the one that will actually be used."""
+    global SCORING_BACKEND
+    if name not in ('python', 'numpy', 'bitboard'):
+        raise ValueError(f"Unknown scoring backend: {name}")
+    SCORING_BACKEND = name
+    return 'python' if _scoring_backend() is None else name
+
+
+def set_autosave(policy):
+    """Select the autosave fsync policy, or 'off' to write saves in the turn loop."""
+    global AUTOSAVE
+    if policy not in ('off', 'never', 'interval', 'always'):
+        raise ValueError(f"Unknown autosave policy: {policy}")
+    if AUTOSAVE != 'off' and policy == 'off':
+        import autosave
+        autosave.shutdown()  # Write what is still queued before saving in the turn loop
+    AUTOSAVE = policy
+
+
+def set_render_mode(name):
+    """Select how the game modes draw the board."""
+    global RENDER_MODE
+    if name not in ('auto', 'plain', 'ansi', 'off'):
+        raise ValueError(f"Unknown render mode: {name}")
+    RENDER_MODE = name
+
+
+def ask(prompt):
+    """input(), timed as the 'input' phase when instrumentation is on."""
+    with instrument.phase('input'):
+        answer = input(prompt)
+    count_answer()
+    return answer
+
+
+def next_seed():
+    """Return the seed of a new game's building offers."""
+    global SEED
+    if SEED is None:
+        return random.randrange(2 ** 32)
+    seed, SEED = SEED, SEED + 1
+    return seed
+
+
+def write_replay(recorder, score, coins):
+    """Write the replay of a game to REPLAY_DIR, if replays are enabled."""
+    if REPLAY_DIR:
+        recorder.write(REPLAY_DIR, score, coins)
+
+
+def _autosave_writer():
+    """Return the background save writer, started on first use, or None if autosave is off."""
+    if AUTOSAVE == 'off':
+        return None
+    import autosave
+    return autosave.get_writer(AUTOSAVE)
+
+
+def _flush_saves():
+    """Wait for queued background saves, so that reading a file gets the latest save."""
+    writer = _autosave_writer()
+    if writer is not None:
+        writer.flush()
+
+
+def _scoring_backend():
+    """Return the selected scoring module, or None for the built-in Python scoring."""
+    if SCORING_BACKEND == 'bitboard':
+        import bitboard
+        return bitboard
+    if SCORING_BACKEND != 'numpy':
+        return None
+    import npscoring
+    return npscoring if npscoring.available() else None
 
 
 def get_adjacent_positions(row, col, rows=20, cols=20):
@@ -13,37 +134,10 @@ def get_adjacent_positions(row, col, rows=20, cols=20):
 
 def calculate_score_and_coins(grid):
     """Calculate the score and coins based on the grid's current state."""
-    rows, cols = len(grid), len(grid[0])
-    score = 0
-    coins = 0
-
-    for row in range(rows):
-        for col in range(cols):
-            building = grid[row][col]
-            if building == 'P':
-                continue
-
-            adjacent_positions = get_adjacent_positions(row, col)
-            adjacent_buildings = [grid[r][c] for r, c in adjacent_positions]
-
-            if building == 'R':
-                if 'I' in adjacent_buildings:
-                    score += 1
-                else:
-                    score += 1  # Count only 1 point for each 'R' placed next to 'R', 'C', or 'O'
-            elif building == 'I':
-                score += adjacent_buildings.count('I')
-                coins += sum(1 for r, c in adjacent_positions if grid[r][c] == 'R')
-            elif building == 'C':
-                score += adjacent_buildings.count('C')
-            elif building == 'O':
-                if 'O' in adjacent_buildings:
-                    score += 1
-            elif building == '*':
-                if '*' in adjacent_buildings:
-                    score += 1
-
-    return score, coins
+    backend = _scoring_backend()
+    if backend is not None:
+        return backend.score_and_coins(grid, 'arcade')
+    return rules.evaluate(grid, 'arcade')
 
 def calculate_additional_coins(grid, new_building, row, col):
     """Calculate additional coins based on the placement of a new building."""
@@ -60,14 +154,14 @@ def choose_building_freeplay(grid):
     randombuildings = random.sample(buildings, 2)
     print("Randomly selected buildings:", randombuildings)
 
-    ansbuilding = input("Choose which building to build: ").strip().upper()
+    ansbuilding = ask("Choose which building to build: ").strip().upper()
 
     if ansbuilding in randombuildings:
         print(f"{ansbuilding} is in the randomly selected buildings.")
         while True:
             try:
-                row = int(input(f"Enter the row number (0-{len(grid)-1}) to place {ansbuilding}: "))
-                col = int(input(f"Enter the column number (0-{len(grid[0]) - 1}) to place {ansbuilding}: "))
+                row = int(ask(f"Enter the row number (0-{len(grid)-1}) to place {ansbuilding}: "))
+                col = int(ask(f"Enter the column number (0-{len(grid[0]) - 1}) to place {ansbuilding}: "))
 
                 if 0 <= row < len(grid) and 0 <= col < len(grid[0]):
                     if grid[row][col] == 'P':
@@ -85,35 +179,10 @@ def choose_building_freeplay(grid):
 
 def calculate_score_free_play(grid):
     """Calculate the score based on the grid's current state in Free Play mode."""
-    rows, cols = len(grid), len(grid[0])
-    score = 0
-
-    for row in range(rows):
-        for col in range(cols):
-            building = grid[row][col]
-            if building == 'P':
-                continue
-
-            adjacent_positions = get_adjacent_positions(row, col, rows, cols)
-            adjacent_buildings = [grid[r][c] for r, c in adjacent_positions]
-
-            if building == 'R':
-                if 'I' in adjacent_buildings:
-                    score += 1
-                else:
-                    score += 1  # Count only 1 point for each 'R' placed next to 'R', 'C', or 'O'
-            elif building == 'I':
-                score += adjacent_buildings.count('I')
-            elif building == 'C':
-                score += adjacent_buildings.count('C')
-            elif building == 'O':
-                if 'O' in adjacent_buildings:
-                    score += 1
-            elif building == '*':
-                if '*' in adjacent_buildings:
-                    score += 1
-
-    return score
+    backend = _scoring_backend()
+    if backend is not None:
+        return backend.score_and_coins(grid, 'free_play')[0]
+    return rules.evaluate(grid, 'free_play')[0]
 
 
 def choose_building(grid, first_building):
@@ -122,14 +191,14 @@ def choose_building(grid, first_building):
     randombuildings = random.sample(buildings, 2)
     print("Randomly selected buildings:", randombuildings)
 
-    ansbuilding = input("Choose which building to build: ").strip().upper()
+    ansbuilding = ask("Choose which building to build: ").strip().upper()
 
     if ansbuilding in randombuildings:
         print(f"{ansbuilding} is in the randomly selected buildings.")
         while True:
             try:
-                row = int(input(f"Enter the row number (0-19) to place {ansbuilding}: "))
-                col = int(input(f"Enter the column number (0-19) to place {ansbuilding}: "))
+                row = int(ask(f"Enter the row number (0-19) to place {ansbuilding}: "))
+                col = int(ask(f"Enter the column number (0-19) to place {ansbuilding}: "))
 
                 if 0 <= row < 20 and 0 <= col < 20:
                     if first_building or (grid[row][col] == 'P' and any(grid[r][c] != 'P' for r, c in get_adjacent_positions(row, col))):
@@ -144,135 +213,238 @@ def choose_building(grid, first_building):
         print(f"{ansbuilding} is not in the randomly selected buildings.")
         return None, None, None
 
-def save_game(grid, coins, score, filename='game_save.json'):
-    """Save the current game state to a file."""
-    game_state = {
-        'grid': grid,
-        'coins': coins,
-        'score': score
-    }
-    with open(filename, 'w') as f:
-        json.dump(game_state, f)
+def _write_save(filename, grid, coins, score, binary, fsync=False):
+    import journal
+    journal.write_snapshot(filename, grid, coins, score, binary=binary, fsync=fsync)
+    journal.discard_journal(filename)  # Moves journalled before this save are now stale
+
+def _save(filename, grid, coins, score, binary):
+    """Write a save now, or queue a copy of the state when autosave is on."""
+    writer = _autosave_writer()
+    if writer is None:
+        _write_save(filename, grid, coins, score, binary)
+        return
+    import journal
+    writer.submit(filename, _write_save, filename, journal.copy_grid(grid), coins, score, binary,
+                  replace=True)
+
+@instrument.timed('io')
+def save_game(grid, coins, score, filename='game_save.json', binary=False):
+    """Save the current game state to a file, as JSON or in the binary save format."""
+    _save(filename, grid, coins, score, binary)
     print("Game progress saved.")
 
+def read_game_state(filename, mode='arcade'):
+    """Read a save file in either the binary or the JSON format and return its game state.
+
+    Moves journalled after the save was written are replayed on top of it.
+    Empty or damaged files raise ValueError.
+    """
+    import binsave
+    import journal
+    import json
+    _flush_saves()
+    if binsave.is_binary_save(filename):
+        grid, coins, score = binsave.load_binary(filename)
+        game_state = {'grid': grid, 'coins': coins, 'score': score, 'turn': grid.turn}
+    else:
+        with open(filename, 'r') as f:
+            game_state = json.load(f)
+    moves = journal.read_journal(filename, game_state.get('turn', 0))
+    if moves:
+        grid, coins, score = journal.replay(game_state['grid'], game_state['coins'], moves, mode)
+        game_state.update(grid=grid, coins=coins, score=score)
+    return game_state
+
+@instrument.timed('io')
 def load_game(filename='game_save.json'):
     """Load the game state from a file."""
     try:
-        with open(filename, 'r') as f:
-            game_state = json.load(f)
+        game_state = read_game_state(filename)
         print("Game progress loaded.")
         return game_state['grid'], game_state['coins'], game_state['score']
     except FileNotFoundError:
         print("No saved game found. Starting a new game.")
         return None, None, None
+    except ValueError:
+        print("The saved game is empty or damaged. Starting a new game.")
+        return None, None, None
 
-def save_high_score(score, filename='high_scores.json'):
-    """Save the new high score to the high score file with the current date and time."""
-    try:
-        with open(filename, 'r') as f:
-            high_scores = json.load(f)
-    except FileNotFoundError:
-        high_scores = []
-
-    # Get the current date and time
-    current_datetime = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-
-    # Append the new score with the current date and time
-    high_scores.append({'score': score, 'date': current_datetime})
-    
-    # Keep top 10 scores, sorted by score in descending order
-    high_scores = sorted(high_scores, key=lambda x: x['score'], reverse=True)[:10]
-
-    with open(filename, 'w') as f:
-        json.dump(high_scores, f)
-        
+def open_leaderboard(filename='high_scores.db'):
+    """Open the leaderboard, importing the old high_scores.json the first time."""
+    from leaderboard import Leaderboard
+    board = Leaderboard(filename)
+    board.import_json(os.path.join(os.path.dirname(filename), 'high_scores.json'), 'arcade')
+    return board
+
+def _add_high_score(score, filename, mode, date=None, fsync=False):
+    # SQLite syncs its own transactions, whatever the fsync policy
+    with open_leaderboard(filename) as board:
+        board.add(score, mode, date)
+
+@instrument.timed('io')
+def save_high_score(score, filename='high_scores.db', mode='arcade'):
+    """Save the new high score to the leaderboard with the current date and time."""
+    writer = _autosave_writer()
+    if writer is None:
+        _add_high_score(score, filename, mode)
+    else:
+        from datetime import datetime
+        writer.submit(filename, _add_high_score, score, filename, mode,
+                      datetime.now().strftime("%Y-%m-%d %H:%M:%S"))
     print("High score saved.")
 
-def load_high_scores(filename='high_scores.json'):
-    try:
-            with open(filename, 'r') as f:
-                return json.load(f)
-    except json.JSONDecodeError:
-            # Handle the case where the file is empty or invalid
-            print(f"Warning: {filename} is empty or contains invalid JSON. Returning empty high scores.")
-            return []
-    else:
-        # If the file doesn't exist, return an empty list
-        print(f"Warning: {filename} does not exist. Returning empty high scores.")
-        return []
-
-def display_high_scores():
-    """Display the high scores."""
-    high_scores = load_high_scores()
-    if high_scores:
+def load_high_scores(filename='high_scores.db', mode='arcade', k=10):
+    """Return the k best scores of a leaderboard as dicts with 'score' and 'date'."""
+    _flush_saves()
+    with open_leaderboard(filename) as board:
+        return board.top(k, mode)
+
+@instrument.timed('io')
+def display_high_scores(mode='arcade', page_size=10):
+    """Display the high scores a page at a time."""
+    _flush_saves()
+    with open_leaderboard() as board:
+        high_scores, cursor = board.page(mode, page_size)
+        if not high_scores:
+            print("No high scores yet.")
+            return
         print("High Scores:")
-        for idx, score in enumerate(high_scores, 1):
-            print(f"{idx}. {score}")
-    else:
-        print("No high scores yet.")
+        idx = 1
+        while high_scores:
+            for entry in high_scores:
+                date = f" ({entry['date']})" if entry['date'] else ''
+                print(f"{idx}. {entry['score']}{date}")
+                idx += 1
+            if cursor is None:
+                break
+            if ask("Show more high scores? (y/n): ").strip().lower() != 'y':
+                break
+            high_scores, cursor = board.page(mode, page_size, cursor)
 
 def arcade_mode():
     """Main game loop for placing buildings on the grid."""
     rows, cols = 20, 20
 
-    # Ask the user if they want to load the previous game
-    load_prev_game = input("Do you want to load the previous game? (y/n): ").strip().lower() == 'y'
-    if load_prev_game:
-        grid, coins, score = load_game()
-        if grid is None:  # No saved game found
-            grid = [['P' for _ in range(cols)] for _ in range(rows)]
-            coins = 16
-            score = 0
-    else:
+    grid, coins, score = recover_game('game_save.json')
+    if grid is None:
+        # Ask the user if they want to load the previous game
+        load_prev_game = ask("Do you want to load the previous game? (y/n): ").strip().lower() == 'y'
+        if load_prev_game:
+            grid, coins, score = load_game()
+    if grid is None:  # New game, or no saved game found
         grid = [['P' for _ in range(cols)] for _ in range(rows)]
         coins = 16
         score = 0
 
-    def print_grid(grid):
-        for row in grid:
-            print(' '.join(row))
+    # One byte per cell in a single bytearray instead of a list per row
+    grid = Grid.from_grid(grid)
+
+    # Open while the game runs, so the prompts below an ANSI frame are counted
+    with Renderer(RENDER_MODE) as renderer:
+        return _arcade_turns(renderer, grid, coins, score)
 
-    print("Initial grid:")
-    print_grid(grid)
+
+def _arcade_turns(renderer, grid, coins, score):
+    """Play Arcade turns on grid until the coins run out or the player saves."""
+    renderer.draw(grid, "Initial grid:")
     print(f"Initial coins: {coins}")
+    print("Enter Z instead of a building to undo a move, or Y to redo it.")
 
     # Determine if this is the first building
     first_building = all(cell == 'P' for row in grid for cell in row)
+    scorer = IncrementalScorer(grid, 'arcade')
+    frontier = Frontier.from_grid(grid)
+
+    # The game's own offers, so the seed and the choices replay it exactly
+    from replay import Recorder
+    seed = next_seed()
+    rng = random.Random(seed)
+    recorder = Recorder('arcade', seed, grid=grid, coins=coins)
+    history = History()
+
+    # Every move is journalled to the recovery file; full snapshots are taken now and then
+    from journal import SaveJournal, recovery_filename
+    save_journal = SaveJournal(recovery_filename('game_save.json'), writer=_autosave_writer())
+    save_journal.snapshot(grid, coins, score)
 
     while coins > 0:
-        ansbuilding, row, col = choose_building(grid, first_building)
+        ansbuilding, row, col = choose_building(grid, first_building, coins=coins,
+                                                renderer=renderer, frontier=frontier, rng=rng,
+                                                history=history)
         if ansbuilding is None:
+            recorder.reject()
+            continue
+        if ansbuilding in ('undo', 'redo'):
+            move = take_back(ansbuilding, history, grid, scorer, recorder, save_journal, frontier)
+            if move is not None:
+                score, coins = move.before if ansbuilding == 'undo' else move.after
+                first_building = move.first_building if ansbuilding == 'undo' else False
+                title = "Move undone:" if ansbuilding == 'undo' else "Move redone:"
+                renderer.draw(grid, title, (move.row, move.col))
+                print(f"Remaining coins: {coins}")
+                print(f"Current score: {score}")
             continue
 
-        grid[row][col] = ansbuilding
+        previous, before, was_first = grid[row][col], (score, coins), first_building
         coins -= 1
         first_building = False  # After the first building is placed
 
-        score, generated_coins = calculate_score_and_coins(grid)
+        # Only the new cell and its neighbours are re-scored
+        with instrument.phase('scoring'):
+            score, generated_coins = scorer.place(ansbuilding, row, col)
         coins += generated_coins
+        frontier.update(grid, row, col)
+        history.record(Move(ansbuilding, row, col, previous, 0, before, (score, coins), was_first))
+        recorder.place(ansbuilding, row, col)
+        save_journal.record(ansbuilding, row, col, grid, coins, score)
+        instrument.end_turn()
 
-        print("Updated grid:")
-        print_grid(grid)
+        renderer.draw(grid, "Updated grid:", (row, col))
         print(f"Remaining coins: {coins}")
         print(f"Current score: {score}")
 
         if coins <= 0:
-            save_high_score(score, filename='high_scores.json')
+            save_journal.clear()  # A finished game leaves nothing to recover
+            write_replay(recorder, score, coins)
+            save_high_score(score)
             print("No more coins left. Exiting the game.")
-            choose()
-            break
+            return 'menu'
 
         # Ask if the user wants to save the game progress
-        if input("Do you want to save the game progress? (y/n): ").strip().lower() == 'y':
+        if ask("Do you want to save the game progress? (y/n): ").strip().lower() == 'y':
             save_game(grid, coins, score)
-            choose()
-        
-
-
-    # Save the final score as a high
-
+            save_journal.clear()  # The save now holds the game
+            write_replay(recorder, score, coins)
+            return 'menu'
+
+    save_journal.clear()
+    return 'menu'
+
+def take_back(action, history, grid, scorer, recorder, save_journal, frontier=None):
+    """Undo or redo a move (action is 'undo' or 'redo') and return it, or None if there is none.
+
+    Only the changed cell is re-scored; the caller restores the score and
+    coins from the move.
+    """
+    move = getattr(history, action)(grid, scorer, frontier)
+    if move is None:
+        print(f"Nothing to {action}.")
+        recorder.reject()
+        return None
+    getattr(recorder, action)()
+    # The journal only holds placements, so an undone move is saved with a snapshot
+    score, coins = move.before if action == 'undo' else move.after
+    save_journal.snapshot(grid, coins, score)
+    return move
+
+@instrument.timed('expand')
 def expand_grid(grid, expansion_size=5):
     """Expand the grid by adding expansion_size rows and columns to the perimeter."""
+    if isinstance(grid, (ChunkedBoard, Grid)):
+        grid.expand(expansion_size)
+        return grid
+
     rows, cols = len(grid), len(grid[0])
     new_size = rows + 2 * expansion_size
     new_grid = [['P' for _ in range(new_size)] for _ in range(new_size)]
@@ -284,23 +456,93 @@ def expand_grid(grid, expansion_size=5):
     return new_grid
 
 
-def choose_building(grid, first_building, free_play=False):
-    """Randomly select two buildings and allow the user to choose one."""
+def show_hint(grid, coins, randombuildings, first_building):
+    """Print the Monte Carlo advisor's recommendation for this turn."""
+    import advisor
+    hint = advisor.recommend(grid, coins, randombuildings, first_building, budget=HINT_BUDGET)
+    if hint is None:
+        print("No hint available.")
+        return
+    print(f"Hint: build {hint.building} at row {hint.row}, column {hint.col} "
+          f"(expected final score {hint.expected_score:.1f}, "
+          f"{hint.rollouts} rollouts, {hint.rollouts_per_second:.0f} rollouts/s)")
+
+
+def show_heatmap(grid, randombuildings, first_building, free_play=False, frontier=None, renderer=None):
+    """Print maps of the score (and, in Arcade, coin income) change of each offered building.
+
+    Only the part of the board the renderer shows is mapped; cells that are
+    not legal moves show their building, or '.' when empty.
+    """
+    import heatmap
+    window = None
+    if renderer is not None and renderer.clipped:
+        window = (renderer.top, renderer.left, renderer.view_rows, renderer.view_cols)
+    if free_play or first_building:
+        legal = lambda row, col: True
+    else:
+        frontier = frontier if frontier is not None else Frontier.from_grid(grid)
+        legal = lambda row, col: (row, col) in frontier
+    for building in randombuildings:
+        result = heatmap.heatmap(grid, building, 'free_play' if free_play else 'arcade', window)
+        print(f"Score change for {building}:")
+        print('\n'.join(heatmap.format_heatmap(grid, result, result.scores, legal)))
+        if not free_play:
+            print(f"Coins per turn change for {building}:")
+            print('\n'.join(heatmap.format_heatmap(grid, result, result.coins, legal)))
+    if renderer is not None:
+        renderer.invalidate()  # The maps scrolled the board off its rows; redraw it in full
+
+
+@instrument.timed('validation')
+def choose_building(grid, first_building, free_play=False, coins=None, renderer=None,
+                    frontier=None, rng=None, history=None):
+    """Randomly select two buildings and allow the user to choose one.
+
+    When coins is given (Arcade mode), entering '?' shows a hint first. When
+    the renderer only shows part of the board, W/A/S/D scroll it. frontier is
+    the grid's Frontier, which callers keep up to date to make the adjacency
+    check O(1); without it one is built from the grid. Offers are drawn from
+    rng, the game's own random.Random, or the random module without one.
+    With a history, Z and Y return 'undo' or 'redo' in place of a building.
+    M prints the heatmap of every move with the offered buildings.
+    """
     buildings = ["R", "I", "C", "*", "O"]
-    randombuildings = random.sample(buildings, 2)
+    randombuildings = (rng or random).sample(buildings, 2)
     print("Randomly selected buildings:", randombuildings)
 
-    ansbuilding = input("Choose which building to build: ").strip().upper()
+    if coins is None:
+        ansbuilding = ask("Choose which building to build (M for a heatmap): ").strip().upper()
+    else:
+        ansbuilding = ask("Choose which building to build (? for a hint, M for a heatmap): ").strip().upper()
+        if ansbuilding == '?':
+            show_hint(grid, coins, randombuildings, first_building)
+            ansbuilding = ask("Choose which building to build: ").strip().upper()
+    while (ansbuilding == HEATMAP_KEY
+           or renderer is not None and renderer.clipped and ansbuilding in SCROLL_KEYS):
+        if ansbuilding == HEATMAP_KEY:
+            show_heatmap(grid, randombuildings, first_building, free_play, frontier, renderer)
+            ansbuilding = ask("Choose which building to build: ").strip().upper()
+            continue
+        rows, cols = SCROLL_KEYS[ansbuilding]
+        renderer.scroll(rows * (renderer.view_rows // 2), cols * (renderer.view_cols // 2))
+        renderer.draw(grid, "Current grid:")
+        print("Randomly selected buildings:", randombuildings)
+        ansbuilding = ask("Choose which building to build (W/A/S/D to scroll): ").strip().upper()
+    if history is not None and ansbuilding in UNDO_KEYS:
+        return UNDO_KEYS[ansbuilding], None, None
 
     if ansbuilding in randombuildings:
         print(f"{ansbuilding} is in the randomly selected buildings.")
+        if frontier is None and not (free_play or first_building):
+            frontier = Frontier.from_grid(grid)
         while True:
             try:
-                row = int(input(f"Enter the row number (0-{len(grid)-1}) to place {ansbuilding}: "))
-                col = int(input(f"Enter the column number (0-{len(grid[0]) - 1}) to place {ansbuilding}: "))
+                row = int(ask(f"Enter the row number (0-{len(grid)-1}) to place {ansbuilding}: "))
+                col = int(ask(f"Enter the column number (0-{len(grid[0]) - 1}) to place {ansbuilding}: "))
 
                 if 0 <= row < len(grid) and 0 <= col < len(grid[0]):
-                    if free_play or first_building or (grid[row][col] == 'P' and any(grid[r][c] != 'P' for r, c in get_adjacent_positions(row, col, len(grid), len(grid[0])))):
+                    if free_play or first_building or (row, col) in frontier:
                         return ansbuilding, row, col
                     else:
                         print("Invalid position. The spot is either taken or not adjacent to an existing building.")
@@ -313,35 +555,44 @@ def choose_building(grid, first_building, free_play=False):
         return None, None, None
 
 
-def save_game_free_play(grid, coins, score, filename='game_save_free_play.json'):
-    """Save the current Free Play game state to a file."""
-    game_state = {
-        'grid': grid,
-        'coins': coins,
-        'score': score
-        # Add more attributes as needed, e.g., grid size
-    }
-    with open(filename, 'w') as f:
-        json.dump(game_state, f)
+@instrument.timed('io')
+def save_game_free_play(grid, coins, score, filename=FREE_PLAY_SAVE, binary=True):
+    """Save the current Free Play game state to a file.
+
+    Free Play boards can grow very large, so they are saved in the compact
+    binary format unless binary is False.
+    """
+    _save(filename, grid, coins, score, binary)
     print("Free Play game progress saved.")
 
 
-def load_game_free_play(filename='game_save_free_play.json'):
-    """Load the Free Play game state from a file."""
+def saved_file(filename, old_filename):
+    """Return filename, or old_filename when only a save under that older name exists."""
+    if not os.path.exists(filename) and os.path.exists(old_filename):
+        return old_filename
+    return filename
+
+
+@instrument.timed('io')
+def load_game_free_play(filename=None):
+    """Load the Free Play game state from a file, by default the Free Play save."""
+    filename = filename or saved_file(FREE_PLAY_SAVE, OLD_FREE_PLAY_SAVE)
     try:
-        with open(filename, 'r') as f:
-            game_state = json.load(f)
+        game_state = read_game_state(filename, 'free_play')
         print("Free Play game progress loaded.")
         return game_state['grid'], game_state['coins'], game_state['score']
     except FileNotFoundError:
         print("No saved Free Play game found. Starting a new game.")
         return None, None, None
+    except ValueError:
+        print("The saved Free Play game is empty or damaged. Starting a new game.")
+        return None, None, None
 
+@instrument.timed('io')
 def load_freeplaygame(filename='game_save.json', free_play=False):
     """Load the game state from a file."""
     try:
-        with open(filename, 'r') as f:
-            game_state = json.load(f)
+        game_state = read_game_state(filename, 'free_play' if free_play else 'arcade')
         print("Game progress loaded.")
 
         if free_play:
@@ -355,7 +606,8 @@ def load_freeplaygame(filename='game_save.json', free_play=False):
                 print("Invalid saved game state for Free Play mode. Starting a new game.")
                 return None, None, None
             else:
-                return grid, coins, score
+                # Decode a binary save here, where damaged rows are still caught
+                return ChunkedBoard.from_grid(grid), coins, score
         else:
             # For other modes, just return the loaded game state
             return game_state['grid'], game_state['coins'], game_state['score']
@@ -363,56 +615,130 @@ def load_freeplaygame(filename='game_save.json', free_play=False):
     except FileNotFoundError:
         print("No saved game found. Starting a new game.")
         return None, None, None
+    except ValueError:
+        print("The saved game is empty or damaged. Starting a new game.")
+        return None, None, None
+
 
 
+def recover_game(filename, mode='arcade'):
+    """Offer to resume the game an interrupted session left in filename's recovery file.
+
+    The game modes journal every move to the recovery file rather than the
+    save, so only an explicit save replaces the save file. Returns the
+    recovered (grid, coins, score), or Nones if there is nothing to recover
+    or the player declines.
+    """
+    from journal import recovery_filename
+    recovery = recovery_filename(filename)
+    _flush_saves()  # The recovery file of a finished game may still be queued for removal
+    if not os.path.exists(recovery):
+        return None, None, None
+    if ask("Do you want to recover the game that was interrupted? (y/n): ").strip().lower() != 'y':
+        return None, None, None
+    return load_freeplaygame(recovery, free_play=mode == 'free_play')
+
 
 def free_play_mode():
     """Main game loop for Free Play mode with unlimited coins and grid expansion."""
-    load_prev_game = input("Do you want to load the previous game? (y/n): ").strip().lower() == 'y'
-    if load_prev_game:
-        grid, coins, score = load_freeplaygame()
-        if grid is None:  # No saved game found or invalid
-            grid = [['P' for _ in range(cols)] for _ in range(rows)]
-            coins = float('inf')  # Reset coins for new game
-            score = 0
+    rows, cols = 5, 5
 
+    grid, coins, score = recover_game(FREE_PLAY_SAVE, 'free_play')
+    if grid is None:
+        load_prev_game = ask("Do you want to load the previous game? (y/n): ").strip().lower() == 'y'
+        if load_prev_game:
+            grid, coins, score = load_freeplaygame(saved_file(FREE_PLAY_SAVE, OLD_FREE_PLAY_SAVE),
+                                                   free_play=True)
+    if grid is None:  # New game, or no saved game found or invalid
+        grid = [['P' for _ in range(cols)] for _ in range(rows)]
+        coins = 999999999999999999  # Unlimited coins
+        score = 0
 
+    # Only chunks holding buildings are stored, so expanding never copies cells
+    if not isinstance(grid, ChunkedBoard):
+        grid = ChunkedBoard.from_grid(grid)
 
-    rows, cols = 5, 5
-    grid = [['P' for _ in range(cols)] for _ in range(rows)]
-    coins = 999999999999999999  # Unlimited coins
-    score = 0
+    # Open while the game runs, so the prompts below an ANSI frame are counted
+    with Renderer(RENDER_MODE) as renderer:
+        return _free_play_turns(renderer, grid, coins, score)
 
-    def print_grid(grid):
-        for row in grid:
-            print(' '.join(row))
 
-    print("Initial grid:")
-    print_grid(grid)
+def _free_play_turns(renderer, grid, coins, score):
+    """Play Free Play turns on grid until the player saves."""
+    renderer.draw(grid, "Initial grid:")
+    print("Enter Z instead of a building to undo a move, or Y to redo it.")
 
     first_building = True
+    scorer = IncrementalScorer(grid, 'free_play')
+
+    from replay import Recorder
+    seed = next_seed()
+    rng = random.Random(seed)
+    recorder = Recorder('free_play', seed, grid=grid, coins=coins)
+    history = History()
+
+    # Every move is journalled to the recovery file; full snapshots are taken now and then
+    from journal import SaveJournal, recovery_filename
+    save_journal = SaveJournal(recovery_filename(FREE_PLAY_SAVE), binary=True,
+                               writer=_autosave_writer())
+    save_journal.snapshot(grid, coins, score)
 
     while True:
-        ansbuilding, row, col = choose_building(grid, first_building, free_play=True)
+        ansbuilding, row, col = choose_building(grid, first_building, free_play=True,
+                                                renderer=renderer, rng=rng, history=history)
         if ansbuilding is None:
+            recorder.reject()
+            continue
+        if ansbuilding == 'undo':
+            move = take_back('undo', history, grid, scorer, recorder, save_journal)
+            if move is not None:
+                score, _ = move.before
+                first_building = move.first_building
+                renderer.scroll(-move.expansion, -move.expansion)
+                renderer.draw(grid, "Move undone:", (move.row, move.col))
+                print(f"Current score: {score}")
+            continue
+        if ansbuilding == 'redo':
+            move = take_back('redo', history, grid, scorer, recorder, save_journal)
+            if move is not None:
+                score, _ = move.after
+                first_building = False
+                shift = move.expansion
+                renderer.scroll(shift, shift)
+                renderer.draw(grid, "Move redone:", (move.row + shift, move.col + shift))
+                print(f"Current score: {score}")
             continue
 
-        grid[row][col] = ansbuilding
+        previous, before, was_first = grid[row][col], (score, coins), first_building
         first_building = False
-        score = calculate_score_free_play(grid)
-        
-        print("Updated grid:")
-        print_grid(grid)
-        print(f"Current score: {score}")
+        with instrument.phase('scoring'):
+            score, _ = scorer.place(ansbuilding, row, col)
+        recorder.place(ansbuilding, row, col)
 
+        # The board is drawn once per turn, after any expansion
+        shift = 0
         if row in [0, len(grid) - 1] or col in [0, len(grid[0]) - 1]:
+            rows_before = len(grid)
             grid = expand_grid(grid)
-            print("Grid expanded:")
-            print_grid(grid)
+            scorer.rebind(grid)
+            shift = (len(grid) - rows_before) // 2
+            renderer.scroll(shift, shift)  # Keep the same cells in view
+            renderer.draw(grid, "Grid expanded:", (row + shift, col + shift))
+        else:
+            renderer.draw(grid, "Updated grid:", (row, col))
+        print(f"Current score: {score}")
+        history.record(Move(ansbuilding, row, col, previous, shift, before, (score, coins),
+                            was_first))
+
+        # Journalled after expanding, so a snapshot matches the coordinates of the next move
+        save_journal.record(ansbuilding, row, col, grid, coins, score)
+        instrument.end_turn()
 
-        if input("Do you want to save the game progress? (y/n): ").strip().lower() == 'y':
+        if ask("Do you want to save the game progress? (y/n): ").strip().lower() == 'y':
             save_game_free_play(grid, coins, score)
-            choose()
+            save_journal.clear()  # The save now holds the game
+            write_replay(recorder, score, coins)
+            return 'menu'
 
 
 
@@ -426,35 +752,99 @@ def free_play_mode():
 
    
 
-def choose():
+def main_menu():
+    """Show the main menu once and return the state the player picked."""
     print("Ngee Ann City")
     print("1.) Arcade Mode")
     print("2.) FreePlay Mode")
     print("3.) LeaderBoard")
-    ans = int(input("Choose option:"))
-    if ans == 1:
-      print("You entered Arcade Mode.")
-      arcade_mode()
-    elif ans == 2:
-      print("You entered FreePlay Mode.")
-      free_play_mode()
-      
-    elif ans == 3:
-      print("You entered LeaderBoard.")
-      display_high_scores()
-      if input("Do you want to go back mainpage? (y/n): ").strip().lower() == 'y':
-          choose()
-      else:
-          print('Game will exit')
-    else:
-      print("You entered a number other than 1, 2, or 3.")
-      print("Try again")
-      choose()
-
-
-
-
-choose()
+    ans = ask("Choose option:").strip()
+    if ans == '1':
+        print("You entered Arcade Mode.")
+        return 'arcade'
+    if ans == '2':
+        print("You entered FreePlay Mode.")
+        return 'free_play'
+    if ans == '3':
+        print("You entered LeaderBoard.")
+        return 'leaderboard'
+    print("You entered a number other than 1, 2, or 3.")
+    print("Try again")
+    return 'menu'
+
+
+def leaderboard_screen():
+    """Show the leaderboard, then return to the menu or exit."""
+    display_high_scores()
+    if ask("Do you want to go back mainpage? (y/n): ").strip().lower() == 'y':
+        return 'menu'
+    print('Game will exit')
+    return 'exit'
+
+
+# Every screen returns the name of the next one, so moving between the menu
+# and the modes never nests calls and the stack stays flat however long the session
+STATES = {
+    'menu': main_menu,
+    'arcade': arcade_mode,
+    'free_play': free_play_mode,
+    'leaderboard': leaderboard_screen,
+}
+
+
+def choose(state='menu'):
+    """Run the menu/game state machine from state until the player exits."""
+    while state != 'exit':
+        state = STATES[state]()
+
+
+def main(argv=None):
+    """Command-line entry point: python -m samplegame [options], see --help."""
+    global SEED, REPLAY_DIR
+    import argparse
+    parser = argparse.ArgumentParser(description="Ngee Ann City")
+    parser.add_argument('--mode', choices=['arcade', 'free_play', 'leaderboard'],
+                        help="start this mode instead of showing the menu")
+    parser.add_argument('--scoring-backend', choices=['python', 'numpy', 'bitboard'])
+    parser.add_argument('--render', choices=['auto', 'plain', 'ansi', 'off'],
+                        help="how to draw the board (default: auto)")
+    parser.add_argument('--profile', metavar='PATH', default=os.environ.get('NGEEANN_PROFILE'),
+                        help="time every turn and write PATH.json and PATH.prom on exit")
+    parser.add_argument('--seed', type=int, help="seed of the first game's building offers")
+    parser.add_argument('--replay-dir', default=REPLAY_DIR,
+                        help="write a replay of every game to this directory")
+    parser.add_argument('--autosave', choices=['off', 'never', 'interval', 'always'],
+                        help="write saves on a background thread with this fsync policy "
+                             "(default: off)")
+    args = parser.parse_args(argv)
+
+    if args.seed is not None:
+        SEED = args.seed
+    REPLAY_DIR = args.replay_dir
+
+    if args.scoring_backend:
+        set_scoring_backend(args.scoring_backend)
+    if args.render:
+        set_render_mode(args.render)
+    if args.autosave:
+        set_autosave(args.autosave)
+    if args.profile:
+        instrument.enable()
+    try:
+        choose(args.mode or 'menu')
+    finally:
+        if AUTOSAVE != 'off':
+            import autosave
+            stats = autosave.shutdown()
+            if stats is not None:
+                print(autosave.report(stats))
+        if args.profile:
+            instrument.write(args.profile)
+            print(f"Profile written to {args.profile}.json and {args.profile}.prom")
+
+
+if __name__ == '__main__':
+    main()
 
 
 
@@ -0,0 +1,56 @@
+"""Scripted players: stand-ins for stdin and stdout that play samplegame from code.
+
+The soak test, the session benchmark and the tests drive the real menu and
+game modes this way, every prompt answered by a Player subclass::
+
+    with playing(player, workdir):
+        samplegame.choose()
+"""
+
+import builtins
+import contextlib
+import io
+import os
+import re
+
+
+class Player:
+    """Stands in for stdin and stdout, keeping the buildings offered last; subclasses answer.
+
+    With output='capture' everything the game prints is kept in
+    self.captured; with 'discard' it is dropped as it is written.
+    """
+
+    def __init__(self, output='discard'):
+        self.offered = []
+        self.captured = io.StringIO() if output == 'capture' else None
+
+    def write(self, text):
+        if text.startswith("['"):  # The list printed after "Randomly selected buildings:"
+            self.offered = re.findall(r"'(.)'", text)
+        if self.captured is not None:
+            self.captured.write(text)
+        return len(text)
+
+    def flush(self):
+        pass
+
+    def input(self, prompt=''):
+        return self.answer(prompt)
+
+    def answer(self, prompt):
+        raise NotImplementedError
+
+
+@contextlib.contextmanager
+def playing(player, workdir):
+    """Make player the game's stdin and stdout, and workdir, where its files go, the current directory."""
+    cwd, real_input = os.getcwd(), builtins.input
+    os.chdir(workdir)
+    builtins.input = player.input
+    try:
+        with contextlib.redirect_stdout(player):
+            yield player
+    finally:
+        builtins.input = real_input
+        os.chdir(cwd)
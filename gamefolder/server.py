@@ -0,0 +1,334 @@
+"""Game server: many players over TCP, each session a coroutine in one asyncio process.
+
+The protocol is line based and mirrors the prompts of samplegame.py. The
+server sends lines of UTF-8 text; a line starting with ``'? '`` is a prompt,
+and the client answers every prompt with one line. Anything else is output
+for the player (boards, scores, messages). Closing the connection ends the
+session; an unsaved game is lost, as when quitting samplegame.py.
+
+Games are played by engine.HeadlessGame, so the rules are exactly those of
+the terminal game. Each player has their own save files, named after the
+name given at the start, written with the same snapshot format and
+semantics as save_game; sessions logged in under the same name share them,
+and the last save wins. Finished games go to the shared leaderboard through
+a single writer task, which batches the scores of many sessions into one
+SQLite transaction off the event loop. An idle session is one coroutine
+waiting on its socket, so a process holds thousands of them::
+
+    python server.py --port 8765
+    python loadclient.py --port 8765 --sessions 5000 --players 100
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+import re
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+import journal
+from engine import HeadlessGame
+from render import Renderer
+
+PROMPT = '? '
+
+# Largest part of a board sent after a move; a bigger Free Play board is shown around the move
+VIEW_SIZE = 20
+
+NAME = re.compile(r'[A-Za-z0-9_-]{1,32}')
+
+logger = logging.getLogger(__name__)
+
+
+def raise_open_file_limit():
+    """Allow as many open sockets as the hard limit does; every session holds one."""
+    try:
+        import resource
+    except ImportError:  # Not on Windows
+        return
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    if soft != hard:
+        resource.setrlimit(resource.RLIMIT_NOFILE, (hard, hard))
+
+
+class LeaderboardWriter:
+    """The only writer of the leaderboard file, fed by every session through a queue.
+
+    SQLite calls block, so they run on one dedicated thread that owns the
+    connection; scores queued while a write is in progress go in together
+    in the next transaction. A failed write is logged and its scores are
+    dropped, so the sessions and close() never wait on a dead writer.
+    """
+
+    def __init__(self, filename):
+        self.filename = filename
+        self.queue = asyncio.Queue()
+        self.writes = 0  # Transactions, for the statistics
+        self._executor = ThreadPoolExecutor(1, thread_name_prefix='leaderboard')
+        self._board = None
+        self._task = None
+
+    async def _call(self, func, *args):
+        return await asyncio.get_running_loop().run_in_executor(self._executor, func, *args)
+
+    async def start(self):
+        import samplegame
+        self._board = await self._call(samplegame.open_leaderboard, self.filename)
+        self._task = asyncio.create_task(self._run())
+
+    async def _run(self):
+        while True:
+            batch = [await self.queue.get()]
+            while not self.queue.empty():
+                batch.append(self.queue.get_nowait())
+            try:
+                await self._call(self._board.add_many, batch)
+                self.writes += 1
+            except Exception:
+                logger.exception("Writing %d scores to the leaderboard failed", len(batch))
+            finally:
+                for _ in batch:
+                    self.queue.task_done()
+
+    def add(self, score, mode):
+        """Queue a score; it is written shortly after, without blocking the session."""
+        self.queue.put_nowait((score, mode, datetime.now().strftime("%Y-%m-%d %H:%M:%S")))
+
+    async def top(self, k=10, mode='arcade'):
+        return await self._call(self._board.top, k, mode)
+
+    async def close(self):
+        """Write every queued score, then close the file."""
+        await self.queue.join()
+        self._task.cancel()
+        await self._call(self._board.close)
+        self._executor.shutdown()
+
+
+class Session:
+    """One connected player: the menu, the game modes and the player's saves."""
+
+    def __init__(self, server, reader, writer):
+        self.server = server
+        self.reader = reader
+        self.writer = writer
+        self.name = None
+
+    # Renderer output goes straight to the socket
+    def write(self, text):
+        self.writer.write(text.encode())
+
+    def flush(self):
+        pass
+
+    def say(self, *lines):
+        self.write(''.join(f'{line}\n' for line in lines))
+
+    async def ask(self, prompt):
+        """Send a prompt and return the player's answer, stripped."""
+        self.write(f'{PROMPT}{prompt}\n')
+        await self.writer.drain()
+        line = await self.reader.readline()
+        if not line:
+            raise ConnectionResetError("Player disconnected")
+        return line.decode(errors='replace').strip()
+
+    def save_filename(self, mode, old=False):
+        """Return the player's save of a mode; old gives the JSON name Free Play saves had."""
+        if mode == 'arcade':
+            return os.path.join(self.server.save_dir, f'{self.name}.json')
+        extension = '.json' if old else '.sav'  # Free Play saves are binary
+        return os.path.join(self.server.save_dir, f'{self.name}_free_play{extension}')
+
+    async def run(self):
+        self.say("Ngee Ann City")
+        while self.name is None:
+            name = await self.ask("Enter your name:")
+            if NAME.fullmatch(name):
+                self.name = name
+            else:
+                self.say("Names are 1-32 letters, digits, '-' or '_'.")
+        state = 'menu'
+        while state != 'exit':
+            state = await getattr(self, state)()
+
+    async def menu(self):
+        self.say("1.) Arcade Mode", "2.) FreePlay Mode", "3.) LeaderBoard", "4.) Exit")
+        ans = await self.ask("Choose option:")
+        states = {'1': 'arcade', '2': 'free_play', '3': 'leaderboard', '4': 'exit'}
+        if ans in states:
+            return states[ans]
+        self.say("You entered a number other than 1, 2, 3 or 4.", "Try again")
+        return 'menu'
+
+    async def leaderboard(self):
+        high_scores = await self.server.leaderboard.top(10, 'arcade')
+        if not high_scores:
+            self.say("No high scores yet.")
+            return 'menu'
+        self.say("High Scores:")
+        for idx, entry in enumerate(high_scores, 1):
+            date = f" ({entry['date']})" if entry['date'] else ''
+            self.say(f"{idx}. {entry['score']}{date}")
+        return 'menu'
+
+    async def arcade(self):
+        return await self.play('arcade')
+
+    async def free_play(self):
+        return await self.play('free_play')
+
+    async def load(self, mode):
+        """Return the player's saved game of a mode, or a new game."""
+        import samplegame
+
+        def read():
+            filename = self.save_filename(mode)
+            if mode == 'free_play':
+                filename = samplegame.saved_file(filename, self.save_filename(mode, old=True))
+            state = samplegame.read_game_state(filename, mode)
+            # Binary saves are decoded here, so damaged rows are caught below
+            grid = state['grid']
+            first_building = all(cell == 'P' for row in grid for cell in row)
+            return HeadlessGame.from_state(grid, state['coins'], first_building, mode)
+
+        try:
+            game = await asyncio.to_thread(read)
+        except FileNotFoundError:
+            self.say("No saved game found. Starting a new game.")
+            return HeadlessGame(mode)
+        except ValueError:
+            self.say("The saved game is empty or damaged. Starting a new game.")
+            return HeadlessGame(mode)
+        self.say("Game progress loaded.")
+        return game
+
+    async def save(self, game):
+        """Save a game like save_game: a snapshot replaces the old save and its journal."""
+        filename = self.save_filename(game.mode)
+
+        def write():
+            journal.write_snapshot(filename, game.grid, game.coins, game.score,
+                                   binary=game.mode == 'free_play')
+            journal.discard_journal(filename)
+
+        await asyncio.to_thread(write)
+        self.say("Game progress saved.")
+
+    async def choose_building(self, game):
+        """Offer two buildings and ask for one and its position, as choose_building does."""
+        offered = game.offer()
+        self.say(f"Randomly selected buildings: {offered}")
+        building = (await self.ask("Choose which building to build:")).upper()
+        if building not in offered:
+            self.say(f"{building} is not in the randomly selected buildings.")
+            return None, None, None
+        self.say(f"{building} is in the randomly selected buildings.")
+        rows, cols = len(game.grid), len(game.grid[0])
+        while True:
+            try:
+                row = int(await self.ask(f"Enter the row number (0-{rows - 1}) to place {building}:"))
+                col = int(await self.ask(f"Enter the column number (0-{cols - 1}) to place {building}:"))
+            except ValueError:
+                self.say("Invalid input. Please enter numeric values.")
+                continue
+            if not (0 <= row < rows and 0 <= col < cols):
+                self.say("Invalid position. Please enter valid row and column numbers.")
+            elif game.is_legal(row, col):
+                return building, row, col
+            else:
+                self.say("Invalid position. The spot is either taken or not adjacent to an existing building.")
+
+    async def play(self, mode):
+        """Play one game of a mode, like arcade_mode and free_play_mode."""
+        if (await self.ask("Do you want to load the previous game? (y/n):")).lower() == 'y':
+            game = await self.load(mode)
+        else:
+            game = HeadlessGame(mode)
+        renderer = Renderer('plain', self, VIEW_SIZE, VIEW_SIZE)
+        renderer.draw(game.grid, "Initial grid:")
+        if mode == 'arcade':
+            self.say(f"Initial coins: {game.coins}")
+
+        while not game.is_over():
+            building, row, col = await self.choose_building(game)
+            if building is None:
+                continue
+            # The offset of the move if the board expands around it
+            shift = len(game.grid)
+            game.play(building, row, col)
+            shift = (len(game.grid) - shift) // 2
+            self.server.moves += 1
+            renderer.draw(game.grid, "Updated grid:", (row + shift, col + shift))
+            if mode == 'arcade':
+                self.say(f"Remaining coins: {game.coins}")
+            self.say(f"Current score: {game.score}")
+
+            if game.is_over():
+                self.server.leaderboard.add(game.score, mode)
+                self.say("No more coins left. Exiting the game.")
+                return 'menu'
+            if (await self.ask("Do you want to save the game progress? (y/n):")).lower() == 'y':
+                await self.save(game)
+                return 'menu'
+        return 'menu'
+
+
+class GameServer:
+    """Accepts players and runs a Session for each until they disconnect."""
+
+    def __init__(self, save_dir='saves', leaderboard_file='high_scores.db'):
+        self.save_dir = save_dir
+        self.leaderboard = LeaderboardWriter(leaderboard_file)
+        self.sessions = 0  # Connected right now
+        self.peak_sessions = 0
+        self.moves = 0
+
+    async def handle(self, reader, writer):
+        self.sessions += 1
+        self.peak_sessions = max(self.peak_sessions, self.sessions)
+        try:
+            await Session(self, reader, writer).run()
+            await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            self.sessions -= 1
+            writer.close()
+
+    async def serve(self, host='127.0.0.1', port=8765, ready=None):
+        """Serve until cancelled; ready, if given, is called with the listening socket's port."""
+        os.makedirs(self.save_dir, exist_ok=True)
+        await self.leaderboard.start()
+        server = await asyncio.start_server(self.handle, host, port, backlog=4096)
+        if ready is not None:
+            ready(server.sockets[0].getsockname()[1])
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            await self.leaderboard.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Ngee Ann City game server.")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--save-dir', default='saves', help="directory of the players' save files")
+    parser.add_argument('--leaderboard', default='high_scores.db')
+    args = parser.parse_args(argv)
+
+    raise_open_file_limit()
+    server = GameServer(args.save_dir, args.leaderboard)
+    try:
+        asyncio.run(server.serve(args.host, args.port,
+                                 lambda port: print(f"Listening on {args.host}:{port}", flush=True)))
+    except KeyboardInterrupt:
+        pass
+    print(f"Peak sessions: {server.peak_sessions}, moves: {server.moves}, "
+          f"leaderboard writes: {server.leaderboard.writes}")
+
+
+if __name__ == '__main__':
+    main()
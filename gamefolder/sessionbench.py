@@ -0,0 +1,343 @@
+"""End-to-end throughput of the turn loop: scripted sessions through samplegame.choose().
+
+The microbenchmarks time scoring, drawing and saving one at a time; this
+plays whole sessions through the menu, arcade_mode and free_play_mode,
+with a player standing in for stdin and stdout, so every prompt,
+validation, expansion, redraw and journal write of a turn is counted.
+
+A turn runs from answering its column prompt to the next prompt. Turn
+latencies go into an instrument.Histogram with log-spaced buckets, so
+percentiles cost constant memory
+and a session of a million moves has the peak RSS of the game, not of its
+measurements. Every session runs in a fresh interpreter, so peak RSS and
+warm caches belong to that session alone::
+
+    python sessionbench.py --mode arcade --moves 1000 10000 100000 1000000
+    python sessionbench.py --mode free_play --moves 100000 --save baseline.json
+    python sessionbench.py --mode free_play --moves 100000 --compare baseline.json
+
+Players are generated from a seed: Arcade players build a random offered
+building on a random legal cell, Free Play players walk one cell at a time
+(so the board grows the way a person's does), and --save-every N saves and
+resumes the game every N turns. --script FILE plays the answers in FILE
+instead, one per line; a script that ends back at the menu is repeated
+until the session has made its moves. Offers are drawn from --seed as
+with ``samplegame.py --seed``, so a session recorded with a seed replays
+with the same one.
+"""
+
+import argparse
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+
+import samplegame
+import scripted
+from instrument import Histogram, log_buckets
+
+ARCADE_SIZE = 20
+FREE_PLAY_SIZE = 5
+
+# Free Play boards grow by this many cells on every side when a building reaches the edge
+EXPANSION = 5
+
+MOVES = [1000, 10000]
+
+# Latency buckets grow by 2%, so percentiles are exact to within that
+LATENCY_BUCKETS = log_buckets(1e-7, 3600.0, 1.02)
+
+
+class SessionEnd(Exception):
+    """Raised from input() to leave the game once the session has made its moves."""
+
+
+class Player(scripted.Player):
+    """A scripted player timing every turn; subclasses choose the answers.
+
+    games counts the games started or resumed from a save.
+    """
+
+    def __init__(self, moves, output='discard'):
+        super().__init__(output)
+        self.moves_left = moves
+        self.turns = 0
+        self.games = 0
+        self.latency = Histogram(LATENCY_BUCKETS)
+        self._turn_start = None
+
+    def input(self, prompt=''):
+        if self._turn_start is not None:
+            self.latency.add(time.perf_counter() - self._turn_start)
+            self._turn_start = None
+            if self.moves_left == 0:
+                raise SessionEnd
+        answer = self.answer(prompt)
+        if prompt.startswith("Enter the column"):
+            self.turns += 1
+            self.moves_left -= 1
+            self._turn_start = time.perf_counter()
+        return answer
+
+
+class ScriptedPlayer(Player):
+    """Answers prompts with the lines of a script, from the start again when it runs out."""
+
+    def __init__(self, lines, moves, output='discard'):
+        super().__init__(moves, output)
+        if not lines:
+            raise ValueError("The script is empty")
+        self.lines = lines
+        self.position = 0
+
+    def answer(self, prompt):
+        if prompt.startswith("Do you want to load"):
+            self.games += 1
+        line = self.lines[self.position]
+        self.position = (self.position + 1) % len(self.lines)
+        return line
+
+
+class GeneratedPlayer(Player):
+    """Plays random legal moves of one mode, keeping its own copy of what the board allows."""
+
+    def __init__(self, mode, moves, seed=0, save_every=0, output='discard'):
+        super().__init__(moves, output)
+        if mode not in ('arcade', 'free_play'):
+            raise ValueError(f"Unknown mode: {mode}")
+        self.mode = mode
+        self.rng = random.Random(seed)
+        self.save_every = save_every
+        self.resume = False
+        self.row = self.col = 0
+        self._new_game()
+
+    def _new_game(self):
+        self.rows = self.cols = ARCADE_SIZE if self.mode == 'arcade' else FREE_PLAY_SIZE
+        self.first = True
+        # Arcade: the empty cells next to a building, as a list to pick from and a position index
+        self.frontier, self.index = [], {}
+        self.occupied = set()
+
+    def _add(self, cell):
+        if cell not in self.index and cell not in self.occupied:
+            self.index[cell] = len(self.frontier)
+            self.frontier.append(cell)
+
+    def _remove(self, cell):
+        position = self.index.pop(cell, None)
+        if position is None:
+            return
+        last = self.frontier.pop()
+        if position < len(self.frontier):
+            self.frontier[position] = last
+            self.index[last] = position
+
+    def _pick(self):
+        if self.first:
+            return self.rng.randrange(self.rows), self.rng.randrange(self.cols)
+        if self.mode == 'arcade':
+            return self.frontier[self.rng.randrange(len(self.frontier))]
+        # Free Play: one step from the last building, staying on the board
+        row_step, col_step = self.rng.choice(((-1, 0), (1, 0), (0, -1), (0, 1)))
+        return (min(max(self.row + row_step, 0), self.rows - 1),
+                min(max(self.col + col_step, 0), self.cols - 1))
+
+    def _placed(self, row, col):
+        self.first = False
+        if self.mode == 'free_play':
+            if row in (0, self.rows - 1) or col in (0, self.cols - 1):
+                self.rows += 2 * EXPANSION
+                self.cols += 2 * EXPANSION
+                self.row, self.col = row + EXPANSION, col + EXPANSION
+            return
+        self.occupied.add((row, col))
+        self._remove((row, col))
+        for neighbour in ((row - 1, col), (row + 1, col), (row, col - 1), (row, col + 1)):
+            if 0 <= neighbour[0] < self.rows and 0 <= neighbour[1] < self.cols:
+                self._add(neighbour)
+
+    def answer(self, prompt):
+        if prompt.startswith("Choose option"):
+            return '1' if self.mode == 'arcade' else '2'
+        if prompt.startswith("Do you want to load"):
+            self.games += 1
+            if self.resume:
+                self.resume = False
+                return 'y'
+            self._new_game()
+            return 'n'
+        if prompt.startswith("Choose which building"):
+            self.row, self.col = self._pick()
+            return self.rng.choice(self.offered)
+        if prompt.startswith("Enter the row"):
+            return str(self.row)
+        if prompt.startswith("Enter the column"):
+            col = self.col
+            self._placed(self.row, col)
+            return str(col)
+        if prompt.startswith("Do you want to save"):
+            if self.mode == 'arcade' and not self.frontier:
+                return 'y'  # The board is full: leave for a new game
+            if self.save_every and self.turns % self.save_every == 0:
+                self.resume = True
+                return 'y'
+            return 'n'
+        raise ValueError(f"Unexpected prompt: {prompt!r}")
+
+
+def peak_rss():
+    """Return the peak resident set size of this process in bytes, or None if unknown."""
+    try:
+        import resource
+    except ImportError:  # Windows
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == 'darwin' else peak * 1024  # Kilobytes on Linux
+
+
+def play(player):
+    """Run samplegame.choose() with player as stdin and stdout and return the session's stats."""
+    workdir = tempfile.TemporaryDirectory(prefix='ngeeann-session-')
+    start = time.perf_counter()
+    # Saves, journals and the leaderboard go to a scratch directory
+    with scripted.playing(player, workdir.name):
+        try:
+            samplegame.choose()
+        except SessionEnd:
+            pass
+        finally:
+            if samplegame.AUTOSAVE != 'off':
+                import autosave
+                autosave.shutdown()  # Write what is still queued before the directory goes
+            elapsed = time.perf_counter() - start
+    rss = peak_rss()
+    workdir.cleanup()
+    latency = player.latency
+    return {
+        'moves': player.turns,
+        'games': player.games,
+        'seconds': elapsed,
+        'turns_per_second': player.turns / elapsed if elapsed else 0.0,
+        'mean_ms': latency.total / latency.count * 1000 if latency.count else 0.0,
+        'p50_ms': latency.percentile(0.50) * 1000,
+        'p90_ms': latency.percentile(0.90) * 1000,
+        'p99_ms': latency.percentile(0.99) * 1000,
+        'p999_ms': latency.percentile(0.999) * 1000,
+        'max_ms': latency.max * 1000,
+        'peak_rss_mib': None if rss is None else rss / 2 ** 20,
+    }
+
+
+def run_session(moves, mode='arcade', seed=0, save_every=0, script=None, output='discard'):
+    """Play one session of moves turns in this process and return its stats."""
+    if script is not None:
+        with open(script, 'r') as f:
+            player = ScriptedPlayer([line.rstrip('\n') for line in f], moves, output)
+    else:
+        player = GeneratedPlayer(mode, moves, seed, save_every, output)
+    samplegame.SEED = seed  # The same offers, and so the same session, every run
+    stats = play(player)
+    stats['mode'] = 'script' if script is not None else mode
+    return stats
+
+
+def spawn_session(moves, options):
+    """Play one session in a fresh interpreter, so its peak RSS is its own, and return its stats."""
+    command = [sys.executable, os.path.abspath(__file__), '--session', '--moves', str(moves)]
+    command += options
+    result = subprocess.run(command, stdout=subprocess.PIPE, text=True, check=True)
+    return json.loads(result.stdout.splitlines()[-1])
+
+
+def report(stats):
+    """Return a one-line summary of a session's stats."""
+    rss = stats['peak_rss_mib']
+    return (f"{stats['mode']:<10} {stats['moves']:>8} moves {stats['games']:>7} games "
+            f"{stats['turns_per_second']:10.0f} turns/s  "
+            f"p50 {stats['p50_ms']:7.3f} ms  p90 {stats['p90_ms']:7.3f} ms  "
+            f"p99 {stats['p99_ms']:7.3f} ms  p99.9 {stats['p999_ms']:7.3f} ms  "
+            f"max {stats['max_ms']:8.2f} ms  "
+            f"peak RSS {'n/a' if rss is None else f'{rss:.1f} MiB'}")
+
+
+def to_baseline(sessions):
+    """Return sessions as a baseline dict of seconds, in the format of benchmarks.compare()."""
+    results = {}
+    for stats in sessions:
+        name = f"session[{stats['mode']}, {stats['moves']} moves]"
+        results[name + ' seconds/turn'] = 1 / stats['turns_per_second']
+        for metric in ('p50', 'p99'):
+            results[f"{name} {metric}"] = stats[metric + '_ms'] / 1000
+    return {'sessions': sessions, 'results': results}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="End-to-end throughput of scripted game sessions.")
+    parser.add_argument('--mode', choices=['arcade', 'free_play'], default='arcade')
+    parser.add_argument('--moves', type=int, nargs='+', default=MOVES,
+                        help=f"moves per session; one session per value (default: {MOVES})")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--save-every', type=int, default=0, metavar='N',
+                        help="save, leave and resume the game every N turns")
+    parser.add_argument('--script', metavar='FILE', help="answer the prompts with the lines of FILE")
+    parser.add_argument('--output', choices=['discard', 'capture'], default='discard',
+                        help="drop what the game prints, or keep it in memory as a terminal would")
+    parser.add_argument('--render', choices=['auto', 'plain', 'ansi', 'off'], default='ansi',
+                        help="how the game draws the board (default: ansi, as on a terminal)")
+    parser.add_argument('--scoring-backend', choices=['python', 'numpy', 'bitboard'])
+    parser.add_argument('--autosave', choices=['off', 'never', 'interval', 'always'])
+    parser.add_argument('--save', metavar='FILE', help="write the results as a JSON baseline")
+    parser.add_argument('--compare', metavar='FILE', help="compare against a JSON baseline")
+    parser.add_argument('--threshold', type=float, default=0.10,
+                        help="slowdown that counts as a regression (default: 0.10 = 10%%)")
+    parser.add_argument('--session', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.session:  # Spawned by spawn_session(): play one session and print its stats
+        samplegame.set_render_mode(args.render)
+        if args.scoring_backend:
+            samplegame.set_scoring_backend(args.scoring_backend)
+        if args.autosave:
+            samplegame.set_autosave(args.autosave)
+        stats = run_session(args.moves[0], args.mode, args.seed, args.save_every, args.script,
+                            args.output)
+        print(json.dumps(stats))
+        return
+
+    options = ['--mode', args.mode, '--seed', str(args.seed), '--save-every', str(args.save_every),
+               '--output', args.output, '--render', args.render]
+    if args.script:
+        options += ['--script', os.path.abspath(args.script)]
+    if args.scoring_backend:
+        options += ['--scoring-backend', args.scoring_backend]
+    if args.autosave:
+        options += ['--autosave', args.autosave]
+    sessions = []
+    for moves in args.moves:
+        stats = spawn_session(moves, options)
+        sessions.append(stats)
+        print(report(stats), flush=True)
+    current = to_baseline(sessions)
+
+    if args.save:
+        with open(args.save, 'w') as f:
+            json.dump(current, f, indent=2)
+        print(f"Baseline saved to {args.save}")
+
+    if args.compare:
+        from benchmarks import compare  # Imports every board type; only needed here
+        with open(args.compare, 'r') as f:
+            baseline = json.load(f)
+        regressions = compare(baseline, current, args.threshold)
+        if regressions:
+            print(f"{len(regressions)} regression(s) above {args.threshold:.0%}")
+            sys.exit(1)
+        print("No regressions.")
+
+
+if __name__ == '__main__':
+    main()
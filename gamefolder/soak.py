@@ -0,0 +1,115 @@
+"""Soak test for the menu loop: play thousands of quick Arcade games in one session.
+
+A scripted player answers every prompt of samplegame.choose(): it starts an
+Arcade game from the menu, fills the grid row by row (avoiding Industry, so
+no coins are earned and every game lasts 16 turns), goes back to the menu
+and starts again. Traced memory and the call stack depth are sampled at the
+menu, and the run fails if either keeps growing::
+
+    python soak.py --games 10000
+"""
+
+import argparse
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import samplegame
+from scripted import Player, playing
+
+ARCADE_SIZE = 20
+
+
+def stack_depth():
+    frame, depth = sys._getframe(1), 0
+    while frame is not None:
+        frame, depth = frame.f_back, depth + 1
+    return depth
+
+
+class ScriptedPlayer(Player):
+    """Answers prompts from what the game printed, sampling memory and stack depth at the menu."""
+
+    def __init__(self, games, sample_every=1000):
+        super().__init__()
+        self.games_left = games
+        self.sample_every = sample_every
+        self.games_started = 0
+        self.position = 0
+        self.samples = []  # (games played, traced bytes, stack depth)
+
+    def answer(self, prompt):
+        if prompt.startswith("Choose option"):
+            if self.games_started % self.sample_every == 0:
+                self.samples.append((self.games_started, tracemalloc.get_traced_memory()[0],
+                                     stack_depth()))
+            if self.games_left == 0:
+                return '3'
+            self.games_left -= 1
+            self.games_started += 1
+            self.position = 0
+            return '1'
+        if prompt.startswith("Choose which building"):
+            return ([building for building in self.offered if building != 'I'] or self.offered)[0]
+        if prompt.startswith("Enter the row"):
+            return str(self.position // ARCADE_SIZE)
+        if prompt.startswith("Enter the column"):
+            self.position += 1
+            return str((self.position - 1) % ARCADE_SIZE)
+        if prompt.startswith(("Do you want", "Show more")):
+            return 'n'  # Don't load, don't save, don't page, and exit from the leaderboard
+        raise ValueError(f"Unexpected prompt: {prompt!r}")
+
+
+def soak(games, sample_every=1000):
+    """Play games through the menu loop and return the player's samples."""
+    player = ScriptedPlayer(games, sample_every)
+    workdir = tempfile.mkdtemp(prefix='ngeeann-soak-')
+    tracemalloc.start()
+    try:
+        with playing(player, workdir):  # Saves and the leaderboard go to a scratch directory
+            samplegame.choose()
+    finally:
+        tracemalloc.stop()
+    return player.samples
+
+
+def check(samples, max_growth=256 * 1024):
+    """Return what grew between the samples of a soak run: a list of messages, empty if nothing did."""
+    problems = []
+    # The first sample is taken before anything was imported or cached
+    baseline = samples[1] if len(samples) > 2 else samples[0]
+    growth = samples[-1][1] - baseline[1]
+    depths = {depth for _, _, depth in samples}
+    if len(depths) > 1:
+        problems.append(f"Stack depth changed between games: {sorted(depths)}")
+    if growth > max_growth:
+        problems.append(f"Memory grew by {growth / 1024:.1f} KiB")
+    return problems
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Menu loop soak test.")
+    parser.add_argument('--games', type=int, default=10000)
+    parser.add_argument('--sample-every', type=int, default=1000)
+    parser.add_argument('--max-growth', type=int, default=256 * 1024,
+                        help="traced bytes memory may grow by after the first sample")
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    samples = soak(args.games, args.sample_every)
+    elapsed = time.perf_counter() - start
+    for games, traced, depth in samples:
+        print(f"{games:>8} games {traced / 1024:10.1f} KiB traced, stack depth {depth}")
+    print(f"{args.games} games in {elapsed:.1f} s")
+
+    problems = check(samples, args.max_growth)
+    if problems:
+        print('\n'.join(problems))
+        sys.exit(1)
+    print("Memory and stack depth stayed flat.")
+
+
+if __name__ == '__main__':
+    main()
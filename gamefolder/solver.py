@@ -0,0 +1,360 @@
+"""Exact best score on tiny boards, by branch and bound over the game tree.
+
+The game tree grows exponentially with the number of cells, so this is
+only practical up to 3x3: a 3x3 board with the offers of a seeded game
+takes seconds (over a minute when every turn may pick any building), 3x4
+already runs for minutes and a 5x5 board is far out of reach. The command
+line refuses boards of more than MAX_CELLS cells.
+
+The solver plays a fixed sequence of offers (two buildings per turn, as
+choose_building draws them) or, without one, lets every turn pick any
+building, and finds the highest final score any player could reach. Boards
+keep their size: Free Play's expansion is not modelled, and buildings go
+on empty cells only (replacing one, which Free Play allows, is not
+searched). Arcade games also end when the coins run out.
+
+- Positions are hashed with Zobrist keys, updated in O(1) per move. The
+  hashes of all the board's symmetries (8 for a square, 4 otherwise) are
+  kept side by side and the smallest one is the key, so mirrored and
+  rotated positions share one table entry.
+- The transposition table has a fixed number of slots. A slot holds one
+  position; a new one replaces it when it took at least as much search.
+- The scores of cells only depend on their neighbours, so from the rule
+  set's lookup tables we get the most a placed building can add: its own
+  best score plus the best increase it can give each of four neighbours.
+  The current score plus that for every remaining turn (and the largest
+  possible board terms) bounds every line; lines that cannot beat the
+  best found so far are cut.
+
+    python solver.py --rows 3 --cols 3 --rules free_play --turns 9 --seed 1
+"""
+
+import random
+import time
+
+import engine
+from frontier import Frontier
+from incremental import IncrementalScorer
+from rules import KINDS, NEIGHBOUR_KEYS, TABLE_STRIDE, get_rules
+
+TABLE_BITS = 20
+
+# The largest board (rows * cols) the command line solves
+MAX_CELLS = 9
+
+EXACT = 0
+UPPER = 1  # The position's value is at most the stored one
+
+
+def symmetries(rows, cols):
+    """Return the board's symmetries as functions of (row, col)."""
+    last_row, last_col = rows - 1, cols - 1
+    maps = [
+        lambda r, c: (r, c),
+        lambda r, c: (last_row - r, c),
+        lambda r, c: (r, last_col - c),
+        lambda r, c: (last_row - r, last_col - c),
+    ]
+    if rows == cols:
+        maps += [
+            lambda r, c: (c, r),
+            lambda r, c: (last_col - c, r),
+            lambda r, c: (c, last_row - r),
+            lambda r, c: (last_col - c, last_row - r),
+        ]
+    return maps
+
+
+class TranspositionTable:
+    """Fixed-size table of search results, keyed by position hash."""
+
+    def __init__(self, bits=TABLE_BITS):
+        self.mask = (1 << bits) - 1
+        self.slots = [None] * (1 << bits)
+        self.probes = 0
+        self.hits = 0
+        self.stores = 0
+        self.evictions = 0
+
+    def get(self, key):
+        """Return (value, flag) stored for key, or None."""
+        self.probes += 1
+        entry = self.slots[key & self.mask]
+        if entry is not None and entry[0] == key:
+            self.hits += 1
+            return entry[1], entry[2]
+        return None
+
+    def put(self, key, value, flag, work):
+        """Store a result; work (nodes searched for it) decides who keeps a shared slot."""
+        slot = key & self.mask
+        entry = self.slots[slot]
+        if entry is not None and entry[0] != key:
+            if work < entry[3]:
+                return
+            self.evictions += 1
+        self.slots[slot] = (key, value, flag, work)
+        self.stores += 1
+
+    def hit_rate(self):
+        return self.hits / self.probes if self.probes else 0.0
+
+
+def best_scores(compiled):
+    """Return the best score of every building given some of its neighbours.
+
+    The result is indexed by ``(table index) * 5 + open``: the building's
+    lookup table index for the neighbours it has, and the number of its
+    empty neighbours, each of which may still get any building or none.
+    """
+    table = compiled.table
+    best = [0] * (len(table) * 5)
+    # Neighbourhoods by number of neighbours, most first, so filling an empty one is known
+    neighbourhoods = sorted((key for key in range(TABLE_STRIDE)
+                             if sum(key // 5 ** i % 5 for i in range(len(KINDS))) <= 4),
+                            key=lambda key: -sum(key // 5 ** i % 5 for i in range(len(KINDS))))
+    for building in KINDS:
+        base = compiled.offsets[building]
+        for key in neighbourhoods:
+            taken = sum(key // 5 ** i % 5 for i in range(len(KINDS)))
+            index = base + key
+            best[index * 5] = table[index][0]
+            for open_cells in range(1, 5 - taken):
+                best[index * 5 + open_cells] = max(
+                    [best[index * 5 + open_cells - 1]]
+                    + [best[(index + NEIGHBOUR_KEYS[kind]) * 5 + open_cells - 1] for kind in KINDS])
+    return best
+
+
+class Solver:
+    """Branch and bound search for the best final score of a small board."""
+
+    def __init__(self, rows, cols, rules='free_play', offers=None, turns=None, coins=None,
+                 table_bits=TABLE_BITS, seed=0):
+        self.rows, self.cols = rows, cols
+        self.rules = rules
+        self.arcade = rules != 'free_play'
+        if offers is None:
+            turns = rows * cols if turns is None else turns
+            offers = [tuple(engine.BUILDINGS)] * turns
+        self.offers = [tuple(offer) for offer in offers][:rows * cols]
+        self.start_coins = engine.ARCADE_COINS if coins is None else coins
+        self.table = TranspositionTable(table_bits)
+        self.nodes = 0
+        self.cutoffs = 0
+
+        compiled = get_rules(rules)
+        self.board_terms = compiled.board_terms
+        self.offsets = compiled.offsets
+        self.table_scores = compiled.table
+        self.best_scores = best_scores(compiled)
+        # The buildings still to be offered from each turn on
+        self.still_offered = [set() for _ in range(len(self.offers) + 1)]
+        for turn in range(len(self.offers) - 1, -1, -1):
+            self.still_offered[turn] = self.still_offered[turn + 1] | set(self.offers[turn])
+        self.neighbours = {(row, col): [(r, c) for r, c in ((row - 1, col), (row + 1, col),
+                                                            (row, col - 1), (row, col + 1))
+                                        if 0 <= r < rows and 0 <= c < cols]
+                           for row in range(rows) for col in range(cols)}
+
+        rng = random.Random(seed)
+        cells = [(row, col) for row in range(rows) for col in range(cols)]
+        keys = {(cell, building): rng.getrandbits(64) for cell in cells for building in KINDS}
+        # For each symmetry, the key of every (cell, building) seen through it
+        self.zobrist = [{(cell, building): keys[transform(*cell), building]
+                         for cell in cells for building in KINDS}
+                        for transform in symmetries(rows, cols)]
+        self.turn_keys = [rng.getrandbits(64) for _ in range(len(self.offers) + 1)]
+        self._coin_keys = {}
+        self._rng = rng
+
+    def _coin_key(self, coins):
+        key = self._coin_keys.get(coins)
+        if key is None:
+            key = self._coin_keys[coins] = self._rng.getrandbits(64)
+        return key
+
+    def _upper_bound(self, turn):
+        """Return a score no line from here can beat.
+
+        Every building scores at most its best with its empty neighbours
+        filled in the best way, and each of the cells the remaining turns
+        fill scores at most the best of the buildings still to be offered.
+        """
+        grid, best, offsets = self.grid, self.best_scores, self.offsets
+        offered = [offsets[building] for building in self.still_offered[turn]]
+        bound = 0
+        open_bounds = []
+        for (row, col), neighbours in self.neighbours.items():
+            key = open_cells = 0
+            for r, c in neighbours:
+                neighbour = grid[r][c]
+                if neighbour == 'P':
+                    open_cells += 1
+                else:
+                    key += NEIGHBOUR_KEYS[neighbour]
+            building = grid[row][col]
+            if building != 'P':
+                bound += best[(offsets[building] + key) * 5 + open_cells]
+            else:
+                open_bounds.append(max(best[(offset + key) * 5 + open_cells]
+                                       for offset in offered))
+        left = len(self.offers) - turn
+        open_bounds.sort(reverse=True)
+        bound += sum(value for value in open_bounds[:left] if value > 0)
+        counts = self.scorer.counts
+        for building, kind, points in self.board_terms:
+            if points > 0:
+                bound += points * (counts[building] + left) * (counts[kind] + left)
+            else:
+                bound += points * counts[building] * counts[kind]
+        return bound
+
+    def _moves(self, turn):
+        if self.arcade and self.scorer.counts['P'] < self.rows * self.cols:
+            positions = self.frontier.positions()
+        else:
+            grid = self.grid
+            positions = [(row, col) for row in range(self.rows) for col in range(self.cols)
+                         if grid[row][col] == 'P']
+        return [(building, row, col) for building in self.offers[turn]
+                for row, col in positions]
+
+    def _search(self, turn, coins, alpha):
+        """Return the best final score from here; a result <= alpha may only be an upper bound."""
+        self.nodes += 1
+        scorer = self.scorer
+        if turn == len(self.offers) or (self.arcade and coins <= 0):
+            return scorer.score
+        moves = self._moves(turn)
+        if not moves:
+            return scorer.score
+        key = min(self.hashes) ^ self.turn_keys[turn]
+        if self.arcade:
+            key ^= self._coin_key(coins)
+        entry = self.table.get(key)
+        if entry is not None:
+            value, flag = entry
+            if flag == EXACT or value <= alpha:
+                return value
+
+        bound = self._upper_bound(turn)
+        if bound <= alpha:
+            self.cutoffs += 1
+            self.table.put(key, bound, UPPER, 0)
+            return bound
+
+        nodes_before = self.nodes
+        # Try the moves where the building itself would score best first, to raise alpha early
+        grid, table, offsets = self.grid, self.table_scores, self.offsets
+        ordered = []
+        for building, row, col in moves:
+            index = offsets[building]
+            for r, c in self.neighbours[row, col]:
+                index += NEIGHBOUR_KEYS[grid[r][c]]
+            ordered.append((table[index][0], building, row, col))
+        ordered.sort(reverse=True)
+
+        best = None
+        for _, building, row, col in ordered:
+            next_coins = self._play(building, row, col, coins)
+            value = self._search(turn + 1, next_coins, alpha if best is None else max(alpha, best))
+            self._take_back(building, row, col)
+            if best is None or value > best:
+                best = value
+                if best >= bound:
+                    break
+        flag = EXACT if best > alpha else UPPER
+        self.table.put(key, best, flag, self.nodes - nodes_before)
+        return best
+
+    def _play(self, building, row, col, coins):
+        _, generated = self.scorer.place(building, row, col)
+        if self.arcade:
+            self.frontier.update(self.grid, row, col)
+            coins += generated - 1
+        for hashes_index, zobrist in enumerate(self.zobrist):
+            self.hashes[hashes_index] ^= zobrist[(row, col), building]
+        return coins
+
+    def _take_back(self, building, row, col):
+        self.scorer.place('P', row, col)
+        if self.arcade:
+            self.frontier.update(self.grid, row, col)
+        for hashes_index, zobrist in enumerate(self.zobrist):
+            self.hashes[hashes_index] ^= zobrist[(row, col), building]
+
+    def _reset(self):
+        self.grid = [['P'] * self.cols for _ in range(self.rows)]
+        self.scorer = IncrementalScorer(self.grid, self.rules)
+        self.frontier = Frontier(self.rows, self.cols)
+        self.hashes = [0] * len(self.zobrist)
+
+    def solve(self):
+        """Return (best score, best line), the line as a list of (building, row, col)."""
+        self._reset()
+        best = self._search(0, self.start_coins, float('-inf'))
+        # Follow moves that still reach the best score; the table makes this cheap
+        line, turn, coins = [], 0, self.start_coins
+        while turn < len(self.offers) and not (self.arcade and coins <= 0):
+            for building, row, col in self._moves(turn):
+                next_coins = self._play(building, row, col, coins)
+                if self._search(turn + 1, next_coins, best - 1) >= best:
+                    line.append((building, row, col))
+                    turn, coins = turn + 1, next_coins
+                    break
+                self._take_back(building, row, col)
+            else:
+                break
+        return best, line
+
+    def stats(self, elapsed):
+        return {
+            'nodes': self.nodes,
+            'nodes_per_second': self.nodes / elapsed if elapsed else 0.0,
+            'cutoffs': self.cutoffs,
+            'table_probes': self.table.probes,
+            'table_hit_rate': self.table.hit_rate(),
+            'table_evictions': self.table.evictions,
+        }
+
+
+def offer_sequence(turns, seed):
+    """Return the offers of the first turns of a game with this seed, as HeadlessGame draws them."""
+    game = engine.HeadlessGame(seed=seed)
+    return [game.offer() for _ in range(turns)]
+
+
+def main(argv=None):
+    import argparse
+    parser = argparse.ArgumentParser(description="Exact best score on a small board.")
+    parser.add_argument('--rows', type=int, default=3)
+    parser.add_argument('--cols', type=int, default=3)
+    parser.add_argument('--rules', choices=['arcade', 'free_play', 'npcity'], default='free_play')
+    parser.add_argument('--turns', type=int, default=None, help="default: fill the board")
+    parser.add_argument('--seed', type=int, default=None,
+                        help="play the offers of the game with this seed (default: any building)")
+    parser.add_argument('--coins', type=int, default=None, help="Arcade starting coins")
+    parser.add_argument('--table-bits', type=int, default=TABLE_BITS,
+                        help="the transposition table has 2**bits slots")
+    args = parser.parse_args(argv)
+    if args.rows * args.cols > MAX_CELLS:
+        parser.error(f"boards of more than {MAX_CELLS} cells cannot be solved in reasonable time")
+
+    turns = args.rows * args.cols if args.turns is None else args.turns
+    offers = None if args.seed is None else offer_sequence(turns, args.seed)
+    solver = Solver(args.rows, args.cols, args.rules, offers, turns, args.coins, args.table_bits)
+    start = time.perf_counter()
+    best, line = solver.solve()
+    elapsed = time.perf_counter() - start
+    stats = solver.stats(elapsed)
+    print(f"Best score: {best}")
+    print("Line:", ' '.join(f"{building}@{row},{col}" for building, row, col in line))
+    print(f"{stats['nodes']} nodes in {elapsed:.2f} s ({stats['nodes_per_second']:.0f} nodes/s), "
+          f"{stats['cutoffs']} cut by the bound")
+    print(f"Table: {stats['table_probes']} probes, {stats['table_hit_rate']:.1%} hits, "
+          f"{stats['table_evictions']} evictions")
+
+
+if __name__ == '__main__':
+    main()
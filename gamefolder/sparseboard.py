@@ -0,0 +1,158 @@
+"""Sparse, chunked Free Play board that grows without copying cells."""
+
+from bytegrid import Grid
+
+CHUNK_SHIFT = 4
+CHUNK_SIZE = 1 << CHUNK_SHIFT  # 16x16 cells per chunk
+CHUNK_MASK = CHUNK_SIZE - 1
+
+
+class _RowView:
+    """One row of a ChunkedBoard that behaves like a list row of the old grid."""
+
+    __slots__ = ('board', 'row')
+
+    def __init__(self, board, row):
+        self.board = board
+        self.row = row
+
+    def __len__(self):
+        return self.board.cols
+
+    def __getitem__(self, col):
+        if isinstance(col, slice):
+            start, stop, step = col.indices(self.board.cols)
+            if step == 1:
+                return list(self.board.iter_row(self.row, start, stop))
+            return [self.board.get(self.row, c) for c in range(start, stop, step)]
+        return self.board.get(self.row, col)
+
+    def __setitem__(self, col, building):
+        self.board.set(self.row, col, building)
+
+    def __iter__(self):
+        return self.board.iter_row(self.row)
+
+
+class ChunkedBoard:
+    """Free Play board that only stores chunks containing buildings.
+
+    Cells live at signed board coordinates; ``origin_row``/``origin_col`` give
+    the displayed row and column of coordinate (0, 0). Expanding the board
+    only widens the displayed bounds and moves the origin, so it costs O(1)
+    whatever the size of the board. ``board[row][col]``, ``len(board)`` and
+    ``len(board[0])`` work like the list-of-lists grid, so the existing
+    prompts, scoring and printing keep working unchanged. A chunk is a
+    CHUNK_SIZE x CHUNK_SIZE bytegrid.Grid, the board of Arcade mode, read and
+    written through its bytearray of cells.
+    """
+
+    def __init__(self, rows, cols):
+        self.rows = rows
+        self.cols = cols
+        self.origin_row = 0
+        self.origin_col = 0
+        self.chunks = {}
+
+    @classmethod
+    def from_grid(cls, grid):
+        """Build a board from a list-of-lists grid, e.g. one read from a save file."""
+        board = cls(len(grid), len(grid[0]))
+        if hasattr(grid, 'buildings'):  # binsave.MappedGrid skips empty runs
+            for row, col, building in grid.buildings():
+                board.set(row, col, building)
+            return board
+        for row, cells in enumerate(grid):
+            for col, building in enumerate(cells):
+                if building != 'P':
+                    board.set(row, col, building)
+        return board
+
+    def copy(self):
+        """Return an independent copy of the board."""
+        board = ChunkedBoard(self.rows, self.cols)
+        board.origin_row = self.origin_row
+        board.origin_col = self.origin_col
+        board.chunks = {key: chunk.copy() for key, chunk in self.chunks.items()}
+        return board
+
+    def to_grid(self):
+        """Return the board as a list-of-lists grid in the save file format."""
+        grid = [['P' for _ in range(self.cols)] for _ in range(self.rows)]
+        for row, col, building in self.buildings():
+            grid[row][col] = building
+        return grid
+
+    def __len__(self):
+        return self.rows
+
+    def __getitem__(self, row):
+        if not 0 <= row < self.rows:
+            raise IndexError('board row out of range')
+        return _RowView(self, row)
+
+    def __iter__(self):
+        for row in range(self.rows):
+            yield _RowView(self, row)
+
+    def _locate(self, row, col):
+        if not (0 <= row < self.rows and 0 <= col < self.cols):
+            raise IndexError('board position out of range')
+        y = row - self.origin_row
+        x = col - self.origin_col
+        return (y >> CHUNK_SHIFT, x >> CHUNK_SHIFT), ((y & CHUNK_MASK) << CHUNK_SHIFT) | (x & CHUNK_MASK)
+
+    def get(self, row, col):
+        """Return the building at a displayed (row, col) position."""
+        key, index = self._locate(row, col)
+        chunk = self.chunks.get(key)
+        return 'P' if chunk is None else chr(chunk.cells[index])
+
+    def set(self, row, col, building):
+        """Place building at a displayed (row, col) position."""
+        key, index = self._locate(row, col)
+        chunk = self.chunks.get(key)
+        if chunk is None:
+            if building == 'P':
+                return
+            chunk = self.chunks[key] = Grid(CHUNK_SIZE, CHUNK_SIZE)
+        chunk.cells[index] = ord(building)
+
+    def iter_row(self, row, start=0, stop=None):
+        """Yield the cells of a displayed row from start to stop, filling missing chunks with 'P'."""
+        y = row - self.origin_row
+        chunk_row, offset = y >> CHUNK_SHIFT, (y & CHUNK_MASK) << CHUNK_SHIFT
+        x = start - self.origin_col
+        end = (self.cols if stop is None else stop) - self.origin_col
+        while x < end:
+            chunk = self.chunks.get((chunk_row, x >> CHUNK_SHIFT))
+            stop = min(end, (x | CHUNK_MASK) + 1)
+            if chunk is None:
+                for _ in range(stop - x):
+                    yield 'P'
+            else:
+                start = offset + (x & CHUNK_MASK)
+                yield from chunk.cells[start:start + stop - x].decode()
+            x = stop
+
+    def buildings(self):
+        """Yield (row, col, building) for every non-empty cell in displayed coordinates."""
+        for (chunk_row, chunk_col), chunk in self.chunks.items():
+            top = (chunk_row << CHUNK_SHIFT) + self.origin_row
+            left = (chunk_col << CHUNK_SHIFT) + self.origin_col
+            for row, col, building in chunk.buildings():  # Skips empty chunk rows in C
+                yield top + row, left + col, building
+
+    def expand(self, expansion_size=5):
+        """Add expansion_size rows and columns to every side without moving any cells."""
+        self.rows += 2 * expansion_size
+        self.cols += 2 * expansion_size
+        self.origin_row += expansion_size
+        self.origin_col += expansion_size
+
+    def shrink(self, expansion_size=5):
+        """Undo expand(); the rows and columns removed must be empty."""
+        self.rows -= 2 * expansion_size
+        self.cols -= 2 * expansion_size
+        self.origin_row -= expansion_size
+        self.origin_col -= expansion_size
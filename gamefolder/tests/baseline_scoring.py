@@ -0,0 +1,122 @@
+"""Scoring functions copied unchanged from the baseline samplegame.py and npcity.py.
+
+They are the reference the rule tables are checked against. The Arcade and
+NPCity versions only handle 20x20 grids, as the originals did.
+"""
+
+
+def get_adjacent_positions(row, col, rows=20, cols=20):
+    """Get a list of adjacent positions for a given cell in the grid."""
+    adjacent_positions = []
+    for r, c in [(row-1, col), (row+1, col), (row, col-1), (row, col+1)]:
+        if 0 <= r < rows and 0 <= c < cols:
+            adjacent_positions.append((r, c))
+    return adjacent_positions
+
+# samplegame.py
+
+def calculate_score_and_coins(grid):
+    """Calculate the score and coins based on the grid's current state."""
+    rows, cols = len(grid), len(grid[0])
+    score = 0
+    coins = 0
+
+    for row in range(rows):
+        for col in range(cols):
+            building = grid[row][col]
+            if building == 'P':
+                continue
+
+            adjacent_positions = get_adjacent_positions(row, col)
+            adjacent_buildings = [grid[r][c] for r, c in adjacent_positions]
+
+            if building == 'R':
+                if 'I' in adjacent_buildings:
+                    score += 1
+                else:
+                    score += 1  # Count only 1 point for each 'R' placed next to 'R', 'C', or 'O'
+            elif building == 'I':
+                score += adjacent_buildings.count('I')
+                coins += sum(1 for r, c in adjacent_positions if grid[r][c] == 'R')
+            elif building == 'C':
+                score += adjacent_buildings.count('C')
+            elif building == 'O':
+                if 'O' in adjacent_buildings:
+                    score += 1
+            elif building == '*':
+                if '*' in adjacent_buildings:
+                    score += 1
+
+    return score, coins
+
+
+def calculate_score_free_play(grid):
+    """Calculate the score based on the grid's current state in Free Play mode."""
+    rows, cols = len(grid), len(grid[0])
+    score = 0
+
+    for row in range(rows):
+        for col in range(cols):
+            building = grid[row][col]
+            if building == 'P':
+                continue
+
+            adjacent_positions = get_adjacent_positions(row, col, rows, cols)
+            adjacent_buildings = [grid[r][c] for r, c in adjacent_positions]
+
+            if building == 'R':
+                if 'I' in adjacent_buildings:
+                    score += 1
+                else:
+                    score += 1  # Count only 1 point for each 'R' placed next to 'R', 'C', or 'O'
+            elif building == 'I':
+                score += adjacent_buildings.count('I')
+            elif building == 'C':
+                score += adjacent_buildings.count('C')
+            elif building == 'O':
+                if 'O' in adjacent_buildings:
+                    score += 1
+            elif building == '*':
+                if '*' in adjacent_buildings:
+                    score += 1
+
+    return score
+
+# npcity.py, renamed from calculate_score_and_coins
+
+def npcity_score_and_coins(grid):
+    """Calculate the score and coins based on the grid's current state."""
+    rows, cols = len(grid), len(grid[0])
+    score = 0
+    coins = 0
+    industry_count = sum(row.count('I') for row in grid)
+
+    for row in range(rows):
+        for col in range(cols):
+            building = grid[row][col]
+            if building == 'P':
+                continue
+
+            adjacent_positions = get_adjacent_positions(row, col)
+            adjacent_buildings = [grid[r][c] for r, c in adjacent_positions]
+
+            if building == 'R':
+                if 'I' in adjacent_buildings:
+                    score += 1
+                else:
+                    score += adjacent_buildings.count('R')
+                    score += adjacent_buildings.count('C')
+                    score += 2 * adjacent_buildings.count('O')
+            elif building == 'I':
+                score += industry_count
+                coins += sum(1 for r, c in adjacent_positions if grid[r][c] == 'R')
+            elif building == 'C':
+                score += adjacent_buildings.count('C')
+                coins += adjacent_buildings.count('R')
+            elif building == 'O':
+                score += adjacent_buildings.count('O')
+            elif building == '*':
+                if '*' in adjacent_buildings:
+                    score += 1
+
+    return score, coins
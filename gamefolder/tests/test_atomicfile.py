@@ -0,0 +1,43 @@
+"""Atomic writes must replace the file only once the new contents are complete."""
+
+import os
+
+import pytest
+
+from atomicfile import atomic_write
+
+
+def test_the_file_is_replaced_when_the_block_ends(tmp_path):
+    filename = str(tmp_path / 'save.json')
+    with open(filename, 'w') as f:
+        f.write('old')
+    with atomic_write(filename) as f:
+        f.write('new')
+        with open(filename) as current:
+            assert current.read() == 'old'
+    with open(filename) as f:
+        assert f.read() == 'new'
+    assert os.listdir(tmp_path) == ['save.json']
+
+
+def test_a_failed_write_keeps_the_old_file(tmp_path):
+    filename = str(tmp_path / 'save.sav')
+    with open(filename, 'wb') as f:
+        f.write(b'old')
+    with pytest.raises(RuntimeError):
+        with atomic_write(filename, 'wb', fsync=True) as f:
+            f.write(b'new')
+            raise RuntimeError("crash")
+    with open(filename, 'rb') as f:
+        assert f.read() == b'old'
+    assert os.listdir(tmp_path) == ['save.sav']
+
+
+def test_writes_in_progress_do_not_share_a_temporary_file(tmp_path):
+    filename = str(tmp_path / 'game.replay')
+    with atomic_write(filename) as first, atomic_write(filename) as second:
+        assert len([name for name in os.listdir(tmp_path) if name.endswith('.tmp')]) == 2
+        first.write('first')
+        second.write('second')
+    with open(filename) as f:
+        assert f.read() == 'first'  # The last one renamed into place
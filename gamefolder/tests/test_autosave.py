@@ -0,0 +1,104 @@
+"""Queued saves must all reach the disk by the end of a session, and failed ones must be raised."""
+
+import threading
+import time
+
+import pytest
+
+import autosave
+import samplegame
+
+
+@pytest.fixture
+def game_dir(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    yield tmp_path
+    samplegame.set_autosave('off')
+    autosave.shutdown()
+
+
+def slow(job, delay=0.002):
+    """Wrap a save job so the queue fills up behind it, as on a slow disk."""
+    def slow_job(*args, fsync=False):
+        time.sleep(delay)
+        job(*args, fsync=fsync)
+    return slow_job
+
+
+@pytest.mark.parametrize('policy', ['interval', 'always'])
+@pytest.mark.parametrize('binary', [False, True])
+def test_shutdown_writes_the_last_queued_save(game_dir, monkeypatch, policy, binary):
+    samplegame.set_autosave(policy)
+    monkeypatch.setattr(samplegame, '_write_save', slow(samplegame._write_save))
+    grid = [['P'] * 20 for _ in range(20)]
+    for turn in range(200):
+        grid[turn // 20][turn % 20] = 'RICO*'[turn % 5]
+        samplegame._save('game_save.json', grid, 16 - turn % 16, turn, binary)
+    stats = autosave.shutdown()
+
+    assert stats['written'] + stats['coalesced'] == stats['queued'] == 200
+    assert stats['queue_depth'] == 0
+    samplegame.set_autosave('off')  # Read the file as it is on disk, with no writer running
+    state = samplegame.read_game_state('game_save.json')
+    assert [list(row) for row in state['grid']] == grid
+    assert (state['coins'], state['score']) == (16 - 199 % 16, 199)
+
+
+def test_journalled_moves_survive_shutdown(game_dir):
+    from journal import SaveJournal
+    writer = autosave.get_writer('interval')
+    save_journal = SaveJournal('game_save.json', writer=writer)
+    grid = [['P'] * 20 for _ in range(20)]
+    save_journal.snapshot(grid, 16, 0)
+    for turn in range(100):
+        grid[turn // 20][turn % 20] = 'R'
+        save_journal.record('R', turn // 20, turn % 20, grid, 16, turn + 1)
+    autosave.shutdown()
+
+    state = samplegame.read_game_state('game_save.json')
+    assert [list(row) for row in state['grid']] == grid
+    assert state['score'] == 100
+
+
+def test_failed_save_is_logged_and_raised_by_shutdown(game_dir, caplog):
+    def failing_job(fsync=False):
+        raise OSError("disk full")
+
+    writer = autosave.get_writer('always')
+    writer.submit('game_save.json', failing_job)
+    with pytest.raises(OSError, match="disk full"):
+        autosave.shutdown()
+    assert "Autosave of game_save.json failed" in caplog.text
+    assert autosave.shutdown() is None  # The writer is stopped all the same
+
+
+def blocked_writer():
+    """Return a writer stuck in a first job until the returned event is set, and the list of jobs run."""
+    ran, release = [], threading.Event()
+    writer = autosave.AutosaveWriter('never')
+    writer.submit('other', lambda fsync=False: release.wait(5) and ran.append('blocker'))
+    while writer._queue:  # Wait until the writer is inside the blocking job
+        time.sleep(0.001)
+    return writer, release, ran
+
+
+def test_jobs_of_different_files_run_in_queue_order(game_dir):
+    writer, release, ran = blocked_writer()
+    for key, name in [('game_save.json.recovery', 'journal'), ('game_save.json', 'save'),
+                      ('game_save.json.recovery', 'clear')]:
+        writer.submit(key, lambda fsync=False, name=name: ran.append(name))
+    release.set()
+    writer.close()
+    assert ran == ['blocker', 'journal', 'save', 'clear']
+
+
+def test_replacing_job_keeps_the_place_of_the_oldest_one(game_dir):
+    writer, release, ran = blocked_writer()
+    for key, name, replace in [('game_save.json', 'first save', True),
+                               ('game_save.json.recovery', 'clear', True),
+                               ('game_save.json', 'second save', True)]:
+        writer.submit(key, lambda fsync=False, name=name: ran.append(name), replace=replace)
+    release.set()
+    writer.close()
+    assert ran == ['blocker', 'second save', 'clear']
+    assert writer.stats()['coalesced'] == 1
@@ -0,0 +1,50 @@
+"""Truncated or damaged binary saves must raise ValueError, never IndexError or struct.error."""
+
+import random
+
+import pytest
+
+import binsave
+
+
+@pytest.mark.parametrize('encoding', ['bytes', 'packed', 'rle'])
+def test_damaged_saves_raise_value_error(tmp_path, encoding):
+    rng = random.Random(encoding)
+    grid = [[rng.choice('PPPRICO*') for _ in range(13)] for _ in range(9)]
+    filename = str(tmp_path / 'save.sav')
+    binsave.save_binary(filename, grid, 5, 7, encoding=encoding)
+    with open(filename, 'rb') as f:
+        good = f.read()
+    loaded, _, _ = binsave.load_binary(filename)
+    assert loaded.to_grid() == grid
+
+    for trial in range(1000):
+        data = bytearray(good)
+        if trial % 2:
+            data = data[:rng.randrange(len(data))]
+        else:
+            for _ in range(rng.randrange(1, 4)):
+                data[rng.randrange(len(data))] = rng.randrange(256)
+        with open(filename, 'wb') as f:
+            f.write(data)
+        try:
+            loaded, _, _ = binsave.load_binary(filename)
+            list(loaded.buildings())
+            loaded.to_grid()
+        except ValueError:
+            pass
+
+
+def test_round_trip_and_other_versions(tmp_path):
+    grid = [['P', 'R', 'I'], ['C', 'O', '*']]
+    filename = str(tmp_path / 'save.sav')
+    binsave.save_binary(filename, grid, 5, 7, turn=3)
+    loaded, coins, score = binsave.load_binary(filename)
+    assert (loaded.to_grid(), coins, score, loaded.turn) == (grid, 5, 7, 3)
+    loaded.data.close()
+
+    with open(filename, 'r+b') as f:
+        f.seek(len(binsave.MAGIC))
+        f.write(bytes([binsave.VERSION + 1]))
+    with pytest.raises(ValueError):
+        binsave.load_binary(filename)
@@ -0,0 +1,56 @@
+"""The bitboard backend must score every board exactly like rules.evaluate."""
+
+import random
+
+import pytest
+
+import bitboard
+import rules
+from frontier import Frontier
+from sparseboard import ChunkedBoard
+
+BUILDINGS = "PRICO*"
+
+
+def random_grid(rng, rows, cols, density):
+    return [[rng.choice(BUILDINGS[1:]) if rng.random() < density else 'P' for _ in range(cols)]
+            for _ in range(rows)]
+
+
+@pytest.mark.parametrize('rule_set', ['arcade', 'npcity', 'free_play'])
+@pytest.mark.parametrize('seed', range(20))
+def test_random_arcade_boards_match_evaluate(rule_set, seed):
+    rng = random.Random(seed)
+    grid = random_grid(rng, 20, 20, rng.random())
+    assert bitboard.score_and_coins(grid, rule_set) == rules.evaluate(grid, rule_set)
+
+
+@pytest.mark.parametrize('size', [(1, 1), (1, 7), (6, 1), (5, 5), (15, 25), (35, 35)])
+@pytest.mark.parametrize('seed', range(5))
+def test_free_play_sizes_match_evaluate(size, seed):
+    rng = random.Random(seed)
+    grid = random_grid(rng, *size, rng.random())
+    for rule_set in rules.RULE_SETS:
+        assert bitboard.score_and_coins(grid, rule_set) == rules.evaluate(grid, rule_set)
+    assert bitboard.score_and_coins(ChunkedBoard.from_grid(grid), 'free_play') \
+        == rules.evaluate(grid, 'free_play')
+
+
+def test_full_and_empty_boards():
+    for building in BUILDINGS:
+        grid = [[building] * 20 for _ in range(20)]
+        for rule_set in rules.RULE_SETS:
+            assert bitboard.score_and_coins(grid, rule_set) == rules.evaluate(grid, rule_set)
+
+
+def test_placing_matches_rebuilding():
+    rng = random.Random(7)
+    board = bitboard.BitBoard(9, 13)
+    grid = [['P'] * 13 for _ in range(9)]
+    for _ in range(200):
+        row, col, building = rng.randrange(9), rng.randrange(13), rng.choice(BUILDINGS)
+        board.place(building, row, col)
+        grid[row][col] = building
+        assert board.to_grid() == grid
+        assert board.score_and_coins('npcity') == rules.evaluate(grid, 'npcity')
+        assert board.positions(board.frontier()) == Frontier.from_grid(grid).positions()
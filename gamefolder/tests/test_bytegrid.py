@@ -0,0 +1,60 @@
+"""Grid must read, write and copy like a list-of-lists grid."""
+
+import pickle
+
+import pytest
+
+import pools
+from bytegrid import Grid
+
+
+def test_indexing():
+    grid = Grid.from_grid([['P', 'R', 'I'], ['C', 'O', '*']])
+    assert (len(grid), len(grid[0])) == (2, 3)
+    assert grid[0][1] == 'R' and grid[1][-1] == '*' and grid.get(1, 0) == 'C'
+    grid[0][-3] = 'O'
+    grid.set(1, 1, 'P')
+    assert grid.to_grid() == [['O', 'R', 'I'], ['C', 'P', '*']]
+    assert grid[0][1:] == ['R', 'I']
+    assert [list(row) for row in grid] == grid.to_grid()
+    assert list(grid.buildings()) == [(0, 0, 'O'), (0, 1, 'R'), (0, 2, 'I'), (1, 0, 'C'), (1, 2, '*')]
+    assert sorted(grid.neighbours(0, 1)) == [(0, 0, 'O'), (0, 2, 'I'), (1, 1, 'P')]
+    for col in (3, -4):
+        with pytest.raises(IndexError):
+            grid[0][col]
+        with pytest.raises(IndexError):
+            grid[0][col] = 'R'
+    with pytest.raises(IndexError):
+        grid[2]
+
+
+def test_copy_is_independent():
+    grid = Grid(3, 3)
+    grid[1][1] = 'R'
+    copy = grid.copy()
+    copy[1][1] = 'C'
+    copy[0][0] = 'I'
+    assert grid.to_grid() == [['P'] * 3, ['P', 'R', 'P'], ['P'] * 3]
+    assert Grid.from_grid(copy).to_grid() == copy.to_grid()
+
+
+def test_resizing():
+    grid = Grid.from_grid([['R', 'I'], ['C', 'O']])
+    grid.expand(2)
+    assert (len(grid), len(grid[0])) == (6, 6)
+    assert grid[2][2:4] == ['R', 'I'] and grid[3][2:4] == ['C', 'O']
+    grid[2][2] = '*'  # The row views follow the new cells
+    grid.shrink(2)
+    assert grid.to_grid() == [['*', 'I'], ['C', 'O']]
+
+
+def test_pickled_through_the_pool():
+    grid = Grid.from_grid([['R', 'P', 'I'], ['P', 'O', '*']])
+    copy = pickle.loads(pickle.dumps(grid))
+    copy[0][1] = 'C'
+    assert copy.to_grid() == [['R', 'C', 'I'], ['P', 'O', '*']]
+    assert grid[0][1] == 'P'
+    assert pools.get_pool(2).submit(Grid.to_grid, grid).result() == grid.to_grid()
+    returned = pools.get_pool(2).submit(Grid.copy, grid).result()
+    returned[1][0] = 'R'  # Views unpickled with the cells they write to
+    assert returned.to_grid() == [['R', 'P', 'I'], ['R', 'O', '*']]
@@ -0,0 +1,45 @@
+"""The frontier must always hold exactly the empty cells next to a building."""
+
+import random
+
+import pytest
+
+import engine
+from frontier import Frontier
+
+
+def brute_force(grid):
+    if hasattr(grid, 'to_grid'):
+        grid = grid.to_grid()
+    rows, cols = len(grid), len(grid[0])
+    return [(row, col) for row in range(rows) for col in range(cols)
+            if grid[row][col] == 'P'
+            and any(0 <= r < rows and 0 <= c < cols and grid[r][c] != 'P'
+                    for r, c in [(row - 1, col), (row + 1, col), (row, col - 1), (row, col + 1)])]
+
+
+@pytest.mark.parametrize('mode', ['arcade', 'free_play'])
+@pytest.mark.parametrize('seed', range(10))
+def test_frontier_matches_a_scan_after_moves_undos_and_redos(mode, seed):
+    rng = random.Random(seed)
+    game = engine.HeadlessGame(mode, seed=seed)
+    game.enable_undo()
+    for _ in range(150 if mode == 'arcade' else 60):  # Free Play boards grow fast
+        action = rng.random()
+        if action < 0.2:
+            game.undo()
+        elif action < 0.3:
+            game.redo()
+        elif not game.is_over():
+            offered = game.offer()
+            if mode == 'free_play':  # Any cell, so buildings are also replaced
+                game.play(rng.choice(offered), rng.randrange(len(game.grid)),
+                          rng.randrange(len(game.grid[0])))
+            else:
+                game.play(*engine.random_policy(game, offered))
+        expected = brute_force(game.grid)
+        assert game.frontier.positions() == expected
+        assert len(game.frontier) == len(expected)
+        assert Frontier.from_grid(game.grid).positions() == expected
+        if mode == 'arcade' and not game.first_building:
+            assert game.legal_positions() == expected
@@ -0,0 +1,72 @@
+"""Every heatmap value must equal the change in a full rescore when the building is placed."""
+
+import random
+
+import pytest
+
+import heatmap
+import npscoring
+import rules
+from bytegrid import Grid
+from sparseboard import ChunkedBoard
+
+BUILDINGS = "PRICO*"
+
+
+def random_grid(rng, rows, cols):
+    density = rng.random()
+    return [[rng.choice(BUILDINGS[1:]) if rng.random() < density else 'P' for _ in range(cols)]
+            for _ in range(rows)]
+
+
+def check(grid, building, rule_set, window, board=list):
+    result = heatmap.heatmap(board(grid), building, rule_set, window)
+    before_score, before_coins = rules.evaluate(grid, rule_set)
+    top, left = result.top, result.left
+    size = (len(grid), len(grid[0])) if window is None else window[2:]
+    assert (len(result.scores), len(result.scores[0])) == size
+    for i, (score_row, coin_row) in enumerate(zip(result.scores, result.coins)):
+        for j, (score, coins) in enumerate(zip(score_row, coin_row)):
+            row, col = top + i, left + j
+            previous, grid[row][col] = grid[row][col], building
+            after_score, after_coins = rules.evaluate(grid, rule_set)
+            grid[row][col] = previous
+            assert (score, coins) == (after_score - before_score, after_coins - before_coins)
+
+
+@pytest.fixture(params=['python', 'numpy'])
+def path(request, monkeypatch):
+    if request.param == 'numpy':
+        if not npscoring.available():
+            pytest.skip("NumPy is not installed")
+        monkeypatch.setattr(heatmap, 'NUMPY_CELLS', 0)  # Every window uses NumPy
+    else:
+        monkeypatch.setattr(heatmap, 'NUMPY_CELLS', float('inf'))
+    return request.param
+
+
+@pytest.mark.parametrize('rule_set', ['arcade', 'free_play', 'npcity'])
+@pytest.mark.parametrize('seed', range(3))
+def test_whole_board(path, rule_set, seed):
+    rng = random.Random(seed)
+    grid = random_grid(rng, rng.randrange(1, 12), rng.randrange(1, 12))
+    for building in BUILDINGS[1:]:
+        check(grid, building, rule_set, None)
+
+
+@pytest.mark.parametrize('window', [(0, 0, 4, 5), (3, 2, 5, 4), (7, 6, 5, 6), (9, 0, 3, 12),
+                                    (0, 11, 12, 1)])
+@pytest.mark.parametrize('board', [list, Grid.from_grid, ChunkedBoard.from_grid])
+def test_windows(path, window, board):
+    rng = random.Random(str(window))
+    grid = random_grid(rng, 12, 12)
+    for rule_set in ('arcade', 'npcity'):
+        for building in BUILDINGS[1:]:
+            check(grid, building, rule_set, window, board)
+
+
+def test_windows_are_clipped_to_the_board():
+    grid = random_grid(random.Random(5), 6, 6)
+    result = heatmap.heatmap(grid, 'R', 'arcade', (4, -2, 10, 4))
+    assert (result.top, result.left) == (4, 0)
+    assert (len(result.scores), len(result.scores[0])) == (2, 4)
@@ -0,0 +1,69 @@
+"""Undo must restore the grid, coins and score exactly, and redo must bring them back."""
+
+import random
+
+import pytest
+
+import engine
+import rules
+
+
+def state(game):
+    grid = game.grid.to_grid() if hasattr(game.grid, 'to_grid') else [list(row) for row in game.grid]
+    return grid, game.score, game.coins, game.first_building, game.turn
+
+
+def play(game, rng):
+    offered = game.offer()
+    if game.mode == 'free_play':  # Any cell, so buildings are also replaced and the board grows
+        game.play(rng.choice(offered), rng.randrange(len(game.grid)), rng.randrange(len(game.grid[0])))
+    else:
+        game.play(*engine.random_policy(game, offered))
+
+
+@pytest.mark.parametrize('mode,rule_set', [('arcade', None), ('arcade', 'npcity'), ('free_play', None)])
+@pytest.mark.parametrize('seed', range(5))
+def test_undo_and_redo_restore_every_state(mode, rule_set, seed):
+    rng = random.Random(seed)
+    game = engine.HeadlessGame(mode, seed=seed, rules=rule_set)
+    game.enable_undo()
+    states = [state(game)]
+    while len(states) < 40 and not game.is_over():
+        play(game, rng)
+        states.append(state(game))
+        assert game.score == rules.evaluate(states[-1][0], game.rules)[0]
+
+    for expected in reversed(states[:-1]):
+        assert game.undo() is not None
+        assert state(game) == expected
+    assert game.undo() is None
+    for expected in states[1:]:
+        assert game.redo() is not None
+        assert state(game) == expected
+    assert game.redo() is None
+
+
+@pytest.mark.parametrize('mode', ['arcade', 'free_play'])
+def test_a_new_move_clears_the_redo_stack(mode):
+    rng = random.Random(3)
+    game = engine.HeadlessGame(mode, seed=3)
+    game.enable_undo()
+    for _ in range(10):
+        play(game, rng)
+    game.undo()
+    game.undo()
+    assert game.history.can_redo()
+    play(game, rng)
+    assert not game.history.can_redo()
+    assert game.redo() is None
+    assert game.undo() is not None
+
+
+def test_undo_limit():
+    game = engine.HeadlessGame('arcade', seed=1)
+    game.enable_undo(limit=3)
+    rng = random.Random(1)
+    for _ in range(5):
+        play(game, rng)
+    assert [game.undo() is not None for _ in range(4)] == [True, True, True, False]
+    assert game.turn == 2
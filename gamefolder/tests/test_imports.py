@@ -0,0 +1,14 @@
+"""The game modules must import within their budgets; pool workers and batch jobs import them."""
+
+import pytest
+
+from benchmarks import IMPORT_BUDGETS, import_time
+
+
+@pytest.mark.parametrize('module', sorted(IMPORT_BUDGETS))
+def test_import_within_budget(module):
+    # Best of several fresh interpreters, each timed with python -X importtime
+    seconds = import_time(module)
+    assert seconds <= IMPORT_BUDGETS[module], (
+        f"import {module} took {seconds * 1e3:.2f} ms, "
+        f"budget {IMPORT_BUDGETS[module] * 1e3:.0f} ms")
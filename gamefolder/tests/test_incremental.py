@@ -0,0 +1,63 @@
+"""IncrementalScorer must always equal a full rescore with rules.evaluate."""
+
+import random
+
+import pytest
+
+import rules
+import samplegame
+from bytegrid import Grid
+from frontier import Frontier
+from incremental import IncrementalScorer
+from sparseboard import ChunkedBoard
+
+BUILDINGS = ["R", "I", "C", "*", "O"]
+
+
+def full_rescore(grid, rule_set):
+    return rules.evaluate(grid.to_grid() if hasattr(grid, 'to_grid') else grid, rule_set)
+
+
+@pytest.mark.parametrize('rule_set', ['arcade', 'npcity'])
+@pytest.mark.parametrize('board', [list, Grid.from_grid])
+@pytest.mark.parametrize('seed', range(5))
+def test_arcade_games_match_full_rescore(rule_set, board, seed):
+    rng = random.Random(seed)
+    grid = board([['P'] * 20 for _ in range(20)])
+    scorer = IncrementalScorer(grid, rule_set)
+    frontier = Frontier.from_grid(grid)
+    row, col = rng.randrange(20), rng.randrange(20)
+    for _ in range(150):
+        totals = scorer.place(rng.choice(BUILDINGS), row, col)
+        assert totals == full_rescore(grid, rule_set)
+        frontier.update(grid, row, col)
+        if not len(frontier):
+            break
+        row, col = rng.choice(sorted(frontier))
+
+
+@pytest.mark.parametrize('board', [list, ChunkedBoard.from_grid, Grid.from_grid])
+@pytest.mark.parametrize('seed', range(5))
+def test_free_play_games_match_full_rescore(board, seed):
+    rng = random.Random(seed)
+    grid = board([['P'] * 5 for _ in range(5)])
+    scorer = IncrementalScorer(grid, 'free_play')
+    for _ in range(120):
+        # Any cell, so buildings are also replaced, and the grid expands at the edges
+        row, col = rng.randrange(len(grid)), rng.randrange(len(grid[0]))
+        totals = scorer.place(rng.choice(BUILDINGS), row, col)
+        assert totals == full_rescore(grid, 'free_play')
+        if row in (0, len(grid) - 1) or col in (0, len(grid[0]) - 1):
+            grid = samplegame.expand_grid(grid)
+            scorer.rebind(grid)
+            assert scorer.totals() == full_rescore(grid, 'free_play')
+
+
+def test_rescan_matches_running_totals():
+    rng = random.Random(1)
+    grid = [[rng.choice('PPRICO*') for _ in range(12)] for _ in range(9)]
+    scorer = IncrementalScorer(grid, 'npcity')
+    for _ in range(200):
+        scorer.place(rng.choice(BUILDINGS + ['P']), rng.randrange(9), rng.randrange(12))
+    totals = scorer.totals()
+    assert scorer.rescan() == totals == full_rescore(grid, 'npcity')
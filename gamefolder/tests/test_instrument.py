@@ -0,0 +1,49 @@
+"""Phases must be charged only their own time, counted into buckets that give percentiles."""
+
+import random
+import time
+import types
+
+import instrument
+from instrument import BUCKETS, Histogram, log_buckets
+
+
+def test_nested_phases_are_charged_their_own_time(monkeypatch):
+    # validation starts, input starts, input ends, validation ends
+    clock = iter([0.0, 1.0, 4.0, 6.0])
+    monkeypatch.setattr(instrument, 'time', types.SimpleNamespace(
+        perf_counter=lambda: next(clock), time=time.time))
+    instrument.enable()
+    try:
+        with instrument.phase('validation'):
+            with instrument.phase('input'):
+                pass
+        instrument.end_turn()
+        summary = instrument.summary()
+    finally:
+        instrument.enable(False)
+    assert summary['phases']['input']['total_seconds'] == 3.0
+    assert summary['phases']['validation']['total_seconds'] == 3.0
+    assert summary['turns']['total_seconds'] == 3.0  # Input waits are not part of a turn
+
+
+def test_percentiles_are_within_a_bucket():
+    rng = random.Random(1)
+    values = sorted(rng.lognormvariate(-7, 1.5) for _ in range(10000))
+    histogram = Histogram(log_buckets(1e-7, 3600.0, 1.02))
+    for value in values:
+        histogram.add(value)
+    for fraction in (0.5, 0.9, 0.99, 0.999):
+        exact = values[int(fraction * len(values)) - 1]
+        assert exact <= histogram.percentile(fraction) <= exact * 1.02
+    assert histogram.percentile(1.0) == histogram.max == values[-1]
+
+
+def test_default_buckets_count_like_before():
+    histogram = Histogram()
+    for seconds in (0.00005, 0.0001, 0.0002, 0.7, 60.0):
+        histogram.add(seconds)
+    counts = histogram.to_dict()['buckets']
+    assert list(counts) == [str(bound) for bound in BUCKETS]
+    assert counts['0.0001'] == 2 and counts['0.0005'] == 3 and counts['1.0'] == 4
+    assert counts['30.0'] == 4 and histogram.count == 5
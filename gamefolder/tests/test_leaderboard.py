@@ -0,0 +1,48 @@
+"""An old high_scores.json must be imported once into each board, each taking its own game's entries."""
+
+import json
+
+from leaderboard import Leaderboard
+
+
+def write_scores(path):
+    # samplegame.py wrote dicts, npcity.py plain integers, both to high_scores.json
+    with open(path, 'w') as f:
+        json.dump([{'score': 25, 'date': '2024-01-02 03:04:05'}, 30, 20,
+                   {'score': 5, 'date': '2024-01-03 03:04:05'}, 10], f)
+
+
+def test_the_same_file_is_imported_into_each_mode_once(tmp_path):
+    scores = str(tmp_path / 'high_scores.json')
+    write_scores(scores)
+    with Leaderboard(str(tmp_path / 'high_scores.db')) as board:
+        assert board.import_json(scores, 'arcade') == 2
+        assert board.import_json(scores, 'npcity') == 3
+        assert board.import_json(scores, 'arcade') == 0
+        assert board.import_json(scores, 'npcity') == 0
+    with Leaderboard(str(tmp_path / 'high_scores.db')) as board:
+        assert board.import_json(scores, 'npcity') == 0
+        assert board.top(10, 'arcade') == [{'score': 25, 'date': '2024-01-02 03:04:05'},
+                                           {'score': 5, 'date': '2024-01-03 03:04:05'}]
+        assert [entry['score'] for entry in board.top(10, 'npcity')] == [30, 20, 10]
+
+
+def test_modes_without_an_old_file_import_nothing(tmp_path):
+    scores = str(tmp_path / 'high_scores.json')
+    write_scores(scores)
+    with Leaderboard(str(tmp_path / 'high_scores.db')) as board:
+        assert board.import_json(scores, 'free_play') == 0
+        assert board.import_json(str(tmp_path / 'missing.json'), 'arcade') == 0
+        assert board.count('free_play') == 0
+
+
+def test_journal_mode(tmp_path):
+    with Leaderboard(str(tmp_path / 'wal.db')) as board:
+        assert board.journal_mode == 'wal'
+    with Leaderboard(str(tmp_path / 'rollback.db'), wal=False) as board:
+        assert board.journal_mode == 'delete'
+    # An in-memory database cannot use WAL; it keeps working in its own mode
+    with Leaderboard(':memory:') as board:
+        assert board.journal_mode == 'memory'
+        board.add(3, 'arcade')
+        assert board.count('arcade') == 1
@@ -0,0 +1,35 @@
+"""The NumPy backend must score every board exactly like rules.evaluate."""
+
+import random
+
+import pytest
+
+pytest.importorskip('numpy')
+
+import npscoring
+import rules
+from bytegrid import Grid
+from sparseboard import ChunkedBoard
+
+BUILDINGS = "PRICO*"
+
+
+def random_grid(rng, rows, cols, density):
+    return [[rng.choice(BUILDINGS[1:]) if rng.random() < density else 'P' for _ in range(cols)]
+            for _ in range(rows)]
+
+
+@pytest.mark.parametrize('rule_set', ['arcade', 'npcity', 'free_play'])
+@pytest.mark.parametrize('board', [list, Grid.from_grid, ChunkedBoard.from_grid])
+@pytest.mark.parametrize('size', [(20, 20), (1, 1), (3, 8), (25, 15)])
+@pytest.mark.parametrize('seed', range(5))
+def test_random_boards_match_evaluate(rule_set, board, size, seed):
+    rng = random.Random(seed)
+    grid = random_grid(rng, *size, rng.random())
+    expected = rules.evaluate(grid, rule_set)
+    assert npscoring.score_and_coins(board(grid), rule_set) == expected
+
+
+def test_encoding_round_trips():
+    grid = random_grid(random.Random(3), 7, 11, 0.5)
+    assert npscoring.decode_grid(npscoring.encode_grid(grid)) == grid
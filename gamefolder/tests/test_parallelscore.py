@@ -0,0 +1,37 @@
+"""Tile-parallel scoring must equal rules.evaluate whatever the tiling."""
+
+import random
+
+import pytest
+
+import npscoring
+import parallelscore
+import rules
+
+BUILDINGS = "PRICO*"
+
+
+def random_grid(rng, rows, cols, density):
+    return [[rng.choice(BUILDINGS[1:]) if rng.random() < density else 'P' for _ in range(cols)]
+            for _ in range(rows)]
+
+
+@pytest.mark.parametrize('rule_set', ['arcade', 'npcity', 'free_play'])
+@pytest.mark.parametrize('tile_size', [1, 7, 16, 1024])
+@pytest.mark.parametrize('density', [0.02, 0.5, 1.0])
+@pytest.mark.parametrize('numpy', [True, False])
+def test_tiles_match_evaluate(monkeypatch, rule_set, tile_size, density, numpy):
+    if numpy and not npscoring.available():
+        pytest.skip('NumPy is not installed')
+    if not numpy:  # Tiles are scored in this process, so the Python scan is used
+        monkeypatch.setattr(npscoring, 'available', lambda: False)
+    rng = random.Random(tile_size)
+    grid = random_grid(rng, 37, 23, density)  # Ragged edges for every tile size
+    assert parallelscore.score_and_coins(grid, rule_set, workers=1, tile_size=tile_size) == \
+        rules.evaluate(grid, rule_set)
+
+
+def test_workers_match_evaluate():
+    grid = random_grid(random.Random(1), 60, 45, 0.3)
+    assert parallelscore.score_and_coins(grid, 'npcity', workers=2, tile_size=16) == \
+        rules.evaluate(grid, 'npcity')
@@ -0,0 +1,36 @@
+"""The advisor and tile-parallel scoring must share one worker pool, and hints must keep their budget."""
+
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import advisor
+import parallelscore
+import pools
+import rules
+
+
+def test_advisor_and_tile_scoring_share_the_pool():
+    grid = [['RICO*P'[(row * 7 + col) % 6] for col in range(40)] for row in range(40)]
+    assert parallelscore.score_and_coins(grid, 'arcade', workers=2, tile_size=16) == \
+        rules.evaluate(grid, 'arcade')
+    pool = pools.get_pool(2)
+
+    board = [['P'] * 20 for _ in range(20)]
+    board[10][10] = 'R'
+    assert advisor.recommend(board, 10, ['R', 'C'], budget=0.2, workers=2) is not None
+    assert pools.get_pool(2) is pool
+
+
+def test_hints_keep_their_budget_when_the_pool_starts_slowly(monkeypatch):
+    # Workers that take 0.2 s to start, as with the spawn start method
+    pool = ProcessPoolExecutor(2, initializer=time.sleep, initargs=(0.2,))
+    monkeypatch.setattr(advisor, 'get_pool', lambda workers: pool)
+    board = [['P'] * 20 for _ in range(20)]
+    board[10][10] = 'R'
+    try:
+        start = time.perf_counter()
+        hint = advisor.recommend(board, 10, ['R', 'C'], budget=0.4, workers=2)
+        assert time.perf_counter() - start < 0.4 + 0.1
+        assert hint.rollouts > 0
+    finally:
+        pool.shutdown()
@@ -0,0 +1,118 @@
+"""Renderer output, drawn to io.StringIO instead of a terminal."""
+
+import io
+import sys
+
+import pytest
+
+import render
+from render import PROMPT_LINES, Renderer
+
+CLEAR = '\x1b[H\x1b[2J'
+
+
+def board(rows, cols):
+    return [['P'] * cols for _ in range(rows)]
+
+
+def test_plain_frames_show_the_whole_board():
+    out = io.StringIO()
+    grid = board(3, 4)
+    grid[1][2] = 'R'
+    Renderer('plain', out).draw(grid, "Grid:")
+    assert out.getvalue() == "Grid:\nP P P P\nP P R P\nP P P P\n"
+
+
+def test_auto_is_plain_when_not_a_terminal():
+    assert Renderer('auto', io.StringIO()).mode == 'plain'
+    with pytest.raises(ValueError):
+        Renderer('colour')
+
+
+def test_ansi_frames_only_rewrite_changed_cells():
+    out = io.StringIO()
+    renderer = Renderer('ansi', out, view_rows=10, view_cols=10)
+    grid = board(5, 5)
+    renderer.draw(grid, "Grid:")
+    first = out.getvalue()
+    assert first.startswith(CLEAR)
+    assert first.count('\n') == 7  # Title, column ruler and five rows
+
+    out.seek(0)
+    out.truncate()
+    grid[2][3] = 'C'
+    renderer.draw(grid, "Grid:")
+    # Row 2 is screen line 5 below the title and the ruler; column 3 is character 9
+    assert out.getvalue() == '\x1b[5;9HC\x1b[8;1H\x1b[J'
+
+    out.seek(0)
+    out.truncate()
+    renderer.draw(grid, "Grid:")
+    assert out.getvalue() == '\x1b[8;1H\x1b[J'
+
+
+def test_ansi_frames_are_redrawn_after_too_many_lines():
+    out = io.StringIO()
+    renderer = Renderer('ansi', out, view_rows=10, view_cols=10)
+    grid = board(5, 5)
+    renderer.draw(grid)
+    renderer._counted().write('\n' * (PROMPT_LINES + 1))
+    out.seek(0)
+    out.truncate()
+    renderer.draw(grid)
+    assert out.getvalue().startswith(CLEAR)
+
+
+def test_viewport_follows_the_focus():
+    out = io.StringIO()
+    renderer = Renderer('plain', out, view_rows=4, view_cols=8)
+    grid = board(30, 40)
+    grid[25][33] = 'O'
+    renderer.draw(grid, "Grid:", focus=(25, 33))
+    lines = out.getvalue().splitlines()
+    assert renderer.clipped
+    assert (renderer.top, renderer.left) == (23, 29)
+    assert lines[0] == "Grid:"
+    assert lines[1] == "     30        35"
+    assert lines[2:6] == ["23 P P P P P P P P", "24 P P P P P P P P",
+                          "25 P P P P O P P P", "26 P P P P P P P P"]
+    assert lines[6] == "Rows 23-26 of 30, columns 29-36 of 40"
+
+
+def test_viewport_stays_on_the_board():
+    renderer = Renderer('plain', io.StringIO(), view_rows=4, view_cols=6)
+    grid = board(10, 10)
+    renderer.scroll(100, -100)
+    renderer.draw(grid)
+    assert (renderer.top, renderer.left) == (6, 0)
+    renderer.draw(grid, focus=(0, 9))
+    assert (renderer.top, renderer.left) == (0, 4)
+
+
+def test_open_counts_stdout_and_close_restores_it(monkeypatch):
+    stdout = io.StringIO()
+    monkeypatch.setattr(sys, 'stdout', stdout)
+    grid = board(5, 5)
+    with Renderer('ansi', view_rows=10, view_cols=10) as renderer:
+        assert isinstance(sys.stdout, render.LineCounter)
+        renderer.draw(grid)
+        print('\n' * (PROMPT_LINES - 2))  # With the answer below, PROMPT_LINES lines
+        render.count_answer()
+        start = len(stdout.getvalue())
+        renderer.draw(grid)
+        assert not stdout.getvalue()[start:].startswith(CLEAR)
+        print('\n' * PROMPT_LINES)
+        start = len(stdout.getvalue())
+        renderer.draw(grid)
+        assert stdout.getvalue()[start:].startswith(CLEAR)
+    assert sys.stdout is stdout
+    render.count_answer()  # Nothing to count once the renderer is closed
+
+
+def test_plain_and_given_streams_leave_stdout_alone(monkeypatch):
+    stdout = io.StringIO()
+    monkeypatch.setattr(sys, 'stdout', stdout)
+    with Renderer('plain'):
+        assert sys.stdout is stdout
+    with Renderer('ansi', io.StringIO(), view_rows=5, view_cols=5):
+        assert sys.stdout is stdout
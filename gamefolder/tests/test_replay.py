@@ -0,0 +1,107 @@
+"""Played games must replay exactly, and a damaged replay file must be reported as a failure
+without stopping the check of the others."""
+
+import pytest
+
+import engine
+import replay
+import rules
+import samplegame
+import scripted
+
+
+class Player(scripted.Player):
+    """Answers a game mode's prompts, starting with a rejected building and an invalid row.
+
+    Buildings go along the top row, so in Arcade each one touches the one
+    before and in Free Play each one expands the board. After two moves the
+    building prompt is answered with keys (Z to undo, Y to redo) first. The
+    game is saved after saves_after moves, or played to the end.
+    """
+
+    def __init__(self, load, saves_after=None, keys=()):
+        super().__init__()
+        self.load = load
+        self.saves_after = saves_after
+        self.keys = list(keys)
+        self.moves = []
+        self.attempts = 0
+
+    def answer(self, prompt):
+        if prompt.startswith("Do you want to load"):
+            return self.load
+        if prompt.startswith("Choose which building"):
+            self.attempts += 1
+            if self.keys and len(self.moves) >= 3:
+                return self.keys.pop(0)
+            if self.attempts == 1:
+                return next(building for building in 'RICO*' if building not in self.offered)
+            return ([building for building in self.offered if building != 'I'] or ['R'])[0]
+        if prompt.startswith("Enter the row"):
+            if self.attempts == 2 and not self.moves:
+                self.moves.append(None)
+                return '99'  # Off the board, so the row is asked again
+            self.moves.append(len(self.moves))
+            return '0'
+        if prompt.startswith("Enter the column"):
+            return str(self.moves[-1] or 0)
+        if prompt.startswith("Do you want to save"):
+            saving = self.saves_after is not None and len(self.moves) - 1 >= self.saves_after
+            return 'y' if saving else 'n'
+        raise ValueError(f"Unexpected prompt: {prompt!r}")
+
+
+@pytest.mark.parametrize('mode', ['arcade', 'free_play'])
+def test_saved_resumed_and_finished_games_replay_exactly(tmp_path, monkeypatch, capsys, mode):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(samplegame, 'RENDER_MODE', 'off')
+    monkeypatch.setattr(samplegame, 'REPLAY_DIR', str(tmp_path / 'replays'))
+    monkeypatch.setattr(samplegame, 'SEED', 7)
+    play = getattr(samplegame, f'{mode}_mode')
+    with scripted.playing(Player('n', saves_after=3), tmp_path):
+        assert play() == 'menu'
+    # A resumed Arcade game is played until the coins run out
+    with scripted.playing(Player('y', 3 if mode == 'free_play' else None), tmp_path):
+        assert play() == 'menu'
+
+    assert replay.main([str(tmp_path / 'replays')]) == 0
+    out = capsys.readouterr().out
+    assert out.count(': ok (score') == 2
+
+
+@pytest.mark.parametrize('mode', ['arcade', 'free_play'])
+def test_undone_and_redone_moves_replay_and_save_exactly(tmp_path, monkeypatch, capsys, mode):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(samplegame, 'RENDER_MODE', 'off')
+    monkeypatch.setattr(samplegame, 'REPLAY_DIR', str(tmp_path / 'replays'))
+    monkeypatch.setattr(samplegame, 'SEED', 7)
+    # Every undo is redone, so the next building still goes next to the last one
+    keys = ['Z', 'Z', 'Y', 'Y', 'Z', 'Y']
+    with scripted.playing(Player('n', saves_after=4, keys=keys), tmp_path):
+        assert getattr(samplegame, f'{mode}_mode')() == 'menu'
+
+    assert replay.main([str(tmp_path / 'replays')]) == 0
+    assert ': ok (score' in capsys.readouterr().out
+    save = 'game_save.json' if mode == 'arcade' else samplegame.FREE_PLAY_SAVE
+    state = samplegame.read_game_state(save, mode)
+    grid = state['grid'].to_grid() if hasattr(state['grid'], 'to_grid') else state['grid']
+    assert rules.evaluate(grid, mode)[0] == state['score']
+
+
+def test_main_reports_damaged_files_and_checks_the_rest(tmp_path, capsys):
+    recorder = replay.Recorder('arcade', 1)
+    game = engine.HeadlessGame('arcade', 1)
+    while not game.is_over():
+        # Only the offers may draw from the game's RNG, as in a played game
+        building, (row, col) = game.offer()[0], game.legal_positions()[0]
+        game.play(building, row, col)
+        recorder.place(building, row, col)
+    recorder.write(str(tmp_path), game.score, game.coins)
+    (tmp_path / 'a.replay').write_text('not json\n')
+    (tmp_path / 'b.replay').write_text('{"replay": %d}\n' % replay.VERSION)
+
+    assert replay.main([str(tmp_path)]) == 1
+    out = capsys.readouterr().out
+    assert 'a.replay: FAILED' in out and 'b.replay: FAILED' in out
+    assert ': ok (score' in out
+    assert out.splitlines()[-1].startswith('3 games, 2 mismatches')
@@ -0,0 +1,42 @@
+"""The compiled rule sets must score exactly like the baseline game's scoring functions."""
+
+import random
+
+import pytest
+
+import rules
+from baseline_scoring import calculate_score_and_coins, calculate_score_free_play, npcity_score_and_coins
+
+BUILDINGS = "PRICO*"
+
+
+def random_grid(rng, rows, cols, density):
+    return [[rng.choice(BUILDINGS[1:]) if rng.random() < density else 'P' for _ in range(cols)]
+            for _ in range(rows)]
+
+
+@pytest.mark.parametrize('seed', range(30))
+def test_arcade_matches_baseline(seed):
+    rng = random.Random(seed)
+    grid = random_grid(rng, 20, 20, rng.random())
+    assert rules.evaluate(grid, 'arcade') == calculate_score_and_coins(grid)
+
+
+@pytest.mark.parametrize('seed', range(30))
+def test_npcity_matches_baseline(seed):
+    rng = random.Random(seed)
+    grid = random_grid(rng, 20, 20, rng.random())
+    assert rules.evaluate(grid, 'npcity') == npcity_score_and_coins(grid)
+
+
+@pytest.mark.parametrize('size', [(1, 1), (5, 5), (2, 9), (20, 20), (35, 35)])
+@pytest.mark.parametrize('seed', range(10))
+def test_free_play_matches_baseline(size, seed):
+    rng = random.Random(seed)
+    grid = random_grid(rng, *size, rng.random())
+    assert rules.evaluate(grid, 'free_play') == (calculate_score_free_play(grid), 0)
+
+
+def test_unknown_rule_set():
+    with pytest.raises(ValueError):
+        rules.get_rules('chess')
@@ -0,0 +1,123 @@
+"""Only an explicit save replaces the save file; an interrupted game is recovered from its own file."""
+
+import os
+
+import pytest
+
+import samplegame
+import scripted
+from journal import recovery_filename
+
+SAVES = {'arcade': 'game_save.json', 'free_play': 'game_save_free_play.sav'}
+
+
+class Crash(Exception):
+    """Raised by the player to stop a game the way a killed session would."""
+
+
+class Player(scripted.Player):
+    """Answers a game mode's prompts, placing buildings along the top row.
+
+    answers maps the start of a yes/no prompt to the answers to give it in
+    turn; once moves are placed the next save prompt crashes the game.
+    """
+
+    def __init__(self, moves, output='discard', **answers):
+        super().__init__(output)
+        self.moves = moves
+        self.answers = {prompt: list(replies) for prompt, replies in answers.items()}
+        self.position = 0
+
+    def answer(self, prompt):
+        if prompt.startswith("Choose which building"):
+            return ([building for building in self.offered if building != 'I'] or ['R'])[0]
+        if prompt.startswith("Enter the row"):
+            return '0'
+        if prompt.startswith("Enter the column"):
+            self.position += 1
+            return str(self.position - 1)
+        if prompt.startswith("Do you want to save") and self.position >= self.moves:
+            if not self.answers.get('save'):
+                raise Crash
+        for key, replies in self.answers.items():
+            if prompt.startswith(f"Do you want to {key}") and replies:
+                return replies.pop(0)
+        if prompt.startswith("Do you want"):
+            return 'n'
+        raise ValueError(f"Unexpected prompt: {prompt!r}")
+
+
+def play(mode, player):
+    with scripted.playing(player, os.getcwd()):
+        try:
+            getattr(samplegame, f'{mode}_mode')()
+        except Crash:
+            pass
+
+
+def buildings(filename, mode):
+    grid, _, _ = samplegame.load_freeplaygame(filename, free_play=mode == 'free_play')
+    return sum(cell != 'P' for row in grid for cell in row)
+
+
+@pytest.fixture
+def game_dir(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(samplegame, 'RENDER_MODE', 'off')
+    monkeypatch.setattr(samplegame, 'REPLAY_DIR', None)
+    return tmp_path
+
+
+@pytest.mark.parametrize('mode', ['arcade', 'free_play'])
+def test_only_explicit_saves_replace_the_save(game_dir, mode):
+    save = SAVES[mode]
+    play(mode, Player(2, save=['n', 'y']))
+    assert not os.path.exists(recovery_filename(save))
+    with open(save, 'rb') as f:
+        saved = f.read()
+
+    # A new game that is never saved leaves the previous save alone
+    play(mode, Player(1))
+    with open(save, 'rb') as f:
+        assert f.read() == saved
+    assert os.path.exists(recovery_filename(save))
+
+
+@pytest.mark.parametrize('mode', ['arcade', 'free_play'])
+def test_an_interrupted_game_can_be_recovered(game_dir, mode):
+    save = SAVES[mode]
+    play(mode, Player(3))
+    assert not os.path.exists(save)
+    assert buildings(recovery_filename(save), mode) == 3
+
+    player = Player(1, recover=['y'], save=['y'])
+    player.position = 3
+    play(mode, player)
+    assert buildings(save, mode) == 4
+    assert not os.path.exists(recovery_filename(save))
+
+
+@pytest.mark.parametrize('mode', ['arcade', 'free_play'])
+def test_a_declined_recovery_is_discarded(game_dir, mode):
+    save = SAVES[mode]
+    play(mode, Player(3))
+    play(mode, Player(1, recover=['n'], save=['y']))
+    assert buildings(save, mode) == 1
+    assert not os.path.exists(recovery_filename(save))
+
+
+def test_free_play_loads_a_save_under_the_old_name(game_dir):
+    play('free_play', Player(2, save=['n', 'y']))
+    os.replace(SAVES['free_play'], samplegame.OLD_FREE_PLAY_SAVE)
+    play('free_play', Player(1, load=['y'], save=['y']))
+    assert buildings(SAVES['free_play'], 'free_play') == 3
+
+
+def test_a_damaged_binary_save_starts_a_new_game(game_dir):
+    play('free_play', Player(2, save=['n', 'y']))
+    with open(SAVES['free_play'], 'r+b') as f:
+        f.truncate(os.path.getsize(SAVES['free_play']) - 2)
+    player = Player(1, load=['y'], save=['y'], output='capture')
+    play('free_play', player)
+    assert "empty or damaged" in player.captured.getvalue()
+    assert buildings(SAVES['free_play'], 'free_play') == 1
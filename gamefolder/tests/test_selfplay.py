@@ -0,0 +1,52 @@
+"""Self-play runs must end on their own in every mode and give the same results as before."""
+
+import io
+import json
+
+import engine
+import selfplay
+
+
+def test_free_play_games_stop_at_the_default_turn_limit():
+    result = engine.play_game(engine.random_policy, 'free_play', seed=1)
+    assert result['turns'] == engine.FREE_PLAY_MAX_TURNS
+
+    out = io.StringIO()
+    assert selfplay.run_games(3, workers=1, mode='free_play', out=out) == 3
+    results = [json.loads(line) for line in out.getvalue().splitlines()]
+    assert [result['turns'] for result in results] == [engine.FREE_PLAY_MAX_TURNS] * 3
+
+
+def test_max_turns_overrides_the_default():
+    assert engine.play_game(engine.random_policy, 'free_play', seed=1, max_turns=7)['turns'] == 7
+
+
+def test_legal_positions_are_in_row_major_order():
+    game = engine.HeadlessGame('arcade', seed=3)
+    while not game.is_over():
+        positions = game.legal_positions()
+        if not game.first_building:
+            assert positions == sorted(game.frontier)
+        game.play(*engine.random_policy(game, game.offer()))
+
+
+def test_runs_with_nearby_seeds_share_no_games():
+    first, second = set(selfplay.game_seeds(1, 1000)), set(selfplay.game_seeds(2, 1000))
+    assert len(first) == len(second) == 1000
+    assert not first & second
+
+    out = io.StringIO()
+    selfplay.run_games(5, workers=1, seed=1, out=out)
+    results = [json.loads(line) for line in out.getvalue().splitlines()]
+    assert [result['seed'] for result in results] == list(selfplay.game_seeds(1, 5))
+    assert results[0] == dict(engine.play_game(engine.random_policy, seed=results[0]['seed']),
+                              game=0, policy='random')
+
+
+def test_random_policy_picks_legal_moves_in_free_play():
+    game = engine.HeadlessGame('free_play', seed=5, max_turns=200)
+    while not game.is_over():
+        building, row, col = engine.random_policy(game, game.offer())
+        assert game.is_legal(row, col)
+        game.play(building, row, col)
+    assert len(game.grid) > engine.FREE_PLAY_SIZE
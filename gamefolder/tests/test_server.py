@@ -0,0 +1,147 @@
+"""Games saved over the line protocol must load again, sessions of the same player must not
+break each other's saves, and the leaderboard writer must outlive a failed write."""
+
+import asyncio
+import contextlib
+import os
+import re
+import threading
+
+import pytest
+
+import journal
+import samplegame
+import server
+
+GRID_ROW = re.compile(r'[PRICO*](?: [PRICO*])*')
+
+
+async def converse(port, answer):
+    """Play one connection, answering each prompt with answer(prompt, output) until it returns None."""
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    output = []
+    try:
+        while line := await reader.readline():
+            text = line.decode().rstrip('\n')
+            if not text.startswith(server.PROMPT):
+                output.append(text)
+                continue
+            reply = answer(text[len(server.PROMPT):], output)
+            if reply is None:
+                break
+            writer.write(f'{reply}\n'.encode())
+            await writer.drain()
+    finally:
+        writer.close()
+    return output
+
+
+def player(option, load):
+    """Log in, start the game of a menu option, place one building at (0, 0) and save it."""
+    menus = []
+
+    def answer(prompt, output):
+        if prompt.startswith("Enter your name"):
+            return 'alice'
+        if prompt.startswith("Choose option"):
+            menus.append(prompt)
+            return option if len(menus) == 1 else '4'
+        if prompt.startswith("Do you want to load"):
+            return load
+        if prompt.startswith("Choose which building"):
+            if load == 'y':
+                return None  # Leave once the loaded board is drawn
+            offered = next(line for line in reversed(output) if line.startswith("Randomly selected"))
+            return re.findall(r"'(.)'", offered)[0]
+        if prompt.startswith("Enter the"):
+            return '0'
+        if prompt.startswith("Do you want to save"):
+            return 'y'
+        raise ValueError(f"Unexpected prompt: {prompt!r}")
+    return answer
+
+
+def frame(output, title):
+    """Return the grid rows of the last frame drawn under title."""
+    start = len(output) - output[::-1].index(title)
+    rows = []
+    for line in output[start:]:
+        if not GRID_ROW.fullmatch(line):
+            break
+        rows.append(line)
+    return rows
+
+
+@pytest.mark.parametrize('option', ['1', '2'])
+def test_games_saved_over_the_protocol_load_again(tmp_path, option):
+    async def sessions():
+        game_server = server.GameServer(str(tmp_path / 'saves'), str(tmp_path / 'high_scores.db'))
+        ready = asyncio.get_running_loop().create_future()
+        task = asyncio.create_task(game_server.serve(port=0, ready=ready.set_result))
+        port = await ready
+        try:
+            saved = await converse(port, player(option, 'n'))
+            loaded = await converse(port, player(option, 'y'))
+        finally:
+            task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await task
+        return saved, loaded
+
+    saved, loaded = asyncio.run(sessions())
+    assert "Game progress saved." in saved
+    assert "Game progress loaded." in loaded
+    board = frame(saved, "Updated grid:")
+    assert sum(row.count('P') for row in board) == len(board) * len(board[0].split()) - 1
+    assert frame(loaded, "Initial grid:") == board
+
+
+@pytest.mark.parametrize('binary', [False, True])
+def test_simultaneous_saves_of_one_file(tmp_path, binary):
+    filename = str(tmp_path / 'player.json')
+    errors = []
+
+    def save(coins):
+        grid = [['R' if col == coins else 'P' for col in range(20)] for _ in range(20)]
+        try:
+            for _ in range(50):
+                journal.write_snapshot(filename, grid, coins, coins, binary=binary)
+        except Exception as error:
+            errors.append(error)
+
+    threads = [threading.Thread(target=save, args=(coins,)) for coins in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+    assert os.listdir(tmp_path) == ['player.json']
+    state = samplegame.read_game_state(filename)
+    assert state['grid'][0][state['coins']] == 'R'
+
+
+def test_leaderboard_writer_outlives_a_failed_write(tmp_path, caplog):
+    async def session():
+        writer = server.LeaderboardWriter(str(tmp_path / 'high_scores.db'))
+        await writer.start()
+        add_many = writer._board.add_many
+        failures = [RuntimeError("disk full")]
+
+        def flaky(entries):
+            if failures:
+                raise failures.pop()
+            add_many(entries)
+
+        writer._board.add_many = flaky
+        writer.add(10, 'arcade')
+        await asyncio.sleep(0.05)
+        writer.add(20, 'arcade')
+        await asyncio.wait_for(writer.queue.join(), 5)
+        top = await writer.top()
+        await asyncio.wait_for(writer.close(), 5)
+        return top
+
+    top = asyncio.run(session())
+    assert [entry['score'] for entry in top] == [20]
+    assert "Writing 1 scores to the leaderboard failed" in caplog.text
@@ -0,0 +1,10 @@
+"""A long menu session must not grow the heap or the call stack from game to game."""
+
+import soak
+
+
+def test_memory_and_stack_depth_stay_flat(tmp_path, monkeypatch):
+    monkeypatch.setattr(soak.tempfile, 'mkdtemp', lambda prefix='': str(tmp_path))
+    samples = soak.soak(300, sample_every=50)
+    assert [games for games, _, _ in samples] == list(range(0, 301, 50))
+    assert soak.check(samples) == []
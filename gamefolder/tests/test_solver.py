@@ -0,0 +1,64 @@
+"""The solver must find the same best score as trying every line of play."""
+
+import pytest
+
+import rules
+import solver
+
+
+def brute_force(rows, cols, rule_set, offers, coins):
+    """Best final score over every line, with no bound, table or symmetry."""
+    arcade = rule_set != 'free_play'
+    grid = [['P'] * cols for _ in range(rows)]
+
+    def neighbours(row, col):
+        return [(r, c) for r, c in ((row - 1, col), (row + 1, col), (row, col - 1), (row, col + 1))
+                if 0 <= r < rows and 0 <= c < cols]
+
+    def search(turn, coins):
+        if turn == len(offers) or (arcade and coins <= 0):
+            return rules.evaluate(grid, rule_set)[0]
+        first = all(cell == 'P' for row in grid for cell in row)
+        positions = [(row, col) for row in range(rows) for col in range(cols)
+                     if grid[row][col] == 'P'
+                     and (not arcade or first or any(grid[r][c] != 'P' for r, c in neighbours(row, col)))]
+        if not positions:
+            return rules.evaluate(grid, rule_set)[0]
+        best = None
+        for building in offers[turn]:
+            for row, col in positions:
+                grid[row][col] = building
+                # Arcade pays a coin per building and earns the board's coins every turn
+                value = search(turn + 1, coins - 1 + rules.evaluate(grid, rule_set)[1])
+                grid[row][col] = 'P'
+                best = value if best is None else max(best, value)
+        return best
+
+    return search(0, coins)
+
+
+# Free Play has no coins; two coins end Arcade games early
+@pytest.mark.parametrize('rule_set,coins', [('arcade', 16), ('arcade', 2), ('npcity', 16),
+                                            ('npcity', 2), ('free_play', 16)])
+@pytest.mark.parametrize('rows,cols,seed', [(2, 2, None), (2, 3, 1), (3, 2, 2)])
+def test_solver_matches_brute_force(rule_set, rows, cols, seed, coins):
+    turns = rows * cols
+    offers = [('R', 'I', 'C', 'O', '*')] * turns if seed is None else solver.offer_sequence(turns, seed)
+    # A tiny table, so that slots are shared and entries evicted
+    search = solver.Solver(rows, cols, rule_set, offers, coins=coins, table_bits=2)
+    best, line = search.solve()
+    assert best == brute_force(rows, cols, rule_set, offers, coins)
+    assert search.table.evictions > 0
+
+    # The line is legal and reaches the best score
+    grid = [['P'] * cols for _ in range(rows)]
+    for turn, (building, row, col) in enumerate(line):
+        assert building in offers[turn] and grid[row][col] == 'P'
+        grid[row][col] = building
+    assert rules.evaluate(grid, rule_set)[0] == best
+
+
+def test_the_command_line_refuses_big_boards(capsys):
+    with pytest.raises(SystemExit):
+        solver.main(['--rows', '5', '--cols', '5'])
+    assert 'cells' in capsys.readouterr().err
@@ -0,0 +1,83 @@
+"""ChunkedBoard must behave like a list-of-lists grid however it grows."""
+
+import pickle
+import random
+
+import pytest
+
+import pools
+from bytegrid import Grid
+from sparseboard import CHUNK_SIZE, ChunkedBoard
+
+
+def expand_list(grid, expansion_size=5):
+    size = len(grid[0]) + 2 * expansion_size
+    return ([['P'] * size for _ in range(expansion_size)]
+            + [['P'] * expansion_size + row + ['P'] * expansion_size for row in grid]
+            + [['P'] * size for _ in range(expansion_size)])
+
+
+def test_cells_across_chunk_edges():
+    board = ChunkedBoard(2 * CHUNK_SIZE + 3, 2 * CHUNK_SIZE + 3)
+    positions = [(CHUNK_SIZE - 1, CHUNK_SIZE - 1), (CHUNK_SIZE - 1, CHUNK_SIZE),
+                 (CHUNK_SIZE, CHUNK_SIZE - 1), (CHUNK_SIZE, CHUNK_SIZE), (0, 2 * CHUNK_SIZE + 2)]
+    for position, building in zip(positions, 'RICO*'):
+        board.set(*position, building)
+    assert len(board.chunks) == 5
+    assert all(isinstance(chunk, Grid) for chunk in board.chunks.values())
+    assert sorted(board.buildings()) == sorted((*position, building)
+                                               for position, building in zip(positions, 'RICO*'))
+    assert board[CHUNK_SIZE - 1][CHUNK_SIZE - 2:CHUNK_SIZE + 2] == ['P', 'R', 'I', 'P']
+
+
+def test_growth_moves_cells_to_negative_coordinates():
+    rng = random.Random(1)
+    grid = [['P'] * 5 for _ in range(5)]
+    board = ChunkedBoard.from_grid(grid)
+    for _ in range(300):
+        row, col = rng.randrange(len(grid)), rng.randrange(len(grid[0]))
+        building = rng.choice('RICO*')
+        grid[row][col] = building
+        board[row][col] = building
+        if row in (0, len(grid) - 1) or col in (0, len(grid[0]) - 1):
+            grid = expand_list(grid)
+            board.expand()
+        assert (len(board), len(board[0])) == (len(grid), len(grid[0]))
+    assert board.origin_row > CHUNK_SIZE  # Cells were placed left of and above chunk (0, 0)
+    assert any(chunk_row < 0 for chunk_row, _ in board.chunks)
+    assert board.to_grid() == grid
+    assert [list(row) for row in board] == grid
+    assert sorted(board.buildings()) == [(row, col, building) for row, cells in enumerate(grid)
+                                         for col, building in enumerate(cells) if building != 'P']
+
+    copy = board.copy()
+    copy.set(0, 0, 'R')
+    assert board.get(0, 0) == grid[0][0]
+    board.expand()
+    board.shrink()
+    assert board.to_grid() == grid
+
+
+def test_bounds():
+    board = ChunkedBoard(3, 4)
+    for row, col in [(-1, 0), (0, -1), (3, 0), (0, 4)]:
+        with pytest.raises(IndexError):
+            board.get(row, col)
+        with pytest.raises(IndexError):
+            board.set(row, col, 'R')
+    with pytest.raises(IndexError):
+        board[3]
+    board.set(2, 3, 'P')
+    assert not board.chunks  # Clearing an empty cell stores nothing
+    assert len(board[2]) == 4 and board[2][1:] == ['P'] * 3
+
+
+def test_pickled_through_the_pool():
+    board = ChunkedBoard(40, 40)
+    board.expand()
+    board.set(0, 0, 'R')
+    board.set(49, 49, 'O')
+    assert pickle.loads(pickle.dumps(board)).to_grid() == board.to_grid()
+    copy = pools.get_pool(2).submit(ChunkedBoard.copy, board).result()
+    assert copy.to_grid() == board.to_grid()
+    assert copy.origin_row == board.origin_row == 5
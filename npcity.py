@@ -1,5 +1,53 @@
+import os
 import random
-import json
+import sys
+
+# The shared engine modules live in gamefolder/
+_GAMEFOLDER = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'gamefolder')
+if _GAMEFOLDER not in sys.path:
+    sys.path.insert(0, _GAMEFOLDER)
+
+# json and sqlite3 are imported where they are used to keep importing this module cheap
+from frontier import Frontier
+from incremental import IncrementalScorer
+from render import Renderer, count_answer
+import rules
+
+# 'python', 'numpy' or 'bitboard'; NumPy scoring falls back to Python when it is not installed
+SCORING_BACKEND = os.environ.get('NGEEANN_SCORING_BACKEND', 'python')
+
+# How boards are drawn: 'auto', 'plain', 'ansi' or 'off' (see gamefolder/render.py)
+RENDER_MODE = os.environ.get('NGEEANN_RENDER', 'auto')
+
+# Directory where every game writes a replay file (see gamefolder/replay.py), or None
+REPLAY_DIR = os.environ.get('NGEEANN_REPLAY_DIR')
+
+
+def ask(prompt):
+    """input(), counting the answer's line for the renderer."""
+    answer = input(prompt)
+    count_answer()
+    return answer
+
+
+def set_scoring_backend(name):
+    """Select the scoring backend and return the one that will actually be used."""
+    global SCORING_BACKEND
+    if name not in ('python', 'numpy', 'bitboard'):
+        raise ValueError(f"Unknown scoring backend: {name}")
+    SCORING_BACKEND = name
+    return 'python' if _scoring_backend() is None else name
+
+
+def _scoring_backend():
+    """Return the selected scoring module, or None for the built-in Python scoring."""
+    if SCORING_BACKEND == 'bitboard':
+        import bitboard
+        return bitboard
+    if SCORING_BACKEND != 'numpy':
+        return None
+    import npscoring
+    return npscoring if npscoring.available() else None
 
 def get_adjacent_positions(row, col, rows=20, cols=20):
     """Get a list of adjacent positions for a given cell in the grid."""
@@ -11,59 +59,36 @@ def get_adjacent_positions(row, col, rows=20, cols=20):
 
 def calculate_score_and_coins(grid):
     """Calculate the score and coins based on the grid's current state."""
-    rows, cols = len(grid), len(grid[0])
-    score = 0
-    coins = 0
-    industry_count = sum(row.count('I') for row in grid)
-
-    for row in range(rows):
-        for col in range(cols):
-            building = grid[row][col]
-            if building == 'P':
-                continue
-
-            adjacent_positions = get_adjacent_positions(row, col)
-            adjacent_buildings = [grid[r][c] for r, c in adjacent_positions]
-
-            if building == 'R':
-                if 'I' in adjacent_buildings:
-                    score += 1
-                else:
-                    score += adjacent_buildings.count('R')
-                    score += adjacent_buildings.count('C')
-                    score += 2 * adjacent_buildings.count('O')
-            elif building == 'I':
-                score += industry_count
-                coins += sum(1 for r, c in adjacent_positions if grid[r][c] == 'R')
-            elif building == 'C':
-                score += adjacent_buildings.count('C')
-                coins += adjacent_buildings.count('R')
-            elif building == 'O':
-                score += adjacent_buildings.count('O')
-            elif building == '*':
-                if '*' in adjacent_buildings:
-                    score += 1
-
-    return score, coins
-
-
-def choose_building(grid, first_building):
-    """Randomly select two buildings and allow the user to choose one."""
+    backend = _scoring_backend()
+    if backend is not None:
+        return backend.score_and_coins(grid, 'npcity')
+    return rules.evaluate(grid, 'npcity')
+
+
+def choose_building(grid, first_building, frontier=None, rng=None):
+    """Randomly select two buildings and allow the user to choose one.
+
+    frontier is the grid's Frontier, kept up to date by the caller; without
+    it one is built from the grid. Offers are drawn from rng, the game's own
+    random.Random, or the random module without one.
+    """
     buildings = ["R", "I", "C", "*", "O"]
-    randombuildings = random.sample(buildings, 2)
+    randombuildings = (rng or random).sample(buildings, 2)
     print("Randomly selected buildings:", randombuildings)
 
-    ansbuilding = input("Choose which building to build: ").strip().upper()
+    ansbuilding = ask("Choose which building to build: ").strip().upper()
 
     if ansbuilding in randombuildings:
         print(f"{ansbuilding} is in the randomly selected buildings.")
+        if frontier is None and not first_building:
+            frontier = Frontier.from_grid(grid)
         while True:
             try:
-                row = int(input(f"Enter the row number (0-19) to place {ansbuilding}: "))
-                col = int(input(f"Enter the column number (0-19) to place {ansbuilding}: "))
+                row = int(ask(f"Enter the row number (0-19) to place {ansbuilding}: "))
+                col = int(ask(f"Enter the column number (0-19) to place {ansbuilding}: "))
 
                 if 0 <= row < 20 and 0 <= col < 20:
-                    if first_building or (grid[row][col] == 'P' and any(grid[r][c] != 'P' for r, c in get_adjacent_positions(row, col))):
+                    if first_building or (row, col) in frontier:
                         return ansbuilding, row, col
                     else:
                         print("Invalid position. The spot is either taken or not adjacent to an existing building.")
@@ -77,6 +102,7 @@ def choose_building(grid, first_building):
 
 def save_game(grid, coins, score, filename='game_save.json'):
     """Save the current game state to a file."""
+    import json
     game_state = {
         'grid': grid,
         'coins': coins,
@@ -88,6 +114,7 @@ def save_game(grid, coins, score, filename='game_save.json'):
 
 def load_game(filename='game_save.json'):
     """Load the game state from a file."""
+    import json
     try:
         with open(filename, 'r') as f:
             game_state = json.load(f)
@@ -97,46 +124,50 @@ def load_game(filename='game_save.json'):
         print("No saved game found. Starting a new game.")
         return None, None, None
 
-def save_high_score(score, filename='high_scores.json'):
-    """Save the new high score to the high score file."""
-    try:
-        with open(filename, 'r') as f:
-            high_scores = json.load(f)
-    except FileNotFoundError:
-        high_scores = []
-
-    high_scores.append(score)
-    high_scores = sorted(high_scores, reverse=True)[:10]  # Keep top 10 scores
-
-    with open(filename, 'w') as f:
-        json.dump(high_scores, f)
+def open_leaderboard(filename='high_scores.db'):
+    """Open the leaderboard, importing the old high_scores.json the first time."""
+    from leaderboard import Leaderboard
+    board = Leaderboard(filename)
+    board.import_json(os.path.join(os.path.dirname(filename), 'high_scores.json'), 'npcity')
+    return board
+
+def save_high_score(score, filename='high_scores.db', mode='npcity'):
+    """Save the new high score to the leaderboard with the current date and time."""
+    with open_leaderboard(filename) as board:
+        board.add(score, mode)
     print("High score saved.")
 
-def load_high_scores(filename='high_scores.json'):
-    """Load the high scores from the high score file."""
-    try:
-        with open(filename, 'r') as f:
-            high_scores = json.load(f)
-    except FileNotFoundError:
-        high_scores = []
-    return high_scores
-
-def display_high_scores():
-    """Display the high scores."""
-    high_scores = load_high_scores()
-    if high_scores:
+def load_high_scores(filename='high_scores.db', mode='npcity', k=10):
+    """Return the k best scores of a leaderboard as dicts with 'score' and 'date'."""
+    with open_leaderboard(filename) as board:
+        return board.top(k, mode)
+
+def display_high_scores(mode='npcity', page_size=10):
+    """Display the high scores a page at a time."""
+    with open_leaderboard() as board:
+        high_scores, cursor = board.page(mode, page_size)
+        if not high_scores:
+            print("No high scores yet.")
+            return
         print("High Scores:")
-        for idx, score in enumerate(high_scores, 1):
-            print(f"{idx}. {score}")
-    else:
-        print("No high scores yet.")
+        idx = 1
+        while high_scores:
+            for entry in high_scores:
+                date = f" ({entry['date']})" if entry['date'] else ''
+                print(f"{idx}. {entry['score']}{date}")
+                idx += 1
+            if cursor is None:
+                break
+            if ask("Show more high scores? (y/n): ").strip().lower() != 'y':
+                break
+            high_scores, cursor = board.page(mode, page_size, cursor)
 
 def arcade_mode():
     """Main game loop for placing buildings on the grid."""
     rows, cols = 20, 20
 
     # Ask the user if they want to load the previous game
-    load_prev_game = input("Do you want to load the previous game? (y/n): ").strip().lower() == 'y'
+    load_prev_game = ask("Do you want to load the previous game? (y/n): ").strip().lower() == 'y'
     if load_prev_game:
         grid, coins, score = load_game()
         if grid is None:  # No saved game found
@@ -148,48 +179,61 @@ def arcade_mode():
         coins = 16
         score = 0
 
-    def print_grid(grid):
-        for row in grid:
-            print(' '.join(row))
+    # Open while the game runs, so the prompts below an ANSI frame are counted
+    with Renderer(RENDER_MODE) as renderer:
+        return _arcade_turns(renderer, grid, coins, score)
+
 
-    print("Initial grid:")
-    print_grid(grid)
+def _arcade_turns(renderer, grid, coins, score):
+    """Play Arcade turns on grid until the coins run out or the player saves."""
+    renderer.draw(grid, "Initial grid:")
     print(f"Initial coins: {coins}")
 
     # Determine if this is the first building
     first_building = all(cell == 'P' for row in grid for cell in row)
+    scorer = IncrementalScorer(grid, 'npcity')
+    frontier = Frontier.from_grid(grid)
+
+    # The game's own offers, so the seed and the choices replay it exactly
+    from replay import Recorder
+    seed = random.randrange(2 ** 32)
+    rng = random.Random(seed)
+    recorder = Recorder('arcade', seed, 'npcity', grid, coins)
 
     while coins > 0:
-        ansbuilding, row, col = choose_building(grid, first_building)
+        ansbuilding, row, col = choose_building(grid, first_building, frontier, rng)
         if ansbuilding is None:
+            recorder.reject()
             continue
 
-        grid[row][col] = ansbuilding
         coins -= 1
         first_building = False  # After the first building is placed
 
-        score, generated_coins = calculate_score_and_coins(grid)
+        # Only the new cell and its neighbours are re-scored
+        score, generated_coins = scorer.place(ansbuilding, row, col)
         coins += generated_coins
+        frontier.update(grid, row, col)
+        recorder.place(ansbuilding, row, col)
 
-        print("Updated grid:")
-        print_grid(grid)
+        renderer.draw(grid, "Updated grid:", (row, col))
         print(f"Remaining coins: {coins}")
         print(f"Current score: {score}")
 
         if coins <= 0:
-            save_high_score(score, filename='high_scores.json')
+            if REPLAY_DIR:
+                recorder.write(REPLAY_DIR, score, coins)
+            save_high_score(score)
             print("No more coins left. Exiting the game.")
-            choose()
-            break
+            return 'menu'
 
         # Ask if the user wants to save the game progress
-        if input("Do you want to save the game progress? (y/n): ").strip().lower() == 'y':
+        if ask("Do you want to save the game progress? (y/n): ").strip().lower() == 'y':
             save_game(grid, coins, score)
-            choose()
-        
+            if REPLAY_DIR:
+                recorder.write(REPLAY_DIR, score, coins)
+            return 'menu'
 
-
-    # Save the final score as a high
+    return 'menu'
 
 
 
@@ -203,33 +247,57 @@ def arcade_mode():
 
    
 
-def choose():
+def main_menu():
+    """Show the main menu once and return the state the player picked."""
     print("Ngee Ann City")
     print("1.) Arcade Mode")
     print("2.) FreePlay Mode")
     print("3.) LeaderBoard")
-    ans = int(input("Choose option:"))
-    if ans == 1:
-      print("You entered Arcade Mode.")
-      arcade_mode()
-    elif ans == 2:
-      print("You entered FreePlay Mode.")
-    elif ans == 3:
-      print("You entered LeaderBoard.")
-      display_high_scores()
-      if input("Do you want to go back mainpage? (y/n): ").strip().lower() == 'y':
-          choose()
-      else:
-          print('Game will exit')
-    else:
-      print("You entered a number other than 1, 2, or 3.")
-      print("Try again")
-      choose()
-
-
-
-
-choose()
+    ans = ask("Choose option:").strip()
+    if ans == '1':
+        print("You entered Arcade Mode.")
+        return 'arcade'
+    if ans == '2':
+        print("You entered FreePlay Mode.")
+        return 'exit'  # This version has no Free Play mode
+    if ans == '3':
+        print("You entered LeaderBoard.")
+        return 'leaderboard'
+    print("You entered a number other than 1, 2, or 3.")
+    print("Try again")
+    return 'menu'
+
+
+def leaderboard_screen():
+    """Show the leaderboard, then return to the menu or exit."""
+    display_high_scores()
+    if ask("Do you want to go back mainpage? (y/n): ").strip().lower() == 'y':
+        return 'menu'
+    print('Game will exit')
+    return 'exit'
+
+
+# Every screen returns the name of the next one, so the stack stays flat however long the session
+STATES = {
+    'menu': main_menu,
+    'arcade': arcade_mode,
+    'leaderboard': leaderboard_screen,
+}
+
+
+def choose(state='menu'):
+    """Run the menu/game state machine from state until the player exits."""
+    while state != 'exit':
+        state = STATES[state]()
+
+
+def main():
+    """Command-line entry point: python -m npcity."""
+    choose()
+
+
+if __name__ == '__main__':
+    main()
 
 
 